@@ -9,7 +9,10 @@ from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import plotly.graph_objects as go
 from layout import serve_layout
-from callbacks import register_callbacks
+from callbacks import register_callbacks, start_background_jobs, collection
+from export import register_export_routes
+from metrics import register_metrics_route
+from prewarm import start_prewarm
 from dash import Dash
 import dash_bootstrap_components as dbc
 import dash_auth
@@ -39,12 +42,18 @@ class HashedAuth(dash_auth.BasicAuth):
 app = Dash(__name__, meta_tags=[{"name": "viewport", "content": "width=device-width, initial-scale=1"}], 
            external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
 
+# Rutas de exportación y de métricas (antes de la autenticación para que queden protegidas)
+register_export_routes(app.server, collection)
+register_metrics_route(app.server)
+
 # Instanciar autenticación con diccionario dummy
 auth = HashedAuth(app, {'dummy': 'dummy'})
 
-# Layout
-app.layout = serve_layout()
+# Layout (se arma en cada carga de la página para que la fecha de fin sea siempre hoy)
+app.layout = serve_layout
 register_callbacks(app)
+start_background_jobs()
+start_prewarm()
 
 server = app.server  # para que Gunicorn pueda encontrarlo
 
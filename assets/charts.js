@@ -0,0 +1,193 @@
+// Gráficos armados en el navegador (CLIENTSIDE_CHARTS=true).
+// El servidor envía solo las columnas de cada vista (ver chart_columns en callbacks.py) y acá se
+// arman las figuras con las mismas plantillas que charts.py.
+(function () {
+    var COLORS = {total: "#2C16AD", successful: "#11B911", failed: "#B91111"};
+
+    function column(data, name) {
+        return (data && data[name]) || [];
+    }
+
+    function areaTrace(data, y, name, color) {
+        return {
+            type: "scatter", x: column(data, "date"), y: column(data, y), mode: "lines+markers",
+            name: name, fill: "tozeroy", line: {color: color}, marker: {size: 4, symbol: "circle"}
+        };
+    }
+
+    function lineLayout(title, yaxisTitle) {
+        return {
+            title: {text: title, x: 0.5}, yaxis: {title: {text: yaxisTitle}, tickformat: ","},
+            xaxis: {title: {text: "date"}}
+        };
+    }
+
+    function usersFigure(data, view, title, prefix) {
+        return {
+            data: [
+                areaTrace(data, "total_users", "Total " + prefix + "Users", COLORS.total),
+                areaTrace(data, "successful_users", "Successful " + prefix + "Users", COLORS.successful),
+                areaTrace(data, "failed_users", "Failed " + prefix + "Users", COLORS.failed)
+            ],
+            layout: lineLayout(view + " " + title, "Users")
+        };
+    }
+
+    function listsFigure(data, view) {
+        return {
+            data: [
+                areaTrace(data, "total_lists", "Total Lists", COLORS.total),
+                areaTrace(data, "created_lists", "Successful Lists", COLORS.successful),
+                areaTrace(data, "failed_lists", "Failed Lists", COLORS.failed)
+            ],
+            layout: lineLayout(view + " Lists", "Count")
+        };
+    }
+
+    function notifiedFigure(data, view) {
+        return {
+            data: [areaTrace(data, "notified_users", "Notified Users", COLORS.total)],
+            layout: lineLayout(view + " Notified Users", "Users")
+        };
+    }
+
+    function returningFigure(data) {
+        return {
+            data: [
+                areaTrace(data, "active_users", "Active Users", COLORS.total),
+                areaTrace(data, "returning_users", "Returning Users", COLORS.successful)
+            ],
+            layout: lineLayout("Monthly Returning Users", "Users")
+        };
+    }
+
+    function emptyFigure(text) {
+        return {
+            data: [],
+            layout: {annotations: [{text: text, xref: "paper", yref: "paper", x: 0.5, y: 0.5, showarrow: false}]}
+        };
+    }
+
+    function funnelFigure(funnel) {
+        var notified = funnel ? funnel.notified_users : 0;
+        var users = funnel ? funnel.total_users : 0;
+        var percentNotified = notified > 0 ? 100 : 0;
+        var percentSuccessful = notified > 0 ? users / notified * 100 : 0;
+        return {
+            data: [
+                {
+                    type: "bar", x: [""], y: [notified], width: 0.4, marker: {color: "#00008B"},
+                    name: "Usuarios notificados (" + percentNotified.toFixed(1) + "%)", customdata: [percentNotified],
+                    hovertemplate: "Usuarios notificados: %{y} (%{customdata:.1f}%)<extra></extra>"
+                },
+                {
+                    type: "bar", x: [""], y: [users], width: 0.4, marker: {color: "#1E90FF"},
+                    name: "Usuarios de Listas (" + percentSuccessful.toFixed(1) + "%)", customdata: [percentSuccessful],
+                    hovertemplate: "Usuarios de Listas: %{y} (%{customdata:.1f}%)<extra></extra>"
+                }
+            ],
+            layout: {
+                title: {text: "Funnel Usuarios ListMe", x: 0.5, xanchor: "center"},
+                yaxis: {title: {text: "Cantidad de Usuarios"}, showgrid: true, gridcolor: "rgba(0, 0, 0, 0.1)", zeroline: false},
+                xaxis: {showgrid: false, zeroline: false},
+                barmode: "overlay", showlegend: true,
+                font: {family: "Roboto, sans-serif", size: 12, color: "#333"},
+                plot_bgcolor: "#FFFFFF", paper_bgcolor: "#FFFFFF",
+                margin: {l: 50, r: 50, t: 80, b: 50}, uniformtext: {minsize: 10, mode: "hide"}
+            }
+        };
+    }
+
+    function ratioFigure(ratio, countries) {
+        var months = column(ratio, "year_month");
+        if (!months.length) {
+            return emptyFigure("No hay datos disponibles para el período seleccionado");
+        }
+        var traces = {};
+        months.forEach(function (month, i) {
+            var country = ratio.country[i];
+            if (countries && countries.length && countries.indexOf(country) < 0) {
+                return;
+            }
+            traces[country] = traces[country] || {
+                type: "scatter", mode: "lines+markers", name: country, x: [], y: [],
+                hovertemplate: "<b>%{fullData.name}</b><br>Mes: %{x}<br>Ratio DAU/MAU: %{y:.3f}<br><extra></extra>"
+            };
+            traces[country].x.push(month);
+            traces[country].y.push(ratio.dau_mau_ratio[i]);
+        });
+        var data = Object.keys(traces).map(function (country) { return traces[country]; });
+        if (!data.length) {
+            return emptyFigure("No hay datos para los países seleccionados");
+        }
+        return {
+            data: data,
+            layout: {
+                title: {text: "DAU/MAU Ratio"}, hovermode: "x unified",
+                xaxis: {title: {text: "Mes"}, type: "category"}, yaxis: {title: {text: "Ratio DAU/MAU"}},
+                legend: {orientation: "h", yanchor: "bottom", y: 1.02, xanchor: "right", x: 1}
+            }
+        };
+    }
+
+    function countryFigure(data, y, countries, title, yaxisTitle) {
+        // Una traza apilada por país elegido, en el orden del dropdown
+        var dates = column(data, "date");
+        var values = column(data, y);
+        var names = column(data, "country");
+        var traces = (countries || []).map(function (country) {
+            var trace = {
+                type: "scatter", x: [], y: [], mode: "lines+markers", name: country,
+                fill: "tozeroy", stackgroup: "1", marker: {size: 4, symbol: "circle"}
+            };
+            names.forEach(function (name, i) {
+                if (name === country) {
+                    trace.x.push(dates[i]);
+                    trace.y.push(values[i]);
+                }
+            });
+            return trace;
+        });
+        return {
+            data: traces,
+            layout: {
+                title: {text: title, x: 0.5}, xaxis: {title: {text: "date"}, type: "category"},
+                yaxis: {title: {text: yaxisTitle}, tickformat: ","}, legend: {title: {text: "country"}}
+            }
+        };
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        charts: {
+            general: function (columns) {
+                if (!columns) {
+                    throw window.dash_clientside.PreventUpdate;
+                }
+                var view = columns.view;
+                return [
+                    usersFigure(columns.daily, view, "Total Active Users", ""),
+                    listsFigure(columns.daily, view),
+                    usersFigure(columns.new_users, view, "Total Active New Users", "New "),
+                    listsFigure(columns.new_users, view),
+                    notifiedFigure(columns.notified, view),
+                    funnelFigure(columns.funnel),
+                    ratioFigure(columns.ratio, null),
+                    returningFigure(columns.returning_users)
+                ];
+            },
+            byCountry: function (columns, countries) {
+                if (!columns) {
+                    throw window.dash_clientside.PreventUpdate;
+                }
+                var view = columns.view;
+                return [
+                    countryFigure(columns.country_daily, "total_users", countries, view + " Active Users", "Users"),
+                    countryFigure(columns.country_daily, "created_lists", countries, view + " Successful", "Lists"),
+                    countryFigure(columns.country_new_users, "total_users", countries, view + " Active Users", "Users"),
+                    countryFigure(columns.country_new_users, "created_lists", countries, view + " Successful", "Lists"),
+                    ratioFigure(columns.country_ratio, countries)
+                ];
+            }
+        }
+    });
+})();
@@ -0,0 +1,169 @@
+"""
+Generador de un dataset sintético de ListMe para los benchmarks.
+
+Carga en un mongod local documentos con la misma forma que producción:
+- ListMe.lists: user_id (teléfono), created_at (Unix timestamp en segundos), status
+  ('active' o 'error') e items. La cantidad de listas por usuario sigue una ley de potencias
+  (pocos usuarios con muchas listas), el volumen diario crece a lo largo del período y las
+  horas siguen el uso diurno de Buenos Aires.
+- TranscribeMe.notifications: user y lists_notif (timestamps de las notificaciones enviadas).
+
+Con la misma semilla y los mismos parámetros el dataset es idéntico.
+
+Uso por línea de comandos:
+    python -m benchmarks.generate --scale 100k
+    python -m benchmarks.generate --scale 1m --seed 7 --uri mongodb://localhost:27017
+    python -m benchmarks.generate --scale 10m --drop
+"""
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pymongo
+import pytz
+
+from config import TIMEZONE
+
+tz = pytz.timezone(TIMEZONE)
+
+SCALES = {"100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# Bases del dataset sintético (nunca las de producción)
+BENCH_DB_LIST_ME = "ListMeBench"
+BENCH_DB_TRANSCRIBE_ME = "TranscribeMeBench"
+BENCH_DB_ROLLUPS = "ListMeBenchRollups"
+
+# Peso relativo de cada hora del día (hora local): poco uso de madrugada, picos a la tarde
+HOUR_WEIGHTS = np.array([2, 1, 1, 1, 1, 2, 4, 7, 10, 12, 13, 14, 15, 14, 13, 13, 14, 15, 16, 15, 12, 9, 6, 4],
+                        dtype=np.float64)
+
+ITEMS = ["leche", "pan", "huevos", "yerba", "azúcar", "harina", "arroz", "fideos", "tomate", "cebolla",
+         "papa", "queso", "manteca", "aceite", "sal", "café", "jabón", "detergente", "pollo", "carne",
+         "manzana", "banana", "lechuga", "zanahoria", "agua", "gaseosa", "galletitas", "dulce de leche"]
+
+BATCH_SIZE = 10_000
+
+
+def user_phone(index):
+    """user_id con forma de teléfono argentino (549 + 10 dígitos)"""
+    return 5491100000000 + int(index)
+
+
+def sample_created_at(rng, size, start, days, growth):
+    """
+    Timestamps de creación: el volumen diario crece linealmente (growth = volumen del último día
+    respecto del primero) y la hora del día sigue HOUR_WEIGHTS.
+    """
+    day_weights = np.linspace(1.0, growth, days)
+    day = rng.choice(days, size=size, p=day_weights / day_weights.sum())
+    hour = rng.choice(24, size=size, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    seconds = rng.integers(0, 3600, size=size)
+    return start.timestamp() + day * 86400 + hour * 3600 + seconds
+
+
+def generate_lists(rng, docs, users, start, days, growth, error_rate):
+    """
+    Genera los documentos de ListMe.lists en bloques de BATCH_SIZE.
+
+    Yields:
+        list: documentos listos para insert_many
+    """
+    # Listas por usuario con ley de potencias: el usuario de rango r pesa 1 / r^1.1
+    weights = 1.0 / np.power(np.arange(1, users + 1), 1.1)
+    weights /= weights.sum()
+    for offset in range(0, docs, BATCH_SIZE):
+        size = min(BATCH_SIZE, docs - offset)
+        user_ids = rng.choice(users, size=size, p=weights)
+        created_at = sample_created_at(rng, size, start, days, growth)
+        failed = rng.random(size) < error_rate
+        item_counts = rng.integers(1, 16, size=size)
+        first_items = rng.integers(0, len(ITEMS), size=size)
+        yield [{
+            "user_id": user_phone(user_ids[i]),
+            "created_at": float(created_at[i]),
+            "status": "error" if failed[i] else "active",
+            "items": [ITEMS[(first_items[i] + k) % len(ITEMS)] for k in range(item_counts[i])],
+        } for i in range(size)]
+
+
+def generate_notifications(rng, users, notified_ratio, start, days, growth):
+    """
+    Genera los documentos de TranscribeMe.notifications: una fracción de los usuarios recibe entre
+    1 y 3 notificaciones de listas (lists_notif ordenado).
+
+    Yields:
+        list: documentos listos para insert_many
+    """
+    notified = rng.choice(users, size=int(users * notified_ratio), replace=False)
+    for offset in range(0, len(notified), BATCH_SIZE):
+        block = notified[offset:offset + BATCH_SIZE]
+        counts = rng.integers(1, 4, size=len(block))
+        timestamps = sample_created_at(rng, int(counts.sum()), start, days, growth)
+        docs, position = [], 0
+        for user, count in zip(block, counts):
+            docs.append({"user": user_phone(user),
+                         "lists_notif": sorted(float(ts) for ts in timestamps[position:position + count])})
+            position += count
+        yield docs
+
+
+def load(client, docs, seed=42, users=None, start_date="2025-06-01", days=180, growth=3.0, error_rate=0.12,
+         notified_ratio=0.6, drop=False, create_indexes=True):
+    """
+    Carga el dataset en el mongod de client.
+
+    Args:
+        client: MongoClient del mongod local
+        docs: Cantidad de documentos de ListMe.lists
+        seed: Semilla del generador
+        users: Usuarios distintos (por defecto docs / 8)
+        start_date: Primer día del período (yyyy-mm-dd)
+        days: Días del período
+        growth: Volumen del último día respecto del primero
+        error_rate: Fracción de listas con status 'error'
+        notified_ratio: Fracción de usuarios con notificaciones
+        drop: Si es True borra las bases del benchmark antes de cargar
+        create_indexes: Si es True crea el índice de created_at sobre lists
+    """
+    rng = np.random.default_rng(seed)
+    users = users or max(docs // 8, 1)
+    start = tz.localize(datetime.strptime(start_date, "%Y-%m-%d"))
+
+    if drop:
+        for name in (BENCH_DB_LIST_ME, BENCH_DB_TRANSCRIBE_ME, BENCH_DB_ROLLUPS):
+            client.drop_database(name)
+
+    lists = client[BENCH_DB_LIST_ME]["lists"]
+    notifications = client[BENCH_DB_TRANSCRIBE_ME]["notifications"]
+
+    inserted = 0
+    for batch in generate_lists(rng, docs, users, start, days, growth, error_rate):
+        lists.insert_many(batch, ordered=False)
+        inserted += len(batch)
+        if inserted % (BATCH_SIZE * 50) == 0:
+            print(f"{inserted:,} / {docs:,} listas")
+    notified = 0
+    for batch in generate_notifications(rng, users, notified_ratio, start, days, growth):
+        notifications.insert_many(batch, ordered=False)
+        notified += len(batch)
+
+    if create_indexes:
+        lists.create_index("created_at")
+    print(f"Cargadas {inserted:,} listas de {users:,} usuarios y {notified:,} notificaciones")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Carga un dataset sintético de ListMe en un mongod local")
+    parser.add_argument("--scale", choices=SCALES, default="100k", help="Cantidad de listas a generar")
+    parser.add_argument("--docs", type=int, help="Cantidad exacta de listas (reemplaza --scale)")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del generador")
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help="URI del mongod local")
+    parser.add_argument("--start-date", default="2025-06-01", help="Primer día del período (yyyy-mm-dd)")
+    parser.add_argument("--days", type=int, default=180, help="Días del período")
+    parser.add_argument("--error-rate", type=float, default=0.12, help="Fracción de listas fallidas")
+    parser.add_argument("--drop", action="store_true", help="Borra las bases del benchmark antes de cargar")
+    parser.add_argument("--no-index", action="store_true", help="No crea el índice de created_at")
+    args = parser.parse_args()
+
+    load(pymongo.MongoClient(args.uri), args.docs or SCALES[args.scale], seed=args.seed, start_date=args.start_date,
+         days=args.days, error_rate=args.error_rate, drop=args.drop, create_indexes=not args.no_index)
@@ -0,0 +1,149 @@
+"""
+Benchmarks de la capa de datos sobre el dataset sintético (ver benchmarks/generate.py).
+
+Por cada función de get_data, la exportación en streaming del contenido de listas (CSV y Parquet)
+y opcionalmente los refrescos de los rollups informa:
+- tiempo de pared (mejor y mediana de --repeat corridas)
+- documentos examinados por el servidor (delta de metrics.queryExecutor.scannedObjects de serverStatus)
+- pico de memoria de Python (tracemalloc)
+
+Los resultados se pueden guardar con --output y comparar contra una corrida anterior con
+--baseline: las funciones que empeoran más que --tolerance se marcan como regresión y el
+proceso termina con código 1.
+
+Uso por línea de comandos:
+    python -m benchmarks.run
+    python -m benchmarks.run --rollups --repeat 5 --output bench_1m.json
+    python -m benchmarks.run --baseline bench_1m.json --tolerance 0.2
+"""
+import os
+
+# Los rollups del benchmark van a su propia base: se configura antes de importar config
+os.environ.setdefault("MONGO_DB_ROLLUPS", "ListMeBenchRollups")
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+import pymongo
+
+from benchmarks.generate import BENCH_DB_LIST_ME, BENCH_DB_TRANSCRIBE_ME
+from get_data import (parse_date_range, get_daily_data, get_new_user_lists_metrics_by_day, get_notified_users,
+                      get_dau_mau_ratio_data, get_daily_data_by_country)
+from export import EXTRA_COLUMNS, lists_content_query, iter_lists_content_csv, iter_lists_content_parquet, pa
+from countries import refresh_user_countries, refresh_daily_country_rollup
+from rollups import refresh_daily_rollup, refresh_user_first_seen, refresh_notified_daily
+
+
+def scanned_objects(client):
+    """Documentos examinados por el servidor desde que arrancó (serverStatus)"""
+    status = client.admin.command("serverStatus")
+    return status["metrics"]["queryExecutor"]["scannedObjects"]
+
+
+def measure(client, func, repeat):
+    """
+    Ejecuta func repeat veces y mide tiempo, documentos examinados y pico de memoria.
+
+    Returns:
+        dict: best_seconds, median_seconds, docs_examined (por corrida) y peak_mb
+    """
+    times, examined, peaks = [], [], []
+    for _ in range(repeat):
+        before = scanned_objects(client)
+        tracemalloc.start()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        examined.append(scanned_objects(client) - before)
+    return {
+        "best_seconds": min(times),
+        "median_seconds": statistics.median(times),
+        "docs_examined": int(statistics.median(examined)),
+        "peak_mb": max(peaks) / 1024 / 1024,
+    }
+
+
+def drain(chunks):
+    """Consume una exportación en streaming como lo haría la respuesta HTTP y devuelve los bytes generados"""
+    return sum(len(chunk) for chunk in chunks)
+
+
+def benchmarks(lists, notifications, start_date, end_date, rollups=False):
+    """Funciones a medir, en orden: nombre -> función sin argumentos"""
+    start, end = parse_date_range(start_date, end_date)
+    cases = {}
+    if rollups:
+        cases.update({
+            "refresh_daily_rollup(full)": lambda: refresh_daily_rollup(lists, full=True),
+            "refresh_user_first_seen(full)": lambda: refresh_user_first_seen(lists, full=True),
+            "refresh_notified_daily(full)": lambda: refresh_notified_daily(notifications, full=True),
+            "refresh_user_countries(full)": lambda: refresh_user_countries(lists, full=True),
+            "refresh_daily_country_rollup(full)": lambda: refresh_daily_country_rollup(lists, full=True),
+        })
+    cases.update({
+        "get_daily_data": lambda: get_daily_data(lists, start, end),
+        "get_new_user_lists_metrics_by_day": lambda: get_new_user_lists_metrics_by_day(start, end, lists),
+        "get_notified_users": lambda: get_notified_users(notifications, 'Daily', start, end),
+        "get_dau_mau_ratio_data": lambda: get_dau_mau_ratio_data(lists, start, end),
+        "get_daily_data_by_country": lambda: get_daily_data_by_country(lists, start, end),
+    })
+    # Exportación del rango con todas las columnas, igual que la descarga del dashboard
+    query = lists_content_query(start_date, end_date)
+    cases["iter_lists_content_csv"] = lambda: drain(iter_lists_content_csv(lists, query, EXTRA_COLUMNS))
+    if pa is not None:
+        cases["iter_lists_content_parquet"] = lambda: drain(iter_lists_content_parquet(lists, query, EXTRA_COLUMNS))
+    return cases
+
+
+def compare(results, baseline, tolerance):
+    """Devuelve las funciones cuya mediana empeoró más que tolerance respecto del baseline"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous and result["median_seconds"] > previous["median_seconds"] * (1 + tolerance):
+            regressions.append((name, previous["median_seconds"], result["median_seconds"]))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mide la capa de datos sobre el dataset sintético de ListMe")
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help="URI del mongod local")
+    parser.add_argument("--start-date", default="2025-06-01", help="Inicio del rango consultado (yyyy-mm-dd)")
+    parser.add_argument("--end-date", default="2025-11-27", help="Fin del rango consultado (yyyy-mm-dd)")
+    parser.add_argument("--repeat", type=int, default=3, help="Corridas por función")
+    parser.add_argument("--rollups", action="store_true", help="Incluye la reconstrucción completa de los rollups")
+    parser.add_argument("--output", help="Guarda los resultados en este archivo JSON")
+    parser.add_argument("--baseline", help="Resultados JSON de una corrida anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Empeoramiento tolerado respecto del baseline")
+    args = parser.parse_args()
+
+    client = pymongo.MongoClient(args.uri)
+    lists = client[BENCH_DB_LIST_ME]["lists"]
+    notifications = client[BENCH_DB_TRANSCRIBE_ME]["notifications"]
+    print(f"{lists.estimated_document_count():,} listas, {notifications.estimated_document_count():,} notificaciones")
+
+    results = {}
+    print(f"{'función':<36}{'mejor (s)':>12}{'mediana (s)':>14}{'docs examinados':>18}{'pico (MB)':>12}")
+    for name, func in benchmarks(lists, notifications, args.start_date, args.end_date, args.rollups).items():
+        result = measure(client, func, args.repeat)
+        results[name] = result
+        print(f"{name:<36}{result['best_seconds']:>12.3f}{result['median_seconds']:>14.3f}"
+              f"{result['docs_examined']:>18,}{result['peak_mb']:>12.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESIÓN {name}: {before:.3f}s -> {after:.3f}s")
+        if regressions:
+            sys.exit(1)
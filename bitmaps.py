@@ -0,0 +1,164 @@
+"""
+Bitmaps exactos de usuarios activos por día.
+
+Cada user_id recibe un índice denso (0, 1, 2, ...) guardado en la colección user_index. El conjunto
+de usuarios de un día es un entero de Python donde el bit i indica si el usuario con índice i estuvo
+activo; se guarda comprimido con zlib. Uniones e intersecciones son operaciones | y & sobre enteros,
+y el conteo es int.bit_count(), así que un mes se resuelve en milisegundos y sin aproximación.
+
+Solo los refrescos de los rollups asignan índices (assign_user_indexes). Las lecturas de los días
+todavía no consolidados solo consultan los índices existentes: los usuarios sin índice quedan como
+pendientes, guardados por user_id junto al bitmap. Un usuario pendiente no puede estar en ningún
+bitmap (los índices no se reasignan), así que las uniones y los conteos siguen siendo exactos;
+resolve_pending pasa a bits los pendientes que ya recibieron índice antes de combinar filas
+leídas en distintos momentos (por ejemplo, desde la cache por día).
+"""
+import json
+import zlib
+
+import numpy as np
+import pymongo
+
+from config import MONGO_COLLECTION_USER_INDEX, MONGO_COLLECTION_ROLLUP_STATE
+
+# Prefijo de los bitmaps serializados con usuarios pendientes (zlib siempre empieza con 0x78)
+_PENDING_MARK = b"P"
+
+
+class UserBitmap:
+    def __init__(self, bits=0, pending=frozenset()):
+        self.bits = bits
+        # user_ids sin índice denso todavía
+        self.pending = frozenset(pending)
+
+    @classmethod
+    def from_indexes(cls, indexes):
+        """Arma el bitmap con numpy (packbits) y una sola conversión a entero"""
+        indexes = np.fromiter(indexes, dtype=np.int64)
+        if not len(indexes):
+            return cls()
+        mask = np.zeros(int(indexes.max()) + 1, dtype=bool)
+        mask[indexes] = True
+        return cls(int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little'))
+
+    @classmethod
+    def from_user_ids(cls, user_ids, indexes):
+        """Bitmap de user_ids con su índice en indexes; los que no tienen índice quedan pendientes"""
+        user_ids = list(user_ids)
+        bitmap = cls.from_indexes(indexes[user_id] for user_id in user_ids if user_id in indexes)
+        bitmap.pending = frozenset(user_id for user_id in user_ids if user_id not in indexes)
+        return bitmap
+
+    def __or__(self, other):
+        return UserBitmap(self.bits | other.bits, self.pending | other.pending)
+
+    def __and__(self, other):
+        return UserBitmap(self.bits & other.bits, self.pending & other.pending)
+
+    def __sub__(self, other):
+        return UserBitmap(self.bits & ~other.bits, self.pending - other.pending)
+
+    def count(self):
+        return self.bits.bit_count() + len(self.pending)
+
+    def to_bytes(self):
+        data = self.bits.to_bytes((self.bits.bit_length() + 7) // 8, 'little')
+        if not self.pending:
+            return zlib.compress(data)
+        return _PENDING_MARK + zlib.compress(json.dumps({"bits": data.hex(), "pending": sorted(self.pending)}).encode())
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Reconstruye un bitmap serializado; data=None devuelve un bitmap vacío"""
+        if data is None:
+            return cls()
+        if data.startswith(_PENDING_MARK):
+            payload = json.loads(zlib.decompress(data[len(_PENDING_MARK):]))
+            return cls(int.from_bytes(bytes.fromhex(payload["bits"]), 'little'), payload["pending"])
+        return cls(int.from_bytes(zlib.decompress(data), 'little'))
+
+    @classmethod
+    def union(cls, bitmaps):
+        bits, pending = 0, set()
+        for bitmap in bitmaps:
+            bits |= bitmap.bits
+            pending |= bitmap.pending
+        return cls(bits, pending)
+
+
+def _read_indexes(index, user_ids):
+    indexes = {}
+    for i in range(0, len(user_ids), 1000):
+        for doc in index.find({"_id": {"$in": user_ids[i:i + 1000]}}):
+            indexes[doc["_id"]] = doc["idx"]
+    return indexes
+
+
+def get_user_indexes(db, user_ids):
+    """
+    Devuelve el índice denso de los user_ids que ya tienen uno (solo lectura: los que faltan no
+    aparecen en el resultado; ver assign_user_indexes).
+
+    Returns:
+        dict: user_id -> índice
+    """
+    return _read_indexes(db[MONGO_COLLECTION_USER_INDEX], list(set(user_ids)))
+
+
+def resolve_pending(db, rows, fields):
+    """
+    Pasa a bits los usuarios pendientes de los bitmaps (fields) de rows que ya tienen índice.
+    Devuelve filas nuevas (no modifica rows, que pueden venir de una cache en memoria).
+    """
+    bitmaps = [{field: UserBitmap.from_bytes(row[field]) for field in fields
+                if row.get(field) is not None and row[field].startswith(_PENDING_MARK)} for row in rows]
+    pending = set().union(*(bitmap.pending for row_bitmaps in bitmaps for bitmap in row_bitmaps.values()))
+    if not pending:
+        return rows
+    indexes = get_user_indexes(db, list(pending))
+    resolved = []
+    for row, row_bitmaps in zip(rows, bitmaps):
+        row = dict(row)
+        for field, bitmap in row_bitmaps.items():
+            known = UserBitmap.from_user_ids(bitmap.pending, indexes)
+            row[field] = UserBitmap(bitmap.bits | known.bits, known.pending).to_bytes()
+        resolved.append(row)
+    return resolved
+
+
+def assign_user_indexes(db, user_ids):
+    """
+    Devuelve el índice denso de cada user_id, asignando índices nuevos a los usuarios que todavía
+    no tienen uno. Solo la llaman los refrescos de los rollups. Es seguro entre procesos: si dos procesos asignan el mismo usuario a la vez,
+    gana el primero que inserta y el otro relee su índice.
+
+    Args:
+        db: Base de los rollups
+        user_ids: user_ids a resolver
+
+    Returns:
+        dict: user_id -> índice
+    """
+    index = db[MONGO_COLLECTION_USER_INDEX]
+    user_ids = list(set(user_ids))
+    indexes = _read_indexes(index, user_ids)
+
+    missing = [user_id for user_id in user_ids if user_id not in indexes]
+    if not missing:
+        return indexes
+
+    # Reservar un bloque de índices consecutivos
+    state = db[MONGO_COLLECTION_ROLLUP_STATE].find_one_and_update(
+        {"_id": MONGO_COLLECTION_USER_INDEX},
+        {"$inc": {"seq": len(missing)}},
+        upsert=True,
+        return_document=pymongo.ReturnDocument.AFTER
+    )
+    first = state["seq"] - len(missing)
+    try:
+        index.insert_many([{"_id": user_id, "idx": first + i} for i, user_id in enumerate(missing)], ordered=False)
+    except pymongo.errors.BulkWriteError:
+        # Otro proceso indexó alguno de estos usuarios: se usan los índices que quedaron guardados
+        pass
+    indexes.update(_read_indexes(index, missing))
+    return indexes
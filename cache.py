@@ -0,0 +1,428 @@
+import hashlib
+import os
+import pickle
+import random
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytz
+
+from config import (TIMEZONE, CACHE_TTL_LIVE_SECONDS, CACHE_TTL_HISTORIC_SECONDS, CACHE_BACKEND, CACHE_DIR,
+                    CACHE_REDIS_URL)
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+tz = pytz.timezone(TIMEZONE)
+
+
+class TTLCache:
+    """
+    Cache LRU con tamaño máximo y TTL por entrada, segura entre hilos.
+    Lleva contadores de hits, misses, evictions y expirations para dimensionarla.
+    """
+
+    def __init__(self, maxsize, default_ttl=CACHE_TTL_HISTORIC_SECONDS):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_many(self, keys):
+        """Devuelve un dict key -> valor con las claves presentes y vigentes (un solo lock)"""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    self.misses += 1
+                    continue
+                expires_at, value = entry
+                if expires_at <= now:
+                    del self._data[key]
+                    self.expirations += 1
+                    self.misses += 1
+                    continue
+                self._data.move_to_end(key)
+                self.hits += 1
+                found[key] = value
+        return found
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def set_many(self, items):
+        """Guarda varias entradas: items es un dict key -> (valor, ttl o None)"""
+        for key, (value, ttl) in items.items():
+            self.set(key, value, ttl)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Devuelve los contadores de la cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def serialize(value):
+    """Serializa un valor (DataFrames, tuplas de DataFrames, dicts) en forma compacta"""
+    return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def deserialize(data):
+    return pickle.loads(zlib.decompress(data))
+
+
+class DiskBackend:
+    """
+    Backend compartido en disco: un archivo por clave con el vencimiento en la cabecera.
+    Sirve para varios workers de gunicorn en la misma máquina.
+    """
+    _HEADER = struct.Struct('>d')
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    def get(self, key):
+        """Devuelve (payload, ttl restante) o None si no existe o venció"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        (expires_at,) = self._HEADER.unpack_from(data)
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            self._remove(path)
+            return None
+        return data[self._HEADER.size:], remaining
+
+    def get_many(self, keys):
+        """Devuelve un dict key -> (payload, ttl restante) con las claves presentes y vigentes"""
+        found = {}
+        for key in keys:
+            entry = self.get(key)
+            if entry is not None:
+                found[key] = entry
+        return found
+
+    def set(self, key, payload, ttl):
+        # Escritura atómica: archivo temporal + rename
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self._HEADER.pack(time.time() + ttl))
+            f.write(payload)
+        os.replace(tmp_path, self._path(key))
+        # De vez en cuando limpiar archivos vencidos
+        if random.random() < 0.01:
+            self.prune()
+
+    def prune(self):
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, 'rb') as f:
+                    (expires_at,) = self._HEADER.unpack(f.read(self._HEADER.size))
+            except (OSError, struct.error):
+                continue
+            if expires_at <= now:
+                self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class RedisBackend:
+    """Backend compartido en un servidor compatible con Redis"""
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requiere instalar el paquete redis")
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        """Devuelve (payload, ttl restante) o None si no existe o venció"""
+        pipe = self.client.pipeline()
+        pipe.get(key)
+        pipe.pttl(key)
+        payload, ttl_ms = pipe.execute()
+        if payload is None or ttl_ms <= 0:
+            return None
+        return payload, ttl_ms / 1000
+
+    def get_many(self, keys):
+        """Devuelve un dict key -> (payload, ttl restante) con las claves presentes y vigentes, en un solo viaje"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        pipe = self.client.pipeline()
+        pipe.mget(keys)
+        for key in keys:
+            pipe.pttl(key)
+        payloads, *ttls = pipe.execute()
+        return {key: (payload, ttl_ms / 1000) for key, payload, ttl_ms in zip(keys, payloads, ttls)
+                if payload is not None and ttl_ms > 0}
+
+    def set(self, key, payload, ttl):
+        self.client.set(key, payload, px=int(ttl * 1000))
+
+    def set_many(self, items):
+        """Guarda varias entradas en un solo viaje: items es un dict key -> (payload, ttl)"""
+        pipe = self.client.pipeline()
+        for key, (payload, ttl) in items.items():
+            pipe.set(key, payload, px=int(ttl * 1000))
+        pipe.execute()
+
+
+def get_shared_backend():
+    """Crea el backend compartido configurado en CACHE_BACKEND (None = solo memoria del proceso)"""
+    if CACHE_BACKEND == 'disk':
+        return DiskBackend(CACHE_DIR)
+    if CACHE_BACKEND == 'redis':
+        return RedisBackend(CACHE_REDIS_URL)
+    return None
+
+
+class SharedCache:
+    """
+    Cache en dos niveles: un TTLCache local por proceso y, si está configurado, un backend
+    compartido donde un worker deja los resultados serializados para el resto.
+    El backend debe ser de confianza: los valores se guardan con pickle.
+    """
+
+    def __init__(self, name, maxsize, backend=None, default_ttl=CACHE_TTL_HISTORIC_SECONDS):
+        self.name = name
+        self.local = TTLCache(maxsize, default_ttl)
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.shared_errors = 0
+
+    def _shared_key(self, key):
+        return f"dash-list-me:{self.name}:{key}"
+
+    def get(self, key, default=None):
+        value = self.local.get(key)
+        if value is not None or self.backend is None:
+            return default if value is None else value
+        try:
+            entry = self.backend.get(self._shared_key(key))
+        except Exception as e:
+            self.shared_errors += 1
+            print(f"Error leyendo la cache compartida '{self.name}': {e}")
+            return default
+        if entry is None:
+            self.shared_misses += 1
+            return default
+        payload, remaining = entry
+        value = deserialize(payload)
+        self.shared_hits += 1
+        self.local.set(key, value, remaining)
+        return value
+
+    def get_many(self, keys):
+        """
+        Como get para varias claves: las que no están en memoria se piden al backend compartido
+        en una sola consulta. Devuelve un dict key -> valor con las claves encontradas.
+        """
+        found = self.local.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if not missing or self.backend is None:
+            return found
+        try:
+            entries = self.backend.get_many([self._shared_key(key) for key in missing])
+        except Exception as e:
+            self.shared_errors += 1
+            print(f"Error leyendo la cache compartida '{self.name}': {e}")
+            return found
+        for key in missing:
+            entry = entries.get(self._shared_key(key))
+            if entry is None:
+                self.shared_misses += 1
+                continue
+            payload, remaining = entry
+            found[key] = deserialize(payload)
+            self.shared_hits += 1
+            self.local.set(key, found[key], remaining)
+        return found
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.local.set(key, value, ttl)
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(self._shared_key(key), serialize(value), ttl)
+        except Exception as e:
+            self.shared_errors += 1
+            print(f"Error escribiendo la cache compartida '{self.name}': {e}")
+
+    def set_many(self, items):
+        """Guarda varias entradas (dict key -> (valor, ttl o None)); al backend van en una sola escritura si la soporta"""
+        items = {key: (value, self.default_ttl if ttl is None else ttl) for key, (value, ttl) in items.items()}
+        self.local.set_many(items)
+        if self.backend is None:
+            return
+        payloads = {self._shared_key(key): (serialize(value), ttl) for key, (value, ttl) in items.items()}
+        try:
+            if hasattr(self.backend, 'set_many'):
+                self.backend.set_many(payloads)
+            else:
+                for key, (payload, ttl) in payloads.items():
+                    self.backend.set(key, payload, ttl)
+        except Exception as e:
+            self.shared_errors += 1
+            print(f"Error escribiendo la cache compartida '{self.name}': {e}")
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        stats = self.local.stats()
+        stats.update({
+            'backend': type(self.backend).__name__ if self.backend else 'memory',
+            'shared_hits': self.shared_hits,
+            'shared_misses': self.shared_misses,
+            'shared_errors': self.shared_errors,
+        })
+        return stats
+
+
+def frame_fingerprint(df):
+    """
+    Huella del contenido de un DataFrame (valores, índice y columnas). Dos frames con la misma
+    data tienen la misma huella aunque sean objetos distintos, así sirve como clave de cache.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(','.join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def ttl_for_range(end_date):
+    """
+    Devuelve el TTL para un rango que termina en end_date (yyyy-mm-dd): corto si el rango
+    incluye el día de hoy (los datos siguen cambiando) y largo si es un rango cerrado.
+    """
+    today = datetime.now(tz).strftime('%Y-%m-%d')
+    return CACHE_TTL_LIVE_SECONDS if end_date[:10] >= today else CACHE_TTL_HISTORIC_SECONDS
+
+
+def day_range(start_day, end_day):
+    """Lista de días yyyy-mm-dd entre start_day y end_day (inclusive)"""
+    current = datetime.fromisoformat(start_day[:10]).date()
+    last = datetime.fromisoformat(end_day[:10]).date()
+    days = []
+    while current <= last:
+        days.append(current.strftime('%Y-%m-%d'))
+        current += timedelta(days=1)
+    return days
+
+
+def get_days_cached(cache, prefix, start_day, end_day, fetch_range):
+    """
+    Arma las filas diarias de un rango a partir de una cache por día. Solo se consultan los
+    tramos de días que faltan en la cache y cada día se guarda por separado, así que mover el
+    inicio o el fin del rango reutiliza todos los días ya consultados. Los días se leen y se
+    escriben en bloque (get_many/set_many): con un backend compartido es un viaje por rango.
+
+    Args:
+        cache: TTLCache o SharedCache donde se guardan los días
+        prefix: Prefijo de la clave (tipo de dato)
+        start_day: Día inicial yyyy-mm-dd
+        end_day: Día final yyyy-mm-dd (inclusive)
+        fetch_range: Función (run_start, run_end) -> lista de filas dict con la columna 'date'
+
+    Returns:
+        list: filas de los días con datos, ordenadas por fecha
+    """
+    days = day_range(start_day, end_day)
+    cached = cache.get_many([f"{prefix}_{day}" for day in days])
+    rows = {}
+    missing = []
+    for day in days:
+        row = cached.get(f"{prefix}_{day}")
+        if row is None:
+            missing.append(day)
+        else:
+            rows[day] = row
+
+    # Consultar los tramos consecutivos de días faltantes
+    runs = []
+    for day in missing:
+        previous = (datetime.fromisoformat(day).date() - timedelta(days=1)).strftime('%Y-%m-%d')
+        if runs and runs[-1][1] == previous:
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    for run_start, run_end in runs:
+        fetched = {row['date']: row for row in fetch_range(run_start, run_end)}
+        entries = {}
+        for day in day_range(run_start, run_end):
+            # Los días sin datos se guardan como {} para no volver a consultarlos
+            row = fetched.get(day, {})
+            entries[f"{prefix}_{day}"] = (row, ttl_for_range(day))
+            rows[day] = row
+        cache.set_many(entries)
+
+    return [rows[day] for day in days if rows[day]]
@@ -1,60 +1,368 @@
-import pymongo
-from config import MONGO_URI, MONGO_DB_LIST_ME, MONGO_COLLECTION_LISTS, MONGO_DB_LIST_ME_TEST
-from dash import Input, Output, html, dcc
+from config import (MONGO_DB_LIST_ME, MONGO_COLLECTION_LISTS, MONGO_DB_LIST_ME_TEST, ROLLUP_REFRESH_SECONDS,
+                    CACHE_MAX_ENTRIES, CACHE_MAX_DAYS, CACHE_MAX_FIGURES, TOTAL_METRICS_REFRESH_SECONDS, TIMEZONE,
+                    MONGO_DB_TRANSCRIBE_ME, MONGO_COLLECTION_NOTIFICATIONS, CLIENTSIDE_CHARTS,
+                    ENSURE_INDEXES_ON_STARTUP, MONGO_COLLECTION_ROLLUP_STATE, CACHE_TTL_LIVE_SECONDS)
+from dash import Input, Output, State, ClientsideFunction, html, dcc
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-from datetime import datetime
+from datetime import datetime, timedelta
+import json
+import time
 import pandas as pd
-from get_data import (get_daily_data, group_monthly_data, get_new_user_lists_metrics_by_day, get_notified_users,
-                      merge_notified_and_active, calculate_total_metrics, get_dau_mau_ratio_data, parse_date_range,
-                      get_lists_content)
+import pytz
+from get_data import (group_monthly_data, get_notified_users, merge_notified_and_active, calculate_total_metrics,
+                      compute_dau_mau_ratio, parse_date_range, NEW_USERS_COLUMNS, DAU_MAU_COLUMNS,
+                      monthly_active_users, get_daily_data_by_country, get_new_user_lists_metrics_by_country,
+                      monthly_active_users_by_country, group_monthly_data_by_country, COUNTRY_NEW_USERS_COLUMNS,
+                      COUNTRY_MONTHLY_USERS_COLUMNS, monthly_returning_users, RETURNING_USERS_COLUMNS,
+                      sum_countries, daily_bitmaps_from_countries)
+from countries import COUNTRY_DAILY_COLUMNS, refresh_user_countries, refresh_daily_country_rollup
+from live import fold_new_lists, today_entries
+
+from cache import SharedCache, get_shared_backend, get_days_cached, ttl_for_range, frame_fingerprint
+from rollups import (DAILY_COLUMNS, BITMAP_FIELDS, refresh_daily_rollup, refresh_user_first_seen,
+                     refresh_notified_daily, get_rollup_db, run_with_lease)
+from bitmaps import resolve_pending
+from scheduler import start_periodic_task, start_background_task
+from indexes import ensure_indexes
+from db import get_client, analytics_database
+from export import export_url
+from concurrency import run_concurrently
+from metrics import timed_callback, register_collector, FIGURE_SECONDS
 
 from charts import (active_users_chart, lists_chart, new_users_chart, notified_chart,
-                    users_by_country, lists_by_country, funnel_chart, dau_mau_ratio_chart)
+                    users_by_country, lists_by_country, funnel_chart, dau_mau_ratio_chart, returning_users_chart,
+                    downsample_dates)
 
-client = pymongo.MongoClient(MONGO_URI)
-db = client[MONGO_DB_LIST_ME]
+client = get_client()
+# Las consultas del dashboard leen con la preferencia analítica (por defecto un secundario)
+db = analytics_database(client, MONGO_DB_LIST_ME)
 collection = db[MONGO_COLLECTION_LISTS]
-db_TranscribeMe = client['TranscribeMe']
-collection_notifications = db_TranscribeMe['notifications']
+db_TranscribeMe = analytics_database(client, MONGO_DB_TRANSCRIBE_ME)
+collection_notifications = db_TranscribeMe[MONGO_COLLECTION_NOTIFICATIONS]
 
 
-# Cache para gráficos (datos que cambian según filtros)
-_charts_cache = {}
+# Backend compartido entre workers (None si solo se cachea en memoria del proceso)
+_shared_backend = get_shared_backend()
 
-# Calcular métricas una sola vez al importar el módulo
-TOTAL_METRICS = calculate_total_metrics(collection)
+# Cache por día para gráficos: los rangos se arman a partir de los días ya consultados. Cada tipo
+# de dato tiene su propia cache de CACHE_MAX_DAYS días
+DAY_PREFIXES = ('notified', 'country_daily', 'country_new_users')
+_days_caches = {prefix: SharedCache(f'days_{prefix}', CACHE_MAX_DAYS, _shared_backend) for prefix in DAY_PREFIXES}
 
-def get_chart_data(view, start_date, end_date):
-    """Obtiene datos para gráficos con cache"""
-    cache_key = f"{view}_{start_date}_{end_date}"
-    
-    if cache_key not in _charts_cache:
-        print(f"Obteniendo datos para gráficos: {view} desde {start_date} hasta {end_date}")
-        start, end = parse_date_range(start_date, end_date)
-        data = get_daily_data(collection, start, end)
-        new_data = get_new_user_lists_metrics_by_day(start, end, collection)
-        if view == 'Daily':
-            _charts_cache[cache_key] = data, new_data
-        elif view == 'Monthly':
-            _charts_cache[cache_key] = group_monthly_data(data), group_monthly_data(new_data)
-    return _charts_cache[cache_key]
-
-# Cache para datos de ratio
-_ratio_cache = {}
-
-def get_ratio_data(start_date, end_date, countries=None):
-    """Obtiene datos de ratio DAU/MAU con cache"""
-    cache_key = f"ratio_{start_date}_{end_date}_{str(sorted(countries) if countries else [])}"
-    
-    if cache_key not in _ratio_cache:
-        print(f"Obteniendo datos de ratio DAU/MAU para {countries}")
-        start, end = parse_date_range(start_date, end_date)
-        _ratio_cache[cache_key] = get_dau_mau_ratio_data(collection, start, end, countries)
-    return _ratio_cache[cache_key]
+# Métricas totales: las calcula un hilo en segundo plano de un solo worker (lease total_metrics),
+# nunca el import ni un request. El último valor queda en rollup_state para los demás workers
+_totals_cache = SharedCache('totals', 1, _shared_backend)
+
+def refresh_total_metrics():
+    """
+    Recalcula las métricas totales si este worker obtiene el lease y las publica con su hora de
+    cálculo en rollup_state y en la cache. Los workers sin el lease no consultan nada.
+    """
+    rollup_db = get_rollup_db(collection)
+
+    def refresh():
+        metrics = calculate_total_metrics(collection)
+        metrics['as_of'] = datetime.now(pytz.timezone(TIMEZONE)).strftime('%Y-%m-%d %H:%M')
+        rollup_db[MONGO_COLLECTION_ROLLUP_STATE].update_one({"_id": "total_metrics"}, {"$set": {"metrics": metrics}},
+                                                            upsert=True)
+        _totals_cache.set('total_metrics', metrics, TOTAL_METRICS_REFRESH_SECONDS)
+        return metrics
+
+    return run_with_lease(rollup_db, 'total_metrics', refresh)
+
+def get_total_metrics():
+    """
+    Último valor calculado (por este u otro worker), o None si todavía no hay ninguno. Sin backend
+    compartido los workers que no calculan leen el valor publicado en rollup_state y lo guardan
+    por CACHE_TTL_LIVE_SECONDS.
+    """
+    metrics = _totals_cache.get('total_metrics')
+    if metrics is None:
+        state = get_rollup_db(collection)[MONGO_COLLECTION_ROLLUP_STATE].find_one({"_id": "total_metrics"},
+                                                                                 {"metrics": 1})
+        metrics = state.get('metrics') if state else None
+        if metrics is not None:
+            _totals_cache.set('total_metrics', metrics, CACHE_TTL_LIVE_SECONDS)
+    return metrics
+
+def _fetch_daily_rows(fetch):
+    """Adapta una función de get_data (start, end) -> DataFrame a filas de un tramo de días"""
+    def fetch_range(run_start, run_end):
+        print(f"Consultando Mongo desde {run_start} hasta {run_end}")
+        start, end = parse_date_range(run_start, run_end)
+        return fetch(start, end).to_dict('records')
+    return fetch_range
+
+def _fetch_country_rows(fetch):
+    """
+    Como _fetch_daily_rows para data con varias filas por día (una por país): cada día se cachea
+    como una sola fila {'date', 'rows'}
+    """
+    fetch_range = _fetch_daily_rows(fetch)
+    def fetch_country_range(run_start, run_end):
+        days = {}
+        for row in fetch_range(run_start, run_end):
+            days.setdefault(row['date'], []).append(row)
+        return [{'date': day, 'rows': rows} for day, rows in days.items()]
+    return fetch_country_range
+
+def _country_rows(prefix, fetch, start_date, end_date):
+    """Filas por día y país del rango (cacheadas por día)"""
+    days = get_days_cached(_days_caches[prefix], prefix, start_date, end_date, _fetch_country_rows(fetch))
+    return [row for day in days for row in day['rows']]
+
+def _country_daily_rows(start_date, end_date):
+    """
+    Filas de lists_daily_country del rango (cacheadas por día) con sus bitmaps, con los usuarios
+    pendientes que ya recibieron índice pasados a bits (ver bitmaps.resolve_pending)
+    """
+    rows = _country_rows('country_daily',
+                         lambda start, end: pd.DataFrame(get_daily_data_by_country(collection, start, end),
+                                                         columns=[*COUNTRY_DAILY_COLUMNS, *BITMAP_FIELDS]),
+                         start_date, end_date)
+    return resolve_pending(get_rollup_db(collection), rows, BITMAP_FIELDS)
+
+def _activity_bundle(start_date, end_date):
+    """
+    Todo lo que sale de lists_daily_country: métricas diarias por país y totales (suma de los
+    países), usuarios distintos por mes por país y totales (unión de los bitmaps de los países) y
+    usuarios que volvieron respecto del mes anterior (el primer mes se compara con el mes
+    calendario previo al rango)
+
+    Returns:
+        dict: 'daily', 'monthly_users', 'returning_users', 'country_daily' y 'country_monthly_users'
+    """
+    rows = _country_daily_rows(start_date, end_date)
+    previous_end = datetime.fromisoformat(start_date).date().replace(day=1) - timedelta(days=1)
+    previous_rows = _country_daily_rows(previous_end.replace(day=1).strftime('%Y-%m-%d'),
+                                        previous_end.strftime('%Y-%m-%d'))
+    country_daily = pd.DataFrame(rows, columns=COUNTRY_DAILY_COLUMNS)
+    bitmap_rows = daily_bitmaps_from_countries(rows)
+    return {
+        'daily': sum_countries(country_daily, DAILY_COLUMNS),
+        'monthly_users': monthly_active_users(bitmap_rows),
+        'returning_users': monthly_returning_users(bitmap_rows, daily_bitmaps_from_countries(previous_rows)),
+        'country_daily': country_daily,
+        'country_monthly_users': monthly_active_users_by_country(rows),
+    }
+
+def _new_users_bundle(start_date, end_date):
+    """
+    Usuarios nuevos por día y país (una sola lectura de user_first_seen por tramo de días) y
+    totales por día (suma de los países)
+
+    Returns:
+        dict: 'new_users' y 'country_new_users'
+    """
+    country_new_users = pd.DataFrame(
+        _country_rows('country_new_users',
+                      lambda start, end: get_new_user_lists_metrics_by_country(start, end, collection),
+                      start_date, end_date),
+        columns=COUNTRY_NEW_USERS_COLUMNS)
+    return {'new_users': sum_countries(country_new_users, NEW_USERS_COLUMNS), 'country_new_users': country_new_users}
+
+# Cache de bundles por rango: evita rearmarlos cuando varios callbacks piden el mismo rango
+_bundle_cache = SharedCache('bundle', CACHE_MAX_ENTRIES, _shared_backend)
+
+def _daily_frame(prefix, columns, fetch, start_date, end_date):
+    """Filas diarias del rango (cacheadas por día) como DataFrame con las columnas dadas"""
+    return pd.DataFrame(get_days_cached(_days_caches[prefix], prefix, start_date, end_date,
+                                        _fetch_daily_rows(fetch)), columns=columns)
+
+def get_data_bundle(start_date, end_date, refresh=False, executor=None):
+    """
+    Obtiene una sola vez cada fuente del rango (grano diario) y deriva en pandas lo que se
+    calcula a partir de ellas. Los gráficos generales y los de países usan el mismo bundle: los
+    totales diarios, los bitmaps y los usuarios nuevos salen de las mismas filas por país.
+    Con refresh=True no se usa el bundle cacheado y se rearma desde la cache por día (modo en vivo).
+    executor permite correr las consultas fuera del executor compartido (ver prewarm.py).
+
+    Returns:
+        dict: 'daily', 'new_users' y 'notified' (DataFrames diarios), 'monthly_users' (usuarios
+        distintos exactos por mes), 'returning_users' (activos del mes que ya lo estaban el mes
+        anterior), 'ratio' (DAU/MAU), lo mismo por país en 'country_daily',
+        'country_new_users', 'country_monthly_users' y 'country_ratio', y 'degraded' (fuentes que
+        fallaron o superaron su timeout y quedaron vacías; un bundle degradado no se cachea)
+    """
+    cache_key = f"bundle_{start_date}_{end_date}"
+    bundle = None if refresh else _bundle_cache.get(cache_key)
+    if bundle is not None:
+        return bundle
+
+    failed = []
+    results = run_concurrently(
+        {
+            # Actividad diaria, por país y por mes (ver countries.py)
+            'activity': lambda: _activity_bundle(start_date, end_date),
+            'new_users': lambda: _new_users_bundle(start_date, end_date),
+            # Data de usuarios notificados en el rango seleccionado
+            'notified': lambda: _daily_frame('notified', ['date', 'notified_users'],
+                                             lambda start, end: get_notified_users(collection_notifications, 'Daily',
+                                                                                   start, end),
+                                             start_date, end_date),
+        },
+        fallbacks={
+            'activity': {
+                'daily': pd.DataFrame(columns=DAILY_COLUMNS),
+                'monthly_users': pd.DataFrame(columns=['date', 'total_users', 'successful_users', 'failed_users']),
+                'returning_users': pd.DataFrame(columns=RETURNING_USERS_COLUMNS),
+                'country_daily': pd.DataFrame(columns=COUNTRY_DAILY_COLUMNS),
+                'country_monthly_users': pd.DataFrame(columns=COUNTRY_MONTHLY_USERS_COLUMNS),
+            },
+            'new_users': {
+                'new_users': pd.DataFrame(columns=NEW_USERS_COLUMNS),
+                'country_new_users': pd.DataFrame(columns=COUNTRY_NEW_USERS_COLUMNS),
+            },
+            'notified': pd.DataFrame(columns=['date', 'notified_users']),
+        },
+        failed=failed,
+        executor=executor
+    )
+    bundle = {**results['activity'], **results['new_users'], 'notified': results['notified']}
+    bundle['ratio'] = compute_dau_mau_ratio(bundle['daily'], bundle['monthly_users'])
+    bundle['country_ratio'] = compute_dau_mau_ratio(bundle['country_daily'], bundle['country_monthly_users'])
+    bundle['degraded'] = sorted(failed)
+    # Si alguna fuente falló se vuelve a consultar en el próximo pedido en lugar de cachear el hueco
+    if not failed:
+        _bundle_cache.set(cache_key, bundle, ttl_for_range(end_date))
+    return bundle
+
+# Estado del modo en vivo (ver live.py): una entrada por día, compartida entre workers
+_live_cache = SharedCache('live', 4, _shared_backend)
+
+def refresh_today():
+    """Suma al estado de hoy las listas posteriores al watermark y reemplaza las filas de hoy de la cache por día"""
+    state = fold_new_lists(collection, _live_cache)
+    for prefix, row in today_entries(state).items():
+        _days_caches[prefix].set(f"{prefix}_{state['date']}", row, ttl_for_range(state['date']))
+    return state
+
+def get_live_bundle(start_date, end_date):
+    """Bundle del rango con las cifras de hoy al día: solo consulta Mongo por las listas nuevas"""
+    refresh_today()
+    return get_data_bundle(start_date, end_date, refresh=True)
+
+def data_warning(bundle):
+    """Aviso para el layout si alguna fuente del bundle quedó vacía"""
+    if not bundle['degraded']:
+        return ""
+    return (f"Algunos datos no se pudieron consultar a tiempo ({', '.join(bundle['degraded'])}); "
+            f"los gráficos pueden estar incompletos. Vuelve a intentar en unos minutos.")
+
+def bundle_view(bundle, view):
+    """
+    Datos del bundle en la vista pedida (Daily o Monthly), agrupados en pandas.
+
+    Returns:
+        tuple: (data, new_users_data, notified_users)
+    """
+    data, new_users_data, notified = bundle['daily'], bundle['new_users'], bundle['notified']
+    if view == 'Monthly':
+        data = group_monthly_data(data, bundle['monthly_users'])
+        new_users_data = group_monthly_data(new_users_data)
+        notified = notified.assign(date=notified['date'].str[:7]).groupby('date')['notified_users'].sum().reset_index()
+    return data, new_users_data, notified
+
+def country_view(bundle, view):
+    """
+    Data por país del bundle en la vista pedida (Daily o Monthly).
+
+    Returns:
+        tuple: (data, new_users_data) con columna country
+    """
+    data, new_users_data = bundle['country_daily'], bundle['country_new_users']
+    if view == 'Monthly':
+        data = group_monthly_data_by_country(data, bundle['country_monthly_users'])
+        new_users_data = group_monthly_data_by_country(new_users_data)
+    return data, new_users_data
+
+def country_options(bundle):
+    """Países con actividad en el rango, de más a menos usuarios"""
+    daily = bundle['country_daily']
+    return daily.groupby('country')['total_users'].sum().sort_values(ascending=False).index.tolist()
+
+# Columnas de cada DataFrame del bundle, para rearmarlo desde el dcc.Store
+BUNDLE_COLUMNS = {
+    'daily': DAILY_COLUMNS,
+    'new_users': NEW_USERS_COLUMNS,
+    'notified': ['date', 'notified_users'],
+    'monthly_users': ['date', 'total_users', 'successful_users', 'failed_users'],
+    'returning_users': RETURNING_USERS_COLUMNS,
+    'ratio': DAU_MAU_COLUMNS,
+    'country_daily': COUNTRY_DAILY_COLUMNS,
+    'country_new_users': COUNTRY_NEW_USERS_COLUMNS,
+    'country_monthly_users': COUNTRY_MONTHLY_USERS_COLUMNS,
+    'country_ratio': DAU_MAU_COLUMNS,
+}
+
+def bundle_to_store(bundle):
+    """Serializa el bundle (grano diario) para guardarlo en el dcc.Store del navegador"""
+    return {name: bundle[name].to_dict('records') for name in BUNDLE_COLUMNS}
+
+def bundle_from_store(data):
+    """Rearma los DataFrames del bundle a partir del contenido del dcc.Store"""
+    data = data or {}
+    return {name: pd.DataFrame(data.get(name, []), columns=columns) for name, columns in BUNDLE_COLUMNS.items()}
+
+# Figuras ya convertidas a dict: si la data de un gráfico no cambió no se vuelve a armar ni a serializar
+_figure_cache = SharedCache('figures', CACHE_MAX_FIGURES, _shared_backend)
+
+def cached_figure(build, df, *args):
+    """
+    Devuelve la figura de build(df, *args) como dict, reutilizando el dict guardado si ya se armó
+    con la misma data (ver frame_fingerprint) y los mismos argumentos. El dict se arma una sola vez
+    (to_json deja los arrays de numpy como listas) y se devuelve tal cual: Dash solo lo serializa.
+    """
+    key = f"{build.__name__}_{frame_fingerprint(df)}_{args}"
+    figure = _figure_cache.get(key)
+    if figure is None:
+        start = time.perf_counter()
+        figure = json.loads(build(df.copy(), *args).to_json())
+        FIGURE_SECONDS.observe(time.perf_counter() - start, chart=build.__name__)
+        _figure_cache.set(key, figure)
+    return figure
+
+def cache_stats():
+    """Contadores de las caches de datos y de figuras, para dimensionarlas en producción"""
+    return {**{cache.name: cache.stats() for cache in _days_caches.values()},
+            'bundle': _bundle_cache.stats(), 'figures': _figure_cache.stats(), 'live': _live_cache.stats()}
+
+def cache_metrics():
+    """Contadores de las caches para /metrics (se leen en cada scrape)"""
+    samples = []
+    for cache, stats in cache_stats().items():
+        labels = {'cache': cache}
+        samples += [
+            ('dash_cache_hits_total', 'counter', 'Hits de la cache local', labels, stats['hits']),
+            ('dash_cache_misses_total', 'counter', 'Misses de la cache local', labels, stats['misses']),
+            ('dash_cache_hit_ratio', 'gauge', 'Hit ratio de la cache local', labels, stats['hit_ratio']),
+            ('dash_cache_entries', 'gauge', 'Entradas en la cache local', labels, stats['size']),
+            ('dash_cache_evictions_total', 'counter', 'Evictions de la cache local (LRU llena)', labels,
+             stats['evictions']),
+        ]
+    return sorted(samples, key=lambda sample: sample[0])
+
+register_collector(cache_metrics)
+
+def start_background_jobs():
+    """Inicia los refrescos periódicos de los rollups (no bloquea el arranque)"""
+    if ENSURE_INDEXES_ON_STARTUP:
+        start_background_task('ensure_indexes', lambda: ensure_indexes(client))
+    start_periodic_task('total_metrics', refresh_total_metrics, TOTAL_METRICS_REFRESH_SECONDS)
+    if ROLLUP_REFRESH_SECONDS > 0:
+        start_periodic_task('lists_daily', lambda: refresh_daily_rollup(collection), ROLLUP_REFRESH_SECONDS)
+        # El mapeo de países sale de los usuarios nuevos de user_first_seen y el rollup por país lo usa
+        start_periodic_task('user_first_seen',
+                            lambda: (refresh_user_first_seen(collection), refresh_user_countries(collection),
+                                     refresh_daily_country_rollup(collection)),
+                            ROLLUP_REFRESH_SECONDS)
+        start_periodic_task('notified_daily', lambda: refresh_notified_daily(collection_notifications),
+                            ROLLUP_REFRESH_SECONDS)
 
 def register_callbacks(app):
     
-    # Callback SOLO para métricas - valores fijos que NO cambian
+    # Callback SOLO para métricas - NO cambian con los filtros, se refrescan en segundo plano
     @app.callback(
         [
             Output('total_lists_attempted', 'children'),
@@ -63,29 +371,35 @@ def register_callbacks(app):
             Output('total_users', 'children'),
             Output('total_successful_users', 'children'),
             Output('total_failed_users', 'children'),
+            Output('total_metrics_as_of', 'children'),
         ],
-        [Input('start_date_picker', 'date')]  # Solo necesitamos un trigger, pero los valores no dependen de esto
+        [Input('start_date_picker', 'date'),
+         Input('total_metrics_interval', 'n_intervals')]
     )
-    def update_total_metrics(start_date):
-        """Retorna métricas totales fijas - NO cambian con los filtros"""
+    @timed_callback
+    def update_total_metrics(start_date, n_intervals):
+        """Retorna el último valor calculado de las métricas totales"""
+        metrics = get_total_metrics()
+        if metrics is None:
+            return ('...',) * 6 + ("Calculando métricas totales...",)
         return (
-            TOTAL_METRICS['total_lists_attempted'],
-            TOTAL_METRICS['total_lists_created'], 
-            TOTAL_METRICS['total_failed_lists'],
-            TOTAL_METRICS['total_users'], 
-            TOTAL_METRICS['total_successful_users'], 
-            TOTAL_METRICS['total_failed_users']
+            metrics['total_lists_attempted'],
+            metrics['total_lists_created'], 
+            metrics['total_failed_lists'],
+            metrics['total_users'], 
+            metrics['total_successful_users'], 
+            metrics['total_failed_users'],
+            f"Actualizado: {metrics['as_of']}"
         )
     
     # Callback para el contenido de las pestañas
     @app.callback(
         Output('tab-content', 'children'),
         [Input('main-tabs', 'value'), 
-         Input('view_selector', 'value'),
-         Input('start_date_picker', 'date'), 
-         Input('end_date_picker', 'date')]
+         Input('view_selector', 'value')]
     )
-    def render_tab_content(active_tab, view, start_date, end_date):
+    @timed_callback
+    def render_tab_content(active_tab, view):
         """Renderiza el contenido según la pestaña seleccionada"""
         
         if active_tab == 'general':
@@ -99,35 +413,162 @@ def register_callbacks(app):
                     html.Div([html.H3(f"{view} Notified Users", style={'textAlign': 'center'}), dcc.Graph(id='notified_fig')], style={'flex': '1', 'minWidth': '45%', 'margin': '10px', 'border': '1px solid #ddd', 'borderRadius': '5px', 'padding': '10px'}),
                     html.Div([html.H3("Notified and Active Users", style={'textAlign': 'center'}), dcc.Graph(id='notified_and_active_fig')], style={'flex': '1', 'minWidth': '45%', 'margin': '10px', 'border': '1px solid #ddd', 'borderRadius': '5px', 'padding': '10px'}),
                     html.Div([html.H3("Ratio", style={'textAlign': 'center'}), dcc.Graph(id='dau_mau_fig')], style={'flex': '1', 'minWidth': '45%', 'margin': '10px', 'border': '1px solid #ddd', 'borderRadius': '5px', 'padding': '10px'}),
+                    html.Div([html.H3("Returning Users", style={'textAlign': 'center'}), dcc.Graph(id='returning_users_fig')], style={'flex': '1', 'minWidth': '45%', 'margin': '10px', 'border': '1px solid #ddd', 'borderRadius': '5px', 'padding': '10px'}),
                 ], style={'display': 'flex', 'flexWrap': 'wrap', 'justifyContent': 'space-around'})
             ])
         elif active_tab == 'países':
-            # Obtener países disponibles para el período seleccionado
-            #start = datetime.strptime(start_date[:10], '%Y-%m-%d')
-            #end = datetime.strptime(end_date[:10], '%Y-%m-%d')
-            #start_date_str = start.strftime('%Y-%m-%d')
-            #end_date_str = end.strftime('%Y-%m-%d')
-            
-            #data = get_chart_data(view, start_date_str, end_date_str)
-            countries = ["Argentina"]
-            
+            # Las opciones salen de los países con actividad en el rango (ver update_country_options)
             return html.Div([
                 html.Label("Selecciona país(es):"),
                 dcc.Dropdown(
                     id="country_dropdown",
-                    options=[{"label": c, "value": c} for c in countries],
-                    value=["Argentina"] if "Argentina" in countries else [countries[0]] if len(countries) > 0 else [],
+                    options=[],
+                    value=[],
                     multi=True
                 ),
                 html.Div([html.H3(f"{view} Active Users", style={'textAlign': 'center'}), dcc.Graph(id='users_by_country')], style={'flex': '1', 'minWidth': '45%', 'margin': '10px', 'border': '1px solid #ddd', 'borderRadius': '5px', 'padding': '10px'}),
                 html.Div([html.H3(f"{view} Lists", style={'textAlign': 'center'}), dcc.Graph(id='lists_by_country')], style={'flex': '1', 'minWidth': '45%', 'margin': '10px', 'border': '1px solid #ddd', 'borderRadius': '5px', 'padding': '10px'}),
                 html.Div([html.H3(f"{view} New Users", style={'textAlign': 'center'}), dcc.Graph(id='new_users_by_country')], style={'flex': '1', 'minWidth': '45%', 'margin': '10px', 'border': '1px solid #ddd', 'borderRadius': '5px', 'padding': '10px'}),
                 html.Div([html.H3(f"{view} New Users Lists", style={'textAlign': 'center'}), dcc.Graph(id='new_users_lists_by_country')], style={'flex': '1', 'minWidth': '45%', 'margin': '10px', 'border': '1px solid #ddd', 'borderRadius': '5px', 'padding': '10px'}),
-                #html.Div([html.H3("DAU/MAU Ratio por Mes", style={'textAlign': 'center'}), dcc.Graph(id='dau_mau_ratio_chart')], style={'margin': '20px 10px', 'border': '1px solid #ddd', 'borderRadius': '5px', 'padding': '10px'})
+                html.Div([html.H3("DAU/MAU Ratio por Mes", style={'textAlign': 'center'}), dcc.Graph(id='dau_mau_ratio_chart')], style={'margin': '20px 10px', 'border': '1px solid #ddd', 'borderRadius': '5px', 'padding': '10px'})
             ])
         return html.Div([html.P("Selecciona una pestaña para ver el contenido.")])
     
-    # Callback para gráficos generales - SÍ cambian con filtros
+    # Único callback que consulta los datos del rango: los deja en grano diario en el dcc.Store
+    @app.callback(
+        [
+            Output('range_data', 'data'),
+            Output('data_warning', 'children')
+        ],
+        [
+            Input('start_date_picker', 'date'), 
+            Input('end_date_picker', 'date')
+        ]
+    )
+    @timed_callback
+    def update_range_data(start_date, end_date):
+        """Obtiene la data diaria del rango seleccionado (una consulta por fuente)"""
+        # Parsear fechas
+        start = datetime.strptime(start_date[:10], '%Y-%m-%d')
+        end = datetime.strptime(end_date[:10], '%Y-%m-%d')
+        bundle = get_data_bundle(start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+        return bundle_to_store(bundle), data_warning(bundle)
+
+    # Modo en vivo: el intervalo solo corre si el rango llega hasta hoy
+    @app.callback(
+        Output('live_interval', 'disabled'),
+        [
+            Input('live_mode', 'value'),
+            Input('end_date_picker', 'date')
+        ]
+    )
+    @timed_callback
+    def toggle_live_mode(live_mode, end_date):
+        """Activa el intervalo del modo en vivo si está elegido y el rango llega hasta hoy"""
+        today = datetime.now(pytz.timezone(TIMEZONE)).strftime('%Y-%m-%d')
+        return 'live' not in (live_mode or []) or not end_date or end_date[:10] < today
+
+    # En cada intervalo se suman las listas nuevas de hoy y se reemplaza el store (los gráficos
+    # se actualizan con los mismos callbacks que al cambiar el rango)
+    @app.callback(
+        [
+            Output('range_data', 'data', allow_duplicate=True),
+            Output('data_warning', 'children', allow_duplicate=True)
+        ],
+        Input('live_interval', 'n_intervals'),
+        [
+            State('start_date_picker', 'date'),
+            State('end_date_picker', 'date')
+        ],
+        prevent_initial_call=True
+    )
+    @timed_callback
+    def update_live_data(n_intervals, start_date, end_date):
+        """Rearma el rango con las cifras de hoy al día"""
+        today = datetime.now(pytz.timezone(TIMEZONE)).strftime('%Y-%m-%d')
+        if not start_date or not end_date or end_date[:10] < today:
+            raise PreventUpdate
+        bundle = get_live_bundle(start_date[:10], end_date[:10])
+        return bundle_to_store(bundle), data_warning(bundle)
+
+    # Opciones del filtro de países: los países con actividad en el rango, conservando los elegidos
+    @app.callback(
+        [
+            Output('country_dropdown', 'options'),
+            Output('country_dropdown', 'value')
+        ],
+        Input('range_data', 'data'),
+        State('country_dropdown', 'value')
+    )
+    @timed_callback
+    def update_country_options(range_data, selected):
+        """Arma las opciones del dropdown de países a partir de la data del store"""
+        countries = country_options(bundle_from_store(range_data))
+        return [{"label": country, "value": country} for country in countries], default_countries(countries, selected)
+
+    # Gráficos: se arman en el servidor o en el navegador según CLIENTSIDE_CHARTS
+    if CLIENTSIDE_CHARTS:
+        register_clientside_chart_callbacks(app)
+    else:
+        register_server_chart_callbacks(app)
+
+    # La descarga se sirve en streaming desde /export (ver export.py); acá solo se arma el link
+    @app.callback(
+        Output("export_link", "href"),
+        [
+            Input("export_format", "value"),
+            Input("export_columns", "value"),
+            Input("export_gzip", "value"),
+            Input('start_date_picker', 'date'),
+            Input('end_date_picker', 'date'),
+        ]
+    )
+    @timed_callback
+    def update_export_link(export_format, columns, gzip, start_date, end_date):
+        return export_url(export_format, start_date, end_date, columns, bool(gzip))
+
+def general_figures(bundle, view):
+    """Figuras de la pestaña general (o las ya serializadas para la misma data)"""
+    data, new_users_data, notified_users = bundle_view(bundle, view)
+    ratio_data = bundle['ratio']
+    # Mergeando la data
+    notified_and_active  = merge_notified_and_active(notified_users, new_users_data)
+
+    # Generar gráficos (o reutilizar los ya serializados para la misma data)
+    active_users_fig = cached_figure(active_users_chart, data, view)
+    lists_fig = cached_figure(lists_chart, data, view)
+    new_users_fig = cached_figure(new_users_chart, new_users_data, view)
+    new_users_list_fig = cached_figure(lists_chart, new_users_data, view)
+    notified_fig = cached_figure(notified_chart, notified_users, view)
+    notified_and_active_fig = cached_figure(funnel_chart, notified_and_active)
+    dau_mau_fig = cached_figure(dau_mau_ratio_chart, ratio_data, None)
+    returning_users_fig = cached_figure(returning_users_chart, bundle['returning_users'])
+
+    return (active_users_fig, lists_fig, new_users_fig, new_users_list_fig, notified_fig, notified_and_active_fig,
+            dau_mau_fig, returning_users_fig)
+
+def country_figures(bundle, view, countries):
+    """Figuras de la pestaña de países para los países elegidos"""
+    data, new_users_data = country_view(bundle, view)
+
+    # Generar gráficos por país
+    users_by_country_fig = cached_figure(users_by_country, data, countries, view)
+    lists_by_country_fig = cached_figure(lists_by_country, data, countries, view)
+    new_users_by_country_fig = cached_figure(users_by_country, new_users_data, countries, view)
+    new_users_lists_by_country_fig = cached_figure(lists_by_country, new_users_data, countries, view)
+    dau_mau_ratio_fig = cached_figure(dau_mau_ratio_chart, bundle['country_ratio'], countries)
+
+    return (users_by_country_fig, lists_by_country_fig, new_users_by_country_fig, new_users_lists_by_country_fig,
+            dau_mau_ratio_fig)
+
+def default_countries(countries, selected=None):
+    """Países elegidos que siguen en las opciones, o el de más usuarios si no queda ninguno"""
+    return [country for country in selected or [] if country in countries] or countries[:1]
+
+def register_server_chart_callbacks(app):
+    """Gráficos armados en el servidor con charts.py"""
+
+    # Callback para gráficos generales - SÍ cambian con filtros (sin consultar Mongo)
     @app.callback(
         [
             Output('active_users_fig', 'figure'),
@@ -136,80 +577,112 @@ def register_callbacks(app):
             Output('new_users_lists_fig', 'figure'),
             Output('notified_fig', 'figure'),
             Output ('notified_and_active_fig', 'figure'),
-            Output('dau_mau_fig', 'figure')
+            Output('dau_mau_fig', 'figure'),
+            Output('returning_users_fig', 'figure')
         ],
         [
-            Input('start_date_picker', 'date'), 
-            Input('end_date_picker', 'date'),
+            Input('range_data', 'data'),
             Input('view_selector', 'value')
         ]
     )
-    def update_general_charts(start_date, end_date, view):
+    @timed_callback
+    def update_general_charts(range_data, view):
         """Actualiza gráficos generales según filtros seleccionados"""
-        # Parsear fechas
-        start = datetime.strptime(start_date[:10], '%Y-%m-%d')
-        end = datetime.strptime(end_date[:10], '%Y-%m-%d')
-        start_date_str = start.strftime('%Y-%m-%d')
-        end_date_str = end.strftime('%Y-%m-%d')
-        
-        # Obtener datos para el período seleccionado
-        data, new_users_data = get_chart_data(view, start_date_str, end_date_str)
-        ratio_data = get_ratio_data(start_date_str, end_date_str)
-        # Data de usuaarios notificados
-        notified_users = get_notified_users(collection_notifications, view)
-        # Mergeando la data
-        notified_and_active  = merge_notified_and_active(notified_users, new_users_data)
-
-        # Generar gráficos
-        active_users_fig = active_users_chart(data, view)
-        lists_fig = lists_chart(data, view)
-        new_users_fig = new_users_chart(new_users_data, view)
-        new_users_list_fig = lists_chart(new_users_data, view)
-        notified_fig = notified_chart(notified_users, view)
-        notified_and_active_fig = funnel_chart(notified_and_active)
-        dau_mau_fig = dau_mau_ratio_chart (ratio_data, ['Argentina'])
-        
-        return active_users_fig, lists_fig, new_users_fig, new_users_list_fig, notified_fig, notified_and_active_fig, dau_mau_fig
+        # Datos del período seleccionado ya cargados en el store: la vista se arma en pandas
+        return general_figures(bundle_from_store(range_data), view)
     
-    # Callback para gráficos por país - SÍ cambian con filtros
+    # Callback para gráficos por país - SÍ cambian con filtros (sin consultar Mongo)
     @app.callback(
         [
             Output('users_by_country', 'figure'),
             Output('lists_by_country', 'figure'),
             Output('new_users_by_country', 'figure'),
             Output('new_users_lists_by_country', 'figure'),
+            Output('dau_mau_ratio_chart', 'figure'),
         ],
         [
-            Input('start_date_picker', 'date'), 
-            Input('end_date_picker', 'date'),
+            Input('range_data', 'data'),
             Input('view_selector', 'value'),
             Input("country_dropdown", "value")
         ]
     )
-    def update_charts_by_country(start_date, end_date, view, countries):
+    @timed_callback
+    def update_charts_by_country(range_data, view, countries):
         """Actualiza gráficos por país según filtros seleccionados"""
-        # Parsear fechas
-        start = datetime.strptime(start_date[:10], '%Y-%m-%d')
-        end = datetime.strptime(end_date[:10], '%Y-%m-%d')
-        start_date_str = start.strftime('%Y-%m-%d')
-        end_date_str = end.strftime('%Y-%m-%d')
+        # Datos del período seleccionado ya cargados en el store (los mismos que los gráficos generales)
+        return country_figures(bundle_from_store(range_data), view, countries)
 
-        # Obtener datos para el período seleccionado
-        data, new_users_data = get_chart_data(view, start_date_str, end_date_str)
+def chart_columns(bundle, view):
+    """
+    Columnas que necesita assets/charts.js para armar los gráficos en el navegador: solo las
+    fechas y los vectores de cada métrica en la vista pedida, sin la estructura de las figuras.
+    Por encima de CHART_MAX_POINTS fechas las series se reducen con LTTB antes de enviarlas, igual
+    que en los gráficos armados en el servidor (el funnel usa la data completa).
+    """
+    data, new_users_data, notified_users = bundle_view(bundle, view)
+    notified_and_active = merge_notified_and_active(notified_users, new_users_data)
+    country_data, country_new_users = country_view(bundle, view)
+    data, _ = downsample_dates(data, DAILY_COLUMNS[1:])
+    new_users_data, _ = downsample_dates(new_users_data, NEW_USERS_COLUMNS[1:])
+    notified_users, _ = downsample_dates(notified_users, ['notified_users'])
+    # Los países comparten las fechas elegidas sobre el total, así se siguen apilando en el navegador
+    country_data, _ = downsample_dates(country_data, ['total_users', 'created_lists'])
+    country_new_users, _ = downsample_dates(country_new_users, ['total_users', 'created_lists'])
+    return {
+        'view': view,
+        'daily': data.to_dict('list'),
+        'new_users': new_users_data.to_dict('list'),
+        'notified': notified_users.to_dict('list'),
+        'funnel': {'notified_users': int(notified_and_active['notified_users'].sum()),
+                   'total_users': int(notified_and_active['total_users'].sum())},
+        'ratio': bundle['ratio'].to_dict('list'),
+        'returning_users': bundle['returning_users'].to_dict('list'),
+        'country_daily': country_data.to_dict('list'),
+        'country_new_users': country_new_users.to_dict('list'),
+        'country_ratio': bundle['country_ratio'].to_dict('list'),
+    }
 
-        # Generar gráficos por país
-        users_by_country_fig = users_by_country(data, countries, view)
-        lists_by_country_fig = lists_by_country (data, countries, view)
-        new_users_by_country_fig = users_by_country(new_users_data, countries, view)
-        new_users_lists_by_country_fig = lists_by_country (new_users_data, countries, view)
+def register_clientside_chart_callbacks(app):
+    """Gráficos armados en el navegador: el servidor solo calcula las columnas de la vista"""
 
-        return users_by_country_fig, lists_by_country_fig, new_users_by_country_fig, new_users_lists_by_country_fig
-    
     @app.callback(
-        Output("download-dataframe-csv", "data"),
-        Input("btn_csv", "n_clicks"),
-        prevent_initial_call=True,
+        Output('chart_columns', 'data'),
+        [
+            Input('range_data', 'data'),
+            Input('view_selector', 'value')
+        ]
+    )
+    @timed_callback
+    def update_chart_columns(range_data, view):
+        """Agrupa la data del store en la vista elegida y la envía como columnas"""
+        return chart_columns(bundle_from_store(range_data), view)
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='charts', function_name='general'),
+        [
+            Output('active_users_fig', 'figure'),
+            Output('lists_fig', 'figure'),
+            Output('new_users_fig', 'figure'),
+            Output('new_users_lists_fig', 'figure'),
+            Output('notified_fig', 'figure'),
+            Output('notified_and_active_fig', 'figure'),
+            Output('dau_mau_fig', 'figure'),
+            Output('returning_users_fig', 'figure')
+        ],
+        Input('chart_columns', 'data')
+    )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='charts', function_name='byCountry'),
+        [
+            Output('users_by_country', 'figure'),
+            Output('lists_by_country', 'figure'),
+            Output('new_users_by_country', 'figure'),
+            Output('new_users_lists_by_country', 'figure'),
+            Output('dau_mau_ratio_chart', 'figure'),
+        ],
+        [
+            Input('chart_columns', 'data'),
+            Input("country_dropdown", "value")
+        ]
     )
-    def func(n_clicks):
-        df = get_lists_content(collection)
-        return dcc.send_data_frame(df.to_csv, "contenido_listas.csv", index = False)
@@ -1,104 +1,231 @@
+import math
+
+import numpy as np
 import plotly.graph_objs as go
-import plotly.express as px
 import pandas as pd
 
+from config import CHART_MAX_POINTS
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Índices de los puntos que conserva Largest-Triangle-Three-Buckets: reduce una serie a
+    threshold puntos manteniendo su forma (picos y valles), siempre con el primero y el último.
+
+    Args:
+        x: Valores numéricos del eje x (crecientes)
+        y: Valores de la serie
+        threshold: Cantidad de puntos a conservar
+
+    Returns:
+        np.ndarray: índices ordenados de los puntos elegidos
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    indices = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # Promedio del bucket siguiente (tercer vértice del triángulo)
+        next_start = int(math.floor((i + 1) * every)) + 1
+        next_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # Punto del bucket actual que forma el triángulo de mayor área
+        start = int(math.floor(i * every)) + 1
+        end = next_start
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        indices.append(a)
+    indices.append(n - 1)
+    return np.array(indices)
+
+def downsample(df, y, max_points=CHART_MAX_POINTS):
+    """
+    Reduce df a max_points filas con LTTB sobre la columna y (max_points=0 no reduce).
+
+    Returns:
+        tuple: (DataFrame reducido, cantidad de puntos descartados)
+    """
+    if not max_points or len(df) <= max_points:
+        return df, 0
+    x = pd.to_datetime(df["date"]).astype("int64")
+    kept = df.iloc[lttb_indices(x, df[y].fillna(0), max_points)]
+    return kept, len(df) - len(kept)
+
+def downsample_dates(df, columns, max_points=CHART_MAX_POINTS):
+    """
+    Reduce df (una o varias filas por fecha, por ejemplo una por país) a las fechas que elige LTTB
+    sobre el total por fecha de cada columna de columns. Todas las series y todos los países
+    quedan con las mismas fechas, así se pueden seguir apilando (max_points=0 no reduce).
+
+    Returns:
+        tuple: (DataFrame reducido, cantidad de fechas descartadas)
+    """
+    totals = df.groupby("date", sort=True)[columns].sum()
+    if not max_points or len(totals) <= max_points:
+        return df, 0
+    x = pd.to_datetime(totals.index).astype("int64")
+    kept = set()
+    for column in columns:
+        kept.update(totals.index[lttb_indices(x, totals[column].fillna(0), max_points)])
+    return df[df["date"].isin(kept)], len(totals) - len(kept)
+
+def add_area_trace(fig, df, y, name, color):
+    """
+    Agrega una serie con relleno. Por encima de CHART_MAX_POINTS la serie se reduce con LTTB y
+    se dibuja con WebGL (Scattergl) sin marcadores.
+
+    Returns:
+        int: puntos descartados
+    """
+    if not CHART_MAX_POINTS or len(df) <= CHART_MAX_POINTS:
+        fig.add_scatter(x=df["date"], y=df[y], mode='lines+markers', name=name, fill='tozeroy',
+                        line=dict(color=color), marker=dict(size=4, symbol='circle'))
+        return 0
+    kept, dropped = downsample(df, y)
+    fig.add_trace(go.Scattergl(x=kept["date"], y=kept[y], mode='lines', name=name, fill='tozeroy',
+                               line=dict(color=color)))
+    return dropped
+
+def report_downsampling(fig, dropped, total):
+    """Deja en la figura cuántos puntos se descartaron (layout.meta y una nota al pie)"""
+    if not dropped:
+        return fig
+    fig.update_layout(meta={'downsampled': True, 'dropped_points': int(dropped), 'max_points': CHART_MAX_POINTS})
+    fig.add_annotation(text=f"{total:,} puntos por serie, se muestran {CHART_MAX_POINTS:,} (LTTB)",
+                       xref="paper", yref="paper", x=1, y=-0.2, xanchor="right", showarrow=False,
+                       font=dict(size=10, color="#888"))
+    return fig
+
 def active_users_chart(df, view):
     fig = go.Figure()
+    dropped = 0
     # Active Users
-    fig.add_scatter(x=df["date"], y=df["total_users"], mode='lines+markers', name='Total Users', fill='tozeroy',
-                    line=dict(color="#2C16AD"),marker=dict(size=4, symbol='circle'))
+    dropped += add_area_trace(fig, df, "total_users", 'Total Users', "#2C16AD")
     # Exitosos
-    fig.add_scatter(x=df["date"], y=df["successful_users"],mode='lines+markers', name='Successful Users', fill='tozeroy',
-                    line=dict(color="#11B911"), marker=dict(size=4, symbol='circle'))
+    dropped += add_area_trace(fig, df, "successful_users", 'Successful Users', "#11B911")
     
     # Fallidos
-    fig.add_scatter(x=df["date"], y=df["failed_users"],mode='lines+markers', name='Failed Users', fill='tozeroy',
-                    line=dict(color="#B91111"), marker=dict(size=4, symbol='circle'))
+    dropped += add_area_trace(fig, df, "failed_users", 'Failed Users', "#B91111")
     
     #fig.update_xaxes(type='category')
     # Estética general
     fig.update_layout(title=f"{view} Total Active Users", yaxis_title="Users", xaxis_title="date",
                         yaxis_tickformat=',', title_x=0.5)
-    return fig
+    return report_downsampling(fig, dropped, len(df))
+
+def returning_users_chart(df):
+    """Usuarios activos de cada mes y cuántos de ellos ya habían estado activos el mes anterior"""
+    fig = go.Figure()
+    dropped = 0
+    dropped += add_area_trace(fig, df, "active_users", 'Active Users', "#2C16AD")
+    dropped += add_area_trace(fig, df, "returning_users", 'Returning Users', "#11B911")
+
+    fig.update_layout(title="Monthly Returning Users", yaxis_title="Users", xaxis_title="date",
+                        yaxis_tickformat=',', title_x=0.5)
+    return report_downsampling(fig, dropped, len(df))
 
 def new_users_chart(df, view):
     fig = go.Figure()
+    dropped = 0
     # Active Users
-    fig.add_scatter(x=df["date"], y=df["total_users"], mode='lines+markers', name='Total New Users', fill='tozeroy',
-                    line=dict(color="#2C16AD"),marker=dict(size=4, symbol='circle'))
+    dropped += add_area_trace(fig, df, "total_users", 'Total New Users', "#2C16AD")
     # Exitosos
-    fig.add_scatter(x=df["date"], y=df["successful_users"],mode='lines+markers', name='Successful New Users', fill='tozeroy',
-                    line=dict(color="#11B911"), marker=dict(size=4, symbol='circle'))
+    dropped += add_area_trace(fig, df, "successful_users", 'Successful New Users', "#11B911")
     
     # Fallidos
-    fig.add_scatter(x=df["date"], y=df["failed_users"],mode='lines+markers', name='Failed New Users', fill='tozeroy',
-                    line=dict(color="#B91111"), marker=dict(size=4, symbol='circle'))
+    dropped += add_area_trace(fig, df, "failed_users", 'Failed New Users', "#B91111")
 
     #fig.update_xaxes(type='category')
     # Estética general
     fig.update_layout(title=f"{view} Total Active New Users", yaxis_title="Users", xaxis_title="date",
                         yaxis_tickformat=',', title_x=0.5)
-    return fig
+    return report_downsampling(fig, dropped, len(df))
 
 
 def lists_chart(df, view):
     fig = go.Figure()
+    dropped = 0
     # Active Users
-    fig.add_scatter(x=df["date"], y=df["total_lists"], mode='lines+markers', name='Total Lists', fill='tozeroy',
-                    line=dict(color="#2C16AD"),marker=dict(size=4, symbol='circle'))
+    dropped += add_area_trace(fig, df, "total_lists", 'Total Lists', "#2C16AD")
     # Exitosos
-    fig.add_scatter(x=df["date"], y=df["created_lists"],mode='lines+markers', name='Successful Lists', fill='tozeroy',
-                    line=dict(color="#11B911"), marker=dict(size=4, symbol='circle'))
+    dropped += add_area_trace(fig, df, "created_lists", 'Successful Lists', "#11B911")
     
     # Fallidos
-    fig.add_scatter(x=df["date"], y=df["failed_lists"],mode='lines+markers', name='Failed Lists', fill='tozeroy',
-                    line=dict(color="#B91111"), marker=dict(size=4, symbol='circle'))
+    dropped += add_area_trace(fig, df, "failed_lists", 'Failed Lists', "#B91111")
     
     #fig.update_xaxes(type='category')
     # Estética general
     fig.update_layout(title=f"{view} Lists", yaxis_title="Count", xaxis_title="date",
                         yaxis_tickformat=',', title_x=0.5)
-    return fig
+    return report_downsampling(fig, dropped, len(df))
 
 def users_percentage_chart(df, view):
     # Calculate percentage of new users
     df = df.copy()
     df['new_users_percentage'] = round((df['new_users'] / df['count'] * 100).fillna(0), 2)
     fig = go.Figure()
-    fig.add_scatter(x=df["date"], y=df["new_users_percentage"],mode='lines+markers', name='Percentage', fill='tozeroy',
-                    line=dict(color="#6BC26B"), marker=dict(size=4, symbol='circle'))
+    dropped = add_area_trace(fig, df, "new_users_percentage", 'Percentage', "#6BC26B")
     # Estética general
     fig.update_layout(title=f'Percentage of New Users relative to Total {view} Active Users', yaxis_title="Percentage", xaxis_title="date",
                         yaxis_tickformat=',', title_x=0.5)
-    return fig
+    return report_downsampling(fig, dropped, len(df))
 
 def notified_chart(df, view):
     fig = go.Figure()
+    dropped = 0
     # Notified
-    fig.add_scatter(x=df["date"], y=df["notified_users"], mode='lines+markers', name='Notified Users', fill='tozeroy',
-                    line=dict(color="#2C16AD"),marker=dict(size=4, symbol='circle'))
+    dropped += add_area_trace(fig, df, "notified_users", 'Notified Users', "#2C16AD")
     
     #fig.update_xaxes(type='category')
     # Estética general
     fig.update_layout(title=f"{view} Notified Users", yaxis_title="Users", xaxis_title="date",
                         yaxis_tickformat=',', title_x=0.5)
-    return fig
+    return report_downsampling(fig, dropped, len(df))
+
+def country_area_chart(filtered, y, title):
+    """
+    Área apilada por país, una traza por país sobre un eje de categorías. Por encima de
+    CHART_MAX_POINTS se sigue apilando sin stackgroup (que Scattergl no soporta): cada país se
+    dibuja con WebGL sobre un eje de fechas como la suma acumulada de los países anteriores, con
+    las fechas que elige LTTB sobre el total, rellenando hasta la traza anterior. El hover muestra
+    el valor propio del país.
+    """
+    groups = list(filtered.groupby("country", sort=False))
+    points = filtered["date"].nunique()
+    fig = go.Figure()
+    if not CHART_MAX_POINTS or points <= CHART_MAX_POINTS:
+        for country, group in groups:
+            fig.add_trace(go.Scatter(x=group["date"], y=group[y], name=country, mode='lines+markers',
+                                     marker=dict(size=4, symbol='circle'), stackgroup='1'))
+        fig.update_xaxes(type='category', categoryorder='category ascending')
+        fig.update_layout(title=title, legend_title_text="country")
+        return fig
+    # Una columna por país (en el orden de la selección) y una fila por fecha, con 0 en los huecos
+    wide = filtered.pivot_table(index="date", columns="country", values=y, aggfunc="sum", fill_value=0)
+    wide = wide[[country for country, _ in groups]].sort_index()
+    cumulative = wide.cumsum(axis=1)
+    kept = lttb_indices(pd.to_datetime(wide.index).astype("int64"), cumulative.iloc[:, -1], CHART_MAX_POINTS)
+    for i, country in enumerate(wide.columns):
+        fig.add_trace(go.Scattergl(x=wide.index[kept], y=cumulative[country].iloc[kept], name=country, mode='lines',
+                                   customdata=wide[country].iloc[kept], fill='tozeroy' if i == 0 else 'tonexty',
+                                   hovertemplate='%{customdata:,}'))
+    fig.update_layout(title=title, legend_title_text="country")
+    return report_downsampling(fig, (len(wide) - len(kept)) * len(wide.columns), points)
 
 def users_by_country (data, countries, view):
-    data['country'] = countries[0]
     filtered = data[data["country"].isin(countries)]
-    fig = px.area(filtered, x="date", y="total_users", color="country", title=f"{view} Active Users")
-    fig.update_traces(mode='lines+markers', marker=dict(size=4, symbol='circle'))
-    fig.update_xaxes(type='category')
+    fig = country_area_chart(filtered, "total_users", f"{view} Active Users")
     fig.update_layout(yaxis_title="Users", xaxis_title="date", yaxis_tickformat=',', title_x=0.5)
     return fig
 
 def lists_by_country (data, countries, view):
-    data['country'] = countries[0]
     filtered = data[data["country"].isin(countries)]
-    fig = px.area(filtered, x="date", y="created_lists", color="country", title=f"{view} Successful")
-    fig.update_traces(mode='lines+markers', marker=dict(size=4, symbol='circle'))
-    fig.update_xaxes(type='category')
+    fig = country_area_chart(filtered, "created_lists", f"{view} Successful")
     fig.update_layout(yaxis_title="Lists", xaxis_title="date", yaxis_tickformat=',', title_x=0.5)
     return fig
 
@@ -130,12 +257,13 @@ def dau_mau_ratio_chart(data, countries, title="DAU/MAU Ratio"):
                             x=0.5, y=0.5, showarrow=False)
         return fig
     
-    # Crear gráfico de líneas
-    fig = px.line(data_filtered, x='year_month', y='dau_mau_ratio', color='country', title=title,
-                labels={'year_month': 'Mes', 'dau_mau_ratio': 'Ratio DAU/MAU', 'country': 'País'}, markers=True)
+    # Crear gráfico de líneas, una por país
+    fig = go.Figure()
+    for country, group in data_filtered.groupby('country', sort=False):
+        fig.add_trace(go.Scatter(x=group['year_month'], y=group['dau_mau_ratio'], name=country, mode='lines+markers'))
     
     # Configurar layout
-    fig.update_layout(xaxis_title="Mes", yaxis_title="Ratio DAU/MAU", hovermode='x unified', 
+    fig.update_layout(title=title, legend_title_text='País', xaxis_title="Mes", yaxis_title="Ratio DAU/MAU", hovermode='x unified', 
                       legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
     
     # Formato del hover
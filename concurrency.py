@@ -0,0 +1,56 @@
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from config import QUERY_WORKERS, QUERY_TIMEOUT_SECONDS
+
+# Executor acotado y compartido por todos los callbacks del proceso
+_executor = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix='query')
+
+
+def run_concurrently(tasks, fallbacks=None, timeouts=None, default_timeout=QUERY_TIMEOUT_SECONDS, failed=None,
+                     executor=None):
+    """
+    Ejecuta consultas independientes en paralelo sobre el executor compartido (u otro).
+    Si una consulta falla o supera su timeout se usa su valor de fallback y el resto
+    de los resultados no se ve afectado.
+
+    No se deben lanzar tareas que a su vez llamen a run_concurrently: con el executor
+    lleno, la tarea externa esperaría a las internas sin fin.
+
+    Args:
+        tasks: dict nombre -> función sin argumentos
+        fallbacks: dict nombre -> valor a usar si la consulta falla (por defecto None)
+        timeouts: dict nombre -> segundos máximos para esa consulta
+        default_timeout: Timeout de las consultas que no están en timeouts
+        failed: Lista donde se agregan los nombres de las consultas que usaron su fallback (opcional)
+        executor: Executor donde correr las consultas (por defecto el compartido de los callbacks)
+
+    Returns:
+        dict: nombre -> resultado (o fallback)
+    """
+    fallbacks = fallbacks or {}
+    timeouts = timeouts or {}
+    started = time.monotonic()
+    executor = executor or _executor
+    futures = {name: executor.submit(func) for name, func in tasks.items()}
+
+    results = {}
+    for name, future in futures.items():
+        remaining = timeouts.get(name, default_timeout) - (time.monotonic() - started)
+        try:
+            results[name] = future.result(timeout=max(remaining, 0))
+        except TimeoutError:
+            # El hilo sigue corriendo hasta que Mongo responda; solo dejamos de esperarlo
+            future.cancel()
+            print(f"La consulta '{name}' superó su timeout; se usa el valor por defecto")
+            results[name] = fallbacks.get(name)
+            if failed is not None:
+                failed.append(name)
+        except Exception:
+            print(f"Error en la consulta '{name}'; se usa el valor por defecto:")
+            traceback.print_exc()
+            results[name] = fallbacks.get(name)
+            if failed is not None:
+                failed.append(name)
+    return results
@@ -12,4 +12,94 @@ MONGO_COLLECTION_LISTS = 'lists'
 
 # Configuración para métricas de suscripciones
 MONGO_DB_USERS = 'Users'
-MONGO_COLLECTION_SUBSCRIPTIONS = 'subscriptions'
\ No newline at end of file
+MONGO_COLLECTION_SUBSCRIPTIONS = 'subscriptions'
+
+# Zona horaria de trabajo
+TIMEZONE = 'America/Argentina/Buenos_Aires'
+
+# Configuración de rollups pre-agregados
+MONGO_DB_ROLLUPS = os.getenv("MONGO_DB_ROLLUPS", MONGO_DB_LIST_ME)
+MONGO_COLLECTION_LISTS_DAILY = 'lists_daily'
+MONGO_COLLECTION_ROLLUP_STATE = 'rollup_state'
+MONGO_COLLECTION_USER_FIRST_SEEN = 'user_first_seen'
+MONGO_COLLECTION_USER_INDEX = 'user_index'
+MONGO_COLLECTION_NOTIFIED_DAILY = 'notified_daily'
+MONGO_COLLECTION_USER_COUNTRIES = 'user_countries'
+MONGO_COLLECTION_LISTS_DAILY_COUNTRY = 'lists_daily_country'
+
+# Notificaciones de TranscribeMe
+MONGO_DB_TRANSCRIBE_ME = 'TranscribeMe'
+MONGO_COLLECTION_NOTIFICATIONS = 'notifications'
+# Cada cuántos segundos se refrescan los rollups dentro de la app (0 = desactivado)
+ROLLUP_REFRESH_SECONDS = int(os.getenv("ROLLUP_REFRESH_SECONDS", "300"))
+# Duración máxima del lease de cada refresco en rollup_state (si el proceso muere, otro lo retoma
+# al vencer); debe alcanzar para el backfill completo del primer deploy
+ROLLUP_LEASE_SECONDS = int(os.getenv("ROLLUP_LEASE_SECONDS", "1800"))
+# Cada cuántos segundos se recalculan las métricas totales en segundo plano
+TOTAL_METRICS_REFRESH_SECONDS = int(os.getenv("TOTAL_METRICS_REFRESH_SECONDS", "900"))
+
+# Cliente de Mongo: tamaño del pool, preferencia de lectura para las consultas analíticas
+# (primary, primaryPreferred, secondary, secondaryPreferred o nearest) y tags opcionales del nodo,
+# por ejemplo "nodeType:ANALYTICS"
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000"))
+MONGO_ANALYTICS_READ_PREFERENCE = os.getenv("MONGO_ANALYTICS_READ_PREFERENCE", "secondaryPreferred")
+MONGO_ANALYTICS_READ_TAGS = os.getenv("MONGO_ANALYTICS_READ_TAGS", "")
+# maxTimeMS de los aggregate: los del dashboard cortan antes que QUERY_TIMEOUT_SECONDS para que
+# Mongo cancele la consulta; los refrescos en segundo plano tienen más margen.
+# MONGO_MAX_TIME_MS_BY_QUERY permite ajustar consultas puntuales: "daily_metrics=20000,notified_daily=5000"
+MONGO_MAX_TIME_MS = int(os.getenv("MONGO_MAX_TIME_MS", "25000"))
+MONGO_BACKGROUND_MAX_TIME_MS = int(os.getenv("MONGO_BACKGROUND_MAX_TIME_MS", "600000"))
+MONGO_MAX_TIME_MS_BY_QUERY = os.getenv("MONGO_MAX_TIME_MS_BY_QUERY", "")
+MONGO_ALLOW_DISK_USE = os.getenv("MONGO_ALLOW_DISK_USE", "true").lower() == "true"
+MONGO_BATCH_SIZE = int(os.getenv("MONGO_BATCH_SIZE", "1000"))
+
+# Primer día con datos del dashboard: inicio por defecto del selector de fechas
+DASHBOARD_START_DATE = os.getenv("DASHBOARD_START_DATE", "2025-06-01")
+
+# Configuración de cache de resultados
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "128"))
+# Días guardados en la cache por día de cada tipo de dato (cada tipo tiene su propia cache, así un
+# rango largo no desaloja los días de los demás); debe cubrir el rango por defecto del dashboard
+# (desde DASHBOARD_START_DATE) más el mes anterior que usan los usuarios que volvieron
+CACHE_MAX_DAYS = int(os.getenv("CACHE_MAX_DAYS", "1500"))
+# Rangos que incluyen el día de hoy vencen rápido; rangos cerrados viven mucho más
+CACHE_TTL_LIVE_SECONDS = int(os.getenv("CACHE_TTL_LIVE_SECONDS", "300"))
+CACHE_TTL_HISTORIC_SECONDS = int(os.getenv("CACHE_TTL_HISTORIC_SECONDS", "86400"))
+# Cada cuántos segundos se precalientan los rangos más usados (ver prewarm.py; 0 = solo al arrancar,
+# -1 = nunca). Cada pasada rearma sus bundles desde la cache por día y renueva su TTL; si es menor
+# que CACHE_TTL_LIVE_SECONDS, los bundles de los rangos que incluyen hoy se reemplazan antes de
+# vencer (el día de hoy se vuelve a consultar cuando vence su entrada en la cache por día). Las
+# figuras solo se arman si su data cambió
+PREWARM_REFRESH_SECONDS = int(os.getenv("PREWARM_REFRESH_SECONDS", "240"))
+# Hilos del precalentamiento (aparte de QUERY_WORKERS, para no quitarle hilos a los callbacks)
+PREWARM_WORKERS = int(os.getenv("PREWARM_WORKERS", "2"))
+# Intervalo del modo en vivo: cada cuántos segundos se suman las listas nuevas de hoy al rango
+LIVE_REFRESH_SECONDS = int(os.getenv("LIVE_REFRESH_SECONDS", "60"))
+# Figuras ya serializadas (una por gráfico, vista y data de entrada)
+CACHE_MAX_FIGURES = int(os.getenv("CACHE_MAX_FIGURES", "256"))
+# Backend compartido entre workers de gunicorn: 'memory' (solo por proceso), 'disk' o 'redis'
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_DIR = os.getenv("CACHE_DIR", "/tmp/dash-list-me-cache")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# Exportación de contenido de listas: documentos por bloque del cursor (y por chunk enviado)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+# Consultas concurrentes de los callbacks: hilos compartidos y tiempo máximo de espera por consulta
+QUERY_WORKERS = int(os.getenv("QUERY_WORKERS", "8"))
+QUERY_TIMEOUT_SECONDS = float(os.getenv("QUERY_TIMEOUT_SECONDS", "30"))
+
+# Gráficos armados en el navegador: el servidor solo envía las columnas y assets/charts.js arma las figuras
+CLIENTSIDE_CHARTS = os.getenv("CLIENTSIDE_CHARTS", "false").lower() == "true"
+
+# Puntos máximos por serie en los gráficos: por encima se reduce con LTTB y se dibuja con WebGL (0 = sin límite)
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "1000"))
+
+# Aggregate más lentos que esto (segundos) se loguean con su pipeline y explain (0 = desactivado)
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "0"))
+
+# Índices: crearlos al iniciar la app (ver indexes.py) y documentos examinados tolerados por documento filtrado
+ENSURE_INDEXES_ON_STARTUP = os.getenv("ENSURE_INDEXES_ON_STARTUP", "false").lower() == "true"
+INDEX_MAX_EXAMINED_RATIO = float(os.getenv("INDEX_MAX_EXAMINED_RATIO", "2"))
@@ -0,0 +1,283 @@
+"""
+País de cada usuario a partir de su user_id (teléfono en formato internacional, sin '+').
+
+user_countries guarda un documento por usuario con su país (nombre de pycountry y código ISO
+alpha-2). Se completa en bloque la primera vez y después solo con los usuarios nuevos de
+user_first_seen (first_seen posterior al watermark), así que cada teléfono se parsea una sola vez.
+El país también se copia a user_first_seen para agrupar los usuarios nuevos por país sin otra
+consulta. Los usuarios que todavía no llegaron al mapeo (los de hoy, antes del próximo refresco)
+se resuelven en memoria sin guardarlos.
+
+Las métricas diarias por país agregan las listas por día y usuario y reparten los usuarios por
+país con ese mapeo; además de los conteos devuelven los bitmaps de usuarios de cada día y país
+(ver bitmaps.py) para calcular usuarios distintos por mes sin volver a consultar Mongo.
+lists_daily_country guarda esas filas (una por día y país) y se refresca igual que lists_daily:
+solo se recalculan los días que recibieron listas después del watermark.
+
+Uso por línea de comandos:
+    python countries.py          # mapea los usuarios nuevos y refresca lists_daily_country
+    python countries.py --full   # reconstruye el mapeo y el rollup completos
+"""
+import argparse
+from datetime import datetime, timedelta
+
+import phonenumbers
+import pycountry
+import pymongo
+import pytz
+
+from bitmaps import UserBitmap, get_user_indexes, assign_user_indexes
+from db import aggregate, get_client
+from config import (MONGO_DB_LIST_ME, MONGO_COLLECTION_LISTS, MONGO_COLLECTION_USER_FIRST_SEEN,
+                    MONGO_COLLECTION_USER_COUNTRIES, MONGO_COLLECTION_LISTS_DAILY_COUNTRY)
+from rollups import (BITMAP_FIELDS, DAY_EXPRESSION, get_rollup_db, get_watermark, set_watermark, touched_days,
+                     day_start, run_with_lease, _contiguous_runs)
+
+# País de los user_id que no son un teléfono válido
+UNKNOWN_COUNTRY = "Desconocido"
+
+COUNTRY_DAILY_COLUMNS = ["date", "country", "total_lists", "failed_lists", "created_lists",
+                         "total_users", "failed_users", "successful_users"]
+
+
+def phone_country(user_id):
+    """
+    País de un user_id con forma de teléfono internacional (549115...).
+
+    Returns:
+        tuple: (código ISO alpha-2 o None, nombre del país)
+    """
+    try:
+        number = phonenumbers.parse(f"+{user_id}")
+    except phonenumbers.NumberParseException:
+        return None, UNKNOWN_COUNTRY
+    # Los números que no validan (rangos nuevos, líneas virtuales) se asignan a la región
+    # principal de su código de país
+    code = phonenumbers.region_code_for_number(number) or phonenumbers.region_code_for_country_code(number.country_code)
+    country = pycountry.countries.get(alpha_2=code) if code and code != "ZZ" else None
+    if country is None:
+        return code, UNKNOWN_COUNTRY
+    return code, country.name
+
+
+def refresh_user_countries(collection, full=False):
+    """
+    Agrega a user_countries los usuarios de user_first_seen posteriores al último watermark.
+
+    Args:
+        collection: Colección ListMe.lists ya conectada
+        full: Si es True borra el mapeo y lo reconstruye desde cero
+
+    Returns:
+        int: cantidad de usuarios mapeados
+    """
+    return run_with_lease(get_rollup_db(collection), MONGO_COLLECTION_USER_COUNTRIES,
+                          lambda: _refresh_user_countries(collection, full))
+
+
+def _refresh_user_countries(collection, full):
+    """refresh_user_countries sin el lease"""
+    db = get_rollup_db(collection)
+    mapping = db[MONGO_COLLECTION_USER_COUNTRIES]
+    first_seen = db[MONGO_COLLECTION_USER_FIRST_SEEN]
+    if full:
+        mapping.delete_many({})
+    watermark = None if full else get_watermark(db, MONGO_COLLECTION_USER_COUNTRIES)
+    query = {"first_seen": {"$gt": watermark}} if watermark is not None else {}
+
+    def write(operations, countries):
+        mapping.bulk_write(operations, ordered=False)
+        first_seen.bulk_write(countries, ordered=False)
+
+    now = datetime.now(pytz.utc)
+    mapped, new_watermark, operations, countries = 0, watermark, [], []
+    for doc in first_seen.find(query, {"first_seen": 1}):
+        code, country = phone_country(doc["_id"])
+        operations.append(pymongo.UpdateOne(
+            {"_id": doc["_id"]}, {"$set": {"country": country, "country_code": code, "updated_at": now}}, upsert=True))
+        countries.append(pymongo.UpdateOne({"_id": doc["_id"]}, {"$set": {"country": country}}))
+        new_watermark = doc["first_seen"] if new_watermark is None else max(new_watermark, doc["first_seen"])
+        if len(operations) == 1000:
+            write(operations, countries)
+            mapped += len(operations)
+            operations, countries = [], []
+    if operations:
+        write(operations, countries)
+        mapped += len(operations)
+    if not mapped:
+        return 0
+
+    mapping.create_index("country")
+    set_watermark(db, MONGO_COLLECTION_USER_COUNTRIES, new_watermark)
+    print(f"Mapeo {MONGO_COLLECTION_USER_COUNTRIES} actualizado: {mapped} usuarios")
+    return mapped
+
+
+def get_user_countries(collection, user_ids):
+    """
+    País de cada user_id: los ya mapeados se leen de user_countries y el resto se resuelve en
+    memoria (se guardan en el próximo refresh_user_countries).
+
+    Returns:
+        dict: user_id -> país
+    """
+    mapping = get_rollup_db(collection)[MONGO_COLLECTION_USER_COUNTRIES]
+    user_ids = list(set(user_ids))
+    countries = {}
+    for i in range(0, len(user_ids), 1000):
+        for doc in mapping.find({"_id": {"$in": user_ids[i:i + 1000]}}, {"country": 1}):
+            countries[doc["_id"]] = doc["country"]
+    for user_id in user_ids:
+        if user_id not in countries:
+            countries[user_id] = phone_country(user_id)[1]
+    return countries
+
+
+def user_daily_pipeline(start_timestamp, end_timestamp):
+    """Pipeline que agrupa por día y usuario las listas con created_at en [start_timestamp, end_timestamp)."""
+    return [
+        {"$match": {"created_at": {"$gte": start_timestamp, "$lt": end_timestamp}}},
+        {
+            "$group": {
+                "_id": {"date": DAY_EXPRESSION, "user_id": "$user_id"},
+                "total_lists": {"$sum": 1},
+                "failed_lists": {
+                    "$sum": {
+                        "$cond": [{"$eq": ["$status", "error"]}, 1, 0]
+                    }
+                }
+            }
+        },
+        {"$project": {"date": "$_id.date", "user_id": "$_id.user_id", "total_lists": 1, "failed_lists": 1, "_id": 0}}
+    ]
+
+
+def aggregate_daily_country_metrics(collection, start_timestamp, end_timestamp, name="daily_country_metrics",
+                                    assign=False):
+    """
+    Métricas diarias por país con created_at en [start_timestamp, end_timestamp), con las mismas
+    definiciones que lists_daily: un usuario es fallido si tuvo alguna lista con error en el día y
+    exitoso si tuvo alguna sin error. Con assign=True (solo en el refresco del rollup) se asignan
+    índices de bitmap a los usuarios nuevos; si no, quedan pendientes en los bitmaps.
+
+    Returns:
+        list: filas con COUNTRY_DAILY_COLUMNS y los bitmaps serializados de BITMAP_FIELDS
+    """
+    rows = aggregate(collection, user_daily_pipeline(start_timestamp, end_timestamp), name)
+    if not rows:
+        return []
+    user_ids = [row["user_id"] for row in rows]
+    indexes = (assign_user_indexes if assign else get_user_indexes)(get_rollup_db(collection), user_ids)
+    return group_user_days(rows, get_user_countries(collection, user_ids), indexes)
+
+
+def group_user_days(rows, countries, indexes):
+    """
+    Agrupa filas por día y usuario (date, user_id, total_lists, failed_lists) en filas por día y país.
+
+    Args:
+        rows: Filas por día y usuario
+        countries: user_id -> país
+        indexes: user_id -> índice de bitmap (los usuarios que no están quedan pendientes)
+
+    Returns:
+        list: filas con COUNTRY_DAILY_COLUMNS y los bitmaps serializados de BITMAP_FIELDS
+    """
+    groups = {}
+    for row in rows:
+        key = (row["date"], countries[row["user_id"]])
+        group = groups.setdefault(key, {"total_lists": 0, "failed_lists": 0, "user_ids": [],
+                                        "failed_user_ids": [], "successful_user_ids": []})
+        group["total_lists"] += row["total_lists"]
+        group["failed_lists"] += row["failed_lists"]
+        group["user_ids"].append(row["user_id"])
+        if row["failed_lists"] > 0:
+            group["failed_user_ids"].append(row["user_id"])
+        if row["total_lists"] > row["failed_lists"]:
+            group["successful_user_ids"].append(row["user_id"])
+
+    result = []
+    for (date, country), group in sorted(groups.items()):
+        result.append({
+            "date": date,
+            "country": country,
+            "total_lists": group["total_lists"],
+            "failed_lists": group["failed_lists"],
+            "created_lists": group["total_lists"] - group["failed_lists"],
+            "total_users": len(group["user_ids"]),
+            "failed_users": len(group["failed_user_ids"]),
+            "successful_users": len(group["successful_user_ids"]),
+            **{field: UserBitmap.from_user_ids(group[ids_field], indexes).to_bytes()
+               for field, ids_field in BITMAP_FIELDS.items()},
+        })
+    return result
+
+
+def refresh_daily_country_rollup(collection, full=False):
+    """
+    Actualiza lists_daily_country recalculando solo los días tocados desde el último watermark.
+
+    Args:
+        collection: Colección ListMe.lists ya conectada
+        full: Si es True ignora el watermark y reconstruye todos los días
+
+    Returns:
+        int: cantidad de días recalculados
+    """
+    return run_with_lease(get_rollup_db(collection), MONGO_COLLECTION_LISTS_DAILY_COUNTRY,
+                          lambda: _refresh_daily_country_rollup(collection, full))
+
+
+def _refresh_daily_country_rollup(collection, full):
+    """refresh_daily_country_rollup sin el lease"""
+    db = get_rollup_db(collection)
+    rollup = db[MONGO_COLLECTION_LISTS_DAILY_COUNTRY]
+    watermark = None if full else get_watermark(db, MONGO_COLLECTION_LISTS_DAILY_COUNTRY)
+
+    # 1. Días que recibieron documentos nuevos desde el watermark
+    days, new_watermark = touched_days(collection, watermark, "lists_daily_country_touched_days")
+    if not days:
+        return 0
+
+    # 2. Recalcular los días completos, un aggregate por tramo de días consecutivos
+    now = datetime.now(pytz.utc)
+    for run_start, run_end in _contiguous_runs(days):
+        rows = aggregate_daily_country_metrics(collection, day_start(run_start).timestamp(),
+                                               day_start(run_end + timedelta(days=1)).timestamp(),
+                                               "lists_daily_country_refresh", assign=True)
+        operations = [
+            pymongo.UpdateOne({"_id": f"{row['date']}|{row['country']}"}, {"$set": {**row, "updated_at": now}},
+                              upsert=True)
+            for row in rows
+        ]
+        if operations:
+            rollup.bulk_write(operations, ordered=False)
+        # Países que quedaron sin actividad en el tramo (por ejemplo si cambió el mapeo de un usuario)
+        rollup.delete_many({"date": {"$gte": run_start.isoformat(), "$lte": run_end.isoformat()},
+                            "updated_at": {"$lt": now}})
+
+    rollup.create_index("date")
+    set_watermark(db, MONGO_COLLECTION_LISTS_DAILY_COUNTRY, new_watermark)
+    print(f"Rollup {MONGO_COLLECTION_LISTS_DAILY_COUNTRY} actualizado: {len(days)} días recalculados")
+    return len(days)
+
+
+def read_daily_country_rollup(collection, start_day, end_day, with_bitmaps=True):
+    """Lee las filas de lists_daily_country entre start_day y end_day (inclusive, yyyy-mm-dd)."""
+    rollup = get_rollup_db(collection)[MONGO_COLLECTION_LISTS_DAILY_COUNTRY]
+    projection = {column: 1 for column in COUNTRY_DAILY_COLUMNS}
+    if with_bitmaps:
+        projection.update({field: 1 for field in BITMAP_FIELDS})
+    projection["_id"] = 0
+    cursor = rollup.find({"date": {"$gte": start_day, "$lte": end_day}}, projection).sort("date", 1)
+    return list(cursor)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mapea los usuarios de ListMe a su país y refresca el rollup por país")
+    parser.add_argument("--full", action="store_true", help="Reconstruye el mapeo y el rollup ignorando el watermark")
+    args = parser.parse_args()
+
+    lists_collection = get_client()[MONGO_DB_LIST_ME][MONGO_COLLECTION_LISTS]
+    refresh_user_countries(lists_collection, full=args.full)
+    refresh_daily_country_rollup(lists_collection, full=args.full)
@@ -0,0 +1,173 @@
+"""
+Acceso a Mongo: cliente configurado e instrumentación de los aggregate.
+
+get_client() crea el MongoClient compartido con el pool configurado y analytics_database() abre
+las bases de los datos del bot (ListMe, TranscribeMe) con la preferencia de lectura analítica,
+para que las consultas pesadas del dashboard no carguen al primary que atiende al bot.
+
+aggregate() ejecuta un pipeline con maxTimeMS (por consulta), allowDiskUse y batchSize, y mide su
+duración y los documentos devueltos (ver metrics.py). Si Mongo cancela la consulta por maxTimeMS
+se levanta pymongo.errors.ExecutionTimeout: los callbacks la toman como cualquier consulta fallida
+y usan su valor por defecto (ver run_concurrently).
+Si SLOW_QUERY_SECONDS es mayor a 0, los aggregate que lo superan se loguean con el pipeline y un
+resumen de su explain (plan ganador, documentos y claves examinados), calculado en un hilo aparte
+para no demorar la respuesta.
+"""
+import json
+import threading
+import time
+
+import pymongo
+from pymongo.errors import ExecutionTimeout
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+
+from config import (MONGO_URI, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                    MONGO_ANALYTICS_READ_PREFERENCE, MONGO_ANALYTICS_READ_TAGS, MONGO_MAX_TIME_MS,
+                    MONGO_BACKGROUND_MAX_TIME_MS, MONGO_MAX_TIME_MS_BY_QUERY, MONGO_ALLOW_DISK_USE, MONGO_BATCH_SIZE,
+                    SLOW_QUERY_SECONDS)
+from metrics import QUERY_SECONDS, QUERY_DOCUMENTS, SLOW_QUERIES, QUERY_TIMEOUTS
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# Consultas que solo corren en los refrescos en segundo plano (usan MONGO_BACKGROUND_MAX_TIME_MS)
+BACKGROUND_QUERIES = {"lists_daily_refresh", "lists_daily_touched_days", "user_first_seen_refresh",
+                      "notified_daily_refresh", "notified_daily_touched_days", "lists_daily_country_refresh",
+                      "lists_daily_country_touched_days"}
+
+
+def _parse_max_time_overrides(value):
+    """'daily_metrics=20000,notified_daily=5000' -> {'daily_metrics': 20000, 'notified_daily': 5000}"""
+    overrides = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, millis = item.split("=", 1)
+            overrides[name.strip()] = int(millis)
+    return overrides
+
+
+MAX_TIME_MS_BY_QUERY = _parse_max_time_overrides(MONGO_MAX_TIME_MS_BY_QUERY)
+
+
+def get_client(uri=MONGO_URI):
+    """MongoClient con el pool y los timeouts configurados"""
+    return pymongo.MongoClient(uri, maxPoolSize=MONGO_MAX_POOL_SIZE, minPoolSize=MONGO_MIN_POOL_SIZE,
+                               serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS, appname="dash-list-me")
+
+
+def analytics_read_preference():
+    """Preferencia de lectura de MONGO_ANALYTICS_READ_PREFERENCE con los tags de MONGO_ANALYTICS_READ_TAGS"""
+    mode = READ_PREFERENCES[MONGO_ANALYTICS_READ_PREFERENCE]
+    if mode is Primary or not MONGO_ANALYTICS_READ_TAGS:
+        return mode()
+    tags = dict(tag.split(":", 1) for tag in MONGO_ANALYTICS_READ_TAGS.split(",") if ":" in tag)
+    # Si ningún nodo tiene los tags se usa cualquiera que cumpla el modo
+    return mode(tag_sets=[tags, {}])
+
+
+def analytics_database(client, name):
+    """Base name con la preferencia de lectura analítica"""
+    return client.get_database(name, read_preference=analytics_read_preference())
+
+
+def max_time_ms(name):
+    """maxTimeMS de la consulta name"""
+    if name in MAX_TIME_MS_BY_QUERY:
+        return MAX_TIME_MS_BY_QUERY[name]
+    return MONGO_BACKGROUND_MAX_TIME_MS if name in BACKGROUND_QUERIES else MONGO_MAX_TIME_MS
+
+
+def aggregate(collection, pipeline, name, **kwargs):
+    """
+    Ejecuta collection.aggregate(pipeline) y devuelve la lista de documentos.
+
+    Args:
+        collection: Colección de Mongo
+        pipeline: Pipeline de agregación
+        name: Nombre de la consulta para las métricas y el log
+        **kwargs: Opciones de aggregate que reemplazan a las configuradas (allowDiskUse, maxTimeMS, ...)
+
+    Returns:
+        list: documentos devueltos
+    """
+    options = {"maxTimeMS": max_time_ms(name), "allowDiskUse": MONGO_ALLOW_DISK_USE,
+               "batchSize": MONGO_BATCH_SIZE, **kwargs}
+    start = time.perf_counter()
+    try:
+        rows = list(collection.aggregate(pipeline, **options))
+    except ExecutionTimeout:
+        QUERY_TIMEOUTS.inc(query=name)
+        print(f"La consulta '{name}' superó maxTimeMS={options['maxTimeMS']} y Mongo la canceló")
+        raise
+    elapsed = time.perf_counter() - start
+    QUERY_SECONDS.observe(elapsed, query=name)
+    QUERY_DOCUMENTS.inc(len(rows), query=name)
+    if SLOW_QUERY_SECONDS > 0 and elapsed >= SLOW_QUERY_SECONDS:
+        SLOW_QUERIES.inc(query=name)
+        threading.Thread(target=log_slow_query, args=(collection, pipeline, name, elapsed, len(rows)),
+                         name=f"slow-query-{name}", daemon=True).start()
+    return rows
+
+
+def explain_aggregate(collection, pipeline):
+    """Explain con executionStats de un aggregate (vuelve a ejecutar el pipeline)"""
+    return collection.database.command(
+        "explain", {"aggregate": collection.name, "pipeline": pipeline, "cursor": {}}, verbosity="executionStats")
+
+
+def _find_key(value, key):
+    """Busca recursivamente la primera aparición de key dentro de un explain"""
+    if isinstance(value, dict):
+        if key in value:
+            return value[key]
+        value = list(value.values())
+    if isinstance(value, list):
+        for item in value:
+            found = _find_key(item, key)
+            if found is not None:
+                return found
+    return None
+
+
+def _plan_stages(plan):
+    """Etapas del plan ganador, de la raíz a las hojas (COLLSCAN, IXSCAN, FETCH, ...)"""
+    stages = []
+    while isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        plan = plan.get("inputStage") or plan.get("queryPlan") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+def summarize_explain(explain):
+    """
+    Resume un explain de aggregate (la forma cambia según la versión de Mongo y si el pipeline
+    se resuelve en el motor de consultas o en etapas $cursor).
+
+    Returns:
+        dict: stages, docs_examined, keys_examined, returned y millis
+    """
+    stats = _find_key(explain, "executionStats") or {}
+    return {
+        "stages": _plan_stages(_find_key(explain, "winningPlan")),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "returned": stats.get("nReturned"),
+        "millis": stats.get("executionTimeMillis"),
+    }
+
+
+def log_slow_query(collection, pipeline, name, elapsed, returned):
+    """Loguea un aggregate lento con su pipeline y el resumen de su explain"""
+    try:
+        summary = summarize_explain(explain_aggregate(collection, pipeline))
+    except Exception as e:
+        summary = {"error": str(e)}
+    print(f"Consulta lenta '{name}' sobre {collection.full_name}: {elapsed:.2f}s, {returned} documentos\n"
+          f"  pipeline: {json.dumps(pipeline, default=str)}\n"
+          f"  explain: {json.dumps(summary, default=str)}")
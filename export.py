@@ -0,0 +1,166 @@
+import csv
+import io
+import tempfile
+import zlib
+
+from flask import Response, request, stream_with_context
+
+from config import EXPORT_BATCH_SIZE
+from get_data import created_at_filter, parse_date_range
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Columnas opcionales que se pueden agregar a 'items'
+EXTRA_COLUMNS = ["created_at", "user_id", "status"]
+
+EXPORT_FORMATS = ["csv", "parquet"]
+
+
+def lists_content_query(start_date=None, end_date=None):
+    """
+    Filtro de las listas a exportar: listas activas con items y, si se pasa un rango
+    (yyyy-mm-dd), creadas dentro de ese rango.
+    """
+    query = {"status": "active", "items": {"$exists": True}}
+    if start_date and end_date:
+        start, end = parse_date_range(start_date, end_date)
+        query.update(created_at_filter(start, end))
+    return query
+
+
+def iter_lists_content_batches(collection, query, columns, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Lee las listas con un cursor por lotes y las devuelve en bloques de batch_size filas.
+
+    Args:
+        collection: Colección ListMe.lists ya conectada
+        query: Filtro de Mongo (ver lists_content_query)
+        columns: Columnas extra a incluir además de 'items' (subconjunto de EXTRA_COLUMNS)
+        batch_size: Documentos por lote del cursor y por bloque devuelto
+
+    Yields:
+        list: filas como diccionarios con 'items' y las columnas pedidas
+    """
+    projection = {"items": 1, "_id": 0, **{column: 1 for column in columns}}
+    cursor = collection.find(query, projection).batch_size(batch_size)
+
+    batch = []
+    for doc in cursor:
+        row = {"items": ', '.join(doc["items"])}
+        for column in columns:
+            value = doc.get(column)
+            row[column] = str(value) if column == "user_id" and value is not None else value
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_lists_content_csv(collection, query=None, columns=(), batch_size=EXPORT_BATCH_SIZE):
+    """
+    Genera el CSV con el contenido de las listas por bloques. La memoria usada no depende
+    de la cantidad de listas.
+
+    Yields:
+        bytes: chunks del CSV en UTF-8
+    """
+    query = lists_content_query() if query is None else query
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(["items", *columns])
+    for batch in iter_lists_content_batches(collection, query, columns, batch_size):
+        writer.writerows([row[column] for column in ["items", *columns]] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue().encode("utf-8")
+
+
+def iter_lists_content_parquet(collection, query=None, columns=(), batch_size=EXPORT_BATCH_SIZE):
+    """
+    Escribe el contenido de las listas en Parquet (comprimido con zstd, un row group por bloque)
+    sobre un archivo temporal y lo devuelve en chunks.
+
+    Yields:
+        bytes: chunks del archivo Parquet
+    """
+    query = lists_content_query() if query is None else query
+    types = {"items": pa.string(), "created_at": pa.float64(), "user_id": pa.string(), "status": pa.string()}
+    schema = pa.schema([(column, types[column]) for column in ["items", *columns]])
+
+    with tempfile.TemporaryFile() as f:
+        with pq.ParquetWriter(f, schema, compression="zstd") as writer:
+            for batch in iter_lists_content_batches(collection, query, columns, batch_size):
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        f.seek(0)
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                break
+            yield chunk
+
+
+def gzip_chunks(chunks):
+    """Comprime un flujo de chunks en formato gzip sin acumularlo en memoria"""
+    compressor = zlib.compressobj(wbits=31)  # wbits=31 -> cabecera gzip
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_url(export_format="csv", start_date=None, end_date=None, columns=(), gzip=False):
+    """Arma el link de descarga con los filtros elegidos en el dashboard"""
+    params = [f"format={export_format}"]
+    if start_date and end_date:
+        params += [f"start={start_date[:10]}", f"end={end_date[:10]}"]
+    if columns:
+        params.append(f"columns={','.join(columns)}")
+    if gzip and export_format == "csv":
+        params.append("gzip=1")
+    return f"/export/contenido_listas?{'&'.join(params)}"
+
+
+def register_export_routes(server, collection):
+    """
+    Registra en el servidor Flask la descarga en streaming del contenido de listas.
+    Debe llamarse antes de instanciar la autenticación para que la ruta quede protegida.
+
+    Parámetros de la URL: format (csv | parquet), start y end (yyyy-mm-dd), columns
+    (created_at,user_id,status) y gzip=1 (solo CSV).
+    """
+    @server.route("/export/contenido_listas")
+    @server.route("/export/contenido_listas.csv")
+    def export_lists_content():
+        export_format = request.args.get("format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            return Response(f"Formato no soportado: {export_format}", status=400)
+        columns = [column for column in request.args.get("columns", "").split(",") if column in EXTRA_COLUMNS]
+        try:
+            query = lists_content_query(request.args.get("start"), request.args.get("end"))
+        except ValueError:
+            return Response("Las fechas start y end deben tener formato yyyy-mm-dd", status=400)
+
+        if export_format == "parquet":
+            if pa is None:
+                return Response("La exportación Parquet requiere instalar pyarrow", status=501)
+            chunks = iter_lists_content_parquet(collection, query, columns)
+            filename = "contenido_listas.parquet"
+            mimetype = "application/vnd.apache.parquet"
+        else:
+            chunks = iter_lists_content_csv(collection, query, columns)
+            filename = "contenido_listas.csv"
+            mimetype = "text/csv"
+            if request.args.get("gzip") == "1":
+                chunks = gzip_chunks(chunks)
+                filename += ".gz"
+                mimetype = "application/gzip"
+        return Response(stream_with_context(chunks), mimetype=mimetype,
+                        headers={"Content-Disposition": f"attachment; filename={filename}"})
@@ -1,6 +1,15 @@
 from datetime import datetime, timedelta, time
 import pandas as pd
 import pytz
+from config import (MONGO_COLLECTION_LISTS_DAILY, MONGO_COLLECTION_NOTIFIED_DAILY, MONGO_COLLECTION_LISTS_DAILY_COUNTRY,
+                    TIMEZONE)
+from hll import HyperLogLog
+from bitmaps import UserBitmap
+from rollups import (DAILY_COLUMNS, SKETCH_FIELDS, BITMAP_FIELDS, aggregate_daily_metrics, add_user_summaries,
+                     read_daily_rollup, read_daily_user_sets, get_rollup_db, get_watermark, day_start,
+                     timestamp_to_day, read_first_seen, count_first_seen, aggregate_notified_daily,
+                     read_notified_daily)
+from countries import aggregate_daily_country_metrics, read_daily_country_rollup, get_user_countries
 
 def parse_date_range(start_date_str: str, end_date_str: str) -> tuple[datetime, datetime]:
     """
@@ -10,8 +19,8 @@ def parse_date_range(start_date_str: str, end_date_str: str) -> tuple[datetime,
     # Tu zona horaria de trabajo
     tz = pytz.timezone('America/Argentina/Buenos_Aires')
 
-    # Fecha mínima válida
-    min_allowed_date = datetime(2025, 5, 22, 17, 30, tzinfo=tz)
+    # Fecha mínima válida (tz.localize: con pytz, tzinfo=tz usaría el offset histórico LMT)
+    min_allowed_date = tz.localize(datetime(2025, 5, 22, 17, 30))
     
     # Convertimos a date (sin hora aún)
     start_date_raw = datetime.fromisoformat(start_date_str).date()
@@ -21,129 +30,284 @@ def parse_date_range(start_date_str: str, end_date_str: str) -> tuple[datetime,
     if start_date_raw <= min_allowed_date.date():
         start_dt = min_allowed_date
     else:
-        start_dt = datetime.combine(start_date_raw, time.min, tz)
+        start_dt = tz.localize(datetime.combine(start_date_raw, time.min))
 
     if end_date_raw <= min_allowed_date.date():
         end_dt = min_allowed_date
     else:
-        end_dt = datetime.combine(end_date_raw, time.max, tz)
+        end_dt = tz.localize(datetime.combine(end_date_raw, time.max))
     return start_dt, end_dt
 
-def get_daily_data(collection, start_date, end_date):
+def created_at_filter(start_date, end_date):
     """
-    Extrae la data de la Mongo    
+    Filtro de Mongo sobre created_at (Unix timestamp) para los días completos del rango de fechas
+    con zona horaria: ventana semiabierta desde el inicio del primer día hasta el inicio del día
+    siguiente al último, igual que en las agregaciones diarias.
     """
-    # Asegurar que start_date y end_date tengan zona horaria
     if start_date.tzinfo is None or end_date.tzinfo is None:
         raise ValueError("start_date y end_date deben tener zona horaria")
-    
-    # Hacer end_date inclusivo sumando un día
-    end_date_inclusive = end_date + timedelta(days=1)
-
-    # Convertir start_date y end_date a Unix timestamp en segundos
-    start_timestamp = start_date.timestamp()
-    end_timestamp = end_date_inclusive.timestamp()
-
-    # Pipeline de agregación
-    pipeline = [
-        # 1. Filtrar por rango de fechas en created_at (Unix timestamp)
-        {
-            "$match": {
-                "created_at": {
-                    "$gte": start_timestamp,
-                    "$lte": end_timestamp
-                }
-            }
-        },
-        # 2. Agrupar por día (convirtiendo created_at a fecha)
-        {
-            "$group": {
-                "_id": {
-                    "$dateToString": {
-                        "format": "%Y-%m-%d",
-                        "date": {"$toDate": {"$multiply": ["$created_at", 1000]}},  # Convertir segundos a milisegundos
-                        "timezone": "America/Argentina/Buenos_Aires"
-                    }
-                },
-                # Conteos de listas
-                "total_lists": {"$sum": 1},
-                "failed_lists": {
-                    "$sum": {
-                        "$cond": [{"$eq": ["$status", "error"]}, 1, 0]
-                    }
-                },
-                # Conteos de usuarios únicos
-                "all_users": {"$addToSet": "$user_id"},
-                "failed_users_set": {
-                    "$addToSet": {
-                        "$cond": [{"$eq": ["$status", "error"]}, "$user_id", None]
-                    }
-                },
-                "successful_users_set": {
-                    "$addToSet": {
-                        "$cond": [{"$ne": ["$status", "error"]}, "$user_id", None]
-                    }
-                }
-            }
-        },
-        # 3. Calcular created_lists y conteos finales de usuarios
-        {
-            "$project": {
-                "date": "$_id",
-                "total_lists": 1,
-                "failed_lists": 1,
-                "created_lists": {
-                    "$subtract": ["$total_lists", "$failed_lists"]
-                },
-                "total_users": {"$size": "$all_users"},
-                "failed_users": {
-                    "$size": {
-                        "$filter": {
-                            "input": "$failed_users_set",
-                            "cond": {"$ne": ["$$this", None]}
-                        }
-                    }
-                },
-                "successful_users": {
-                    "$size": {
-                        "$filter": {
-                            "input": "$successful_users_set",
-                            "cond": {"$ne": ["$$this", None]}
-                        }
-                    }
-                },
-                "_id": 0
-            }
-        },
-        # 4. Ordenar por fecha
-        {
-            "$sort": {"date": 1}
-        }
-    ]
-        
-    # Ejecutar el pipeline y obtener resultados
-    results = list(collection.aggregate(pipeline))
+    return {"created_at": {"$gte": day_start(start_date.date()).timestamp(),
+                           "$lt": day_start(end_date.date() + timedelta(days=1)).timestamp()}}
+
+def timestamp_window(start_date, end_date):
+    """
+    Ventana semiabierta [inicio, fin) en Unix timestamps para un rango de parse_date_range: desde
+    start_date hasta el inicio del día siguiente a end_date (end_date ya trae la hora del fin del día).
+    """
+    if start_date.tzinfo is None or end_date.tzinfo is None:
+        raise ValueError("start_date y end_date deben tener zona horaria")
+    return start_date.timestamp(), day_start(end_date.date() + timedelta(days=1)).timestamp()
+
+def _rollup_rows(collection, rollup_name, start_date, end_date, read_rollup, aggregate):
+    """
+    Filas diarias de un rollup entre start_date y end_date. Los días posteriores al último
+    watermark del rollup (normalmente solo hoy) se agregan directo desde la colección.
+
+    Args:
+        collection: Colección de origen del rollup ya conectada
+        rollup_name: Nombre del rollup (el de su watermark en rollup_state)
+        read_rollup: Función (start_day, end_day) -> filas consolidadas del rollup
+        aggregate: Función (start_timestamp, end_timestamp) -> filas agregadas de la colección
+    """
+    # Convertir start_date y end_date a Unix timestamp en segundos: [start_date, día siguiente a end_date)
+    start_timestamp, end_timestamp = timestamp_window(start_date, end_date)
+
+    watermark = get_watermark(get_rollup_db(collection), rollup_name)
+    if watermark is None:
+        # El rollup todavía no se construyó: agregar todo el rango sobre la colección
+        return aggregate(start_timestamp, end_timestamp)
+
+    # Filas ya consolidadas en el rollup (puede haber varias por día, por ejemplo una por país)
+    rows = {}
+    for row in read_rollup(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')):
+        rows.setdefault(row["date"], []).append(row)
+    # El día del watermark puede estar incompleto: se recalcula desde su inicio
+    tail_start = max(start_timestamp, day_start(timestamp_to_day(watermark)).timestamp())
+    if tail_start < end_timestamp:
+        tail = {}
+        for row in aggregate(tail_start, end_timestamp):
+            tail.setdefault(row["date"], []).append(row)
+        rows.update(tail)
+    return [row for date in sorted(rows) for row in rows[date]]
+
+def _read_daily_rows(collection, start_date, end_date, user_fields=None):
+    """
+    Filas diarias de lists_daily (más los días todavía no consolidados).
+    Si se pasan user_fields (campos de SKETCH_FIELDS o BITMAP_FIELDS) devuelve esos conjuntos de
+    usuarios serializados en lugar de las métricas.
+    """
+    rollup_db = get_rollup_db(collection)
+
+    def aggregate(start_timestamp, end_timestamp):
+        rows = aggregate_daily_metrics(collection, start_timestamp, end_timestamp, include_users=bool(user_fields))
+        return [add_user_summaries(rollup_db, row, user_fields) for row in rows] if user_fields else rows
+
+    def read_rollup(start_day, end_day):
+        if user_fields:
+            return read_daily_user_sets(collection, start_day, end_day, user_fields)
+        return read_daily_rollup(collection, start_day, end_day)
+
+    return _rollup_rows(collection, MONGO_COLLECTION_LISTS_DAILY, start_date, end_date, read_rollup, aggregate)
+
+def get_daily_data(collection, start_date, end_date):
+    """
+    Extrae la data diaria desde el rollup lists_daily (más los días todavía no consolidados)
+    """
+    results = _read_daily_rows(collection, start_date, end_date)
 
     # Convertir a DataFrame
     df = pd.DataFrame(results)
 
     # Si no hay resultados, devolver DataFrame vacío con columnas correctas
     if df.empty:
-        return pd.DataFrame(columns=[
-            "date", "total_lists", "failed_lists", "created_lists",
-            "total_users", "failed_users", "successful_users"
-        ])
+        return pd.DataFrame(columns=DAILY_COLUMNS)
     
     # Asegurar que las columnas estén en el orden correcto
-    df = df[["date", "total_lists", "failed_lists", "created_lists",
-             "total_users", "failed_users", "successful_users"]]
+    df = df[DAILY_COLUMNS]
 
     # Convertir la columna date a datetime
     #df["date"] = pd.to_datetime(df["date"])
     return df
-    
 
-def group_monthly_data(df):
+def get_daily_user_bitmaps(collection, start_date, end_date):
+    """
+    Devuelve por día los bitmaps exactos serializados de usuarios totales, exitosos y fallidos.
+
+    Returns:
+        list: diccionarios con 'date' y los campos de BITMAP_FIELDS
+    """
+    return [{"date": row["date"], **{field: row.get(field) for field in BITMAP_FIELDS}}
+            for row in _read_daily_rows(collection, start_date, end_date, user_fields=BITMAP_FIELDS)]
+
+def get_daily_user_sketches(collection, start_date, end_date):
+    """
+    Devuelve por día los sketches HyperLogLog serializados de usuarios totales, exitosos y fallidos.
+
+    Returns:
+        list: diccionarios con 'date' y los campos de SKETCH_FIELDS
+    """
+    return [{"date": row["date"], **{field: row.get(field) for field in SKETCH_FIELDS}}
+            for row in _read_daily_rows(collection, start_date, end_date, user_fields=SKETCH_FIELDS)]
+
+DISTINCT_USERS_COLUMNS = ["date", "total_users", "successful_users", "failed_users"]
+
+def _union_sketches(rows):
+    """Une los sketches de varias filas diarias y devuelve la estimación de usuarios distintos"""
+    return {
+        "total_users": HyperLogLog.union(HyperLogLog.from_bytes(row["users_hll"]) for row in rows).count(),
+        "successful_users": HyperLogLog.union(
+            HyperLogLog.from_bytes(row["successful_users_hll"]) for row in rows).count(),
+        "failed_users": HyperLogLog.union(HyperLogLog.from_bytes(row["failed_users_hll"]) for row in rows).count(),
+    }
+
+def distinct_users_in_range(sketch_rows):
+    """
+    Estima los usuarios distintos (total, exitosos y fallidos) de todo el rango cubierto por
+    sketch_rows. Error estándar ~1.6% (ver hll.py).
+    """
+    return _union_sketches(sketch_rows)
+
+def monthly_distinct_users(sketch_rows):
+    """
+    Estima los usuarios distintos por mes uniendo los sketches diarios de cada mes.
+
+    Returns:
+        pd.DataFrame: columnas DISTINCT_USERS_COLUMNS (date en formato yyyy-mm)
+    """
+    months = {}
+    for row in sketch_rows:
+        months.setdefault(row["date"][:7], []).append(row)
+    return pd.DataFrame([{"date": month, **_union_sketches(rows)} for month, rows in sorted(months.items())],
+                        columns=DISTINCT_USERS_COLUMNS)
+
+def rolling_distinct_users(sketch_rows, window_days=30):
+    """
+    Estima, para cada día, los usuarios distintos de la ventana móvil de window_days días
+    que termina en ese día.
+
+    Returns:
+        pd.DataFrame: columnas DISTINCT_USERS_COLUMNS
+    """
+    rows_by_day = {row["date"]: row for row in sketch_rows}
+    result = []
+    for day in sorted(rows_by_day):
+        window_start = (datetime.fromisoformat(day) - timedelta(days=window_days - 1)).strftime('%Y-%m-%d')
+        window = [row for date, row in rows_by_day.items() if window_start <= date <= day]
+        result.append({"date": day, **_union_sketches(window)})
+    return pd.DataFrame(result, columns=DISTINCT_USERS_COLUMNS)
+
+def get_daily_data_by_country(collection, start_date, end_date):
+    """
+    Métricas diarias por país con los bitmaps de usuarios de cada día y país, desde el rollup
+    lists_daily_country (más los días todavía no consolidados). Todos los países salen de una
+    sola lectura por rango de fechas: el filtro por país se hace después, en memoria.
+
+    Returns:
+        list: diccionarios con COUNTRY_DAILY_COLUMNS y los campos de BITMAP_FIELDS
+    """
+    return _rollup_rows(collection, MONGO_COLLECTION_LISTS_DAILY_COUNTRY, start_date, end_date,
+                        lambda start_day, end_day: read_daily_country_rollup(collection, start_day, end_day),
+                        lambda start_timestamp, end_timestamp: aggregate_daily_country_metrics(
+                            collection, start_timestamp, end_timestamp))
+
+def _union_bitmaps(rows, field="users_bitmap"):
+    return UserBitmap.union(UserBitmap.from_bytes(row[field]) for row in rows)
+
+def monthly_active_users(bitmap_rows):
+    """
+    Usuarios activos exactos por mes (unión de los bitmaps diarios de cada mes).
+
+    Returns:
+        pd.DataFrame: columnas date (yyyy-mm), total_users, successful_users, failed_users
+    """
+    months = {}
+    for row in bitmap_rows:
+        months.setdefault(row["date"][:7], []).append(row)
+    return pd.DataFrame([{
+        "date": month,
+        "total_users": _union_bitmaps(rows, "users_bitmap").count(),
+        "successful_users": _union_bitmaps(rows, "successful_users_bitmap").count(),
+        "failed_users": _union_bitmaps(rows, "failed_users_bitmap").count(),
+    } for month, rows in sorted(months.items())], columns=["date", "total_users", "successful_users", "failed_users"])
+
+def sum_countries(country_data, columns):
+    """
+    Totales por día a partir de la data por día y país. Cada usuario cae en un solo país, así que
+    las columnas de usuarios también se pueden sumar.
+
+    Args:
+        country_data: DataFrame con columnas date, country y las de columns
+        columns: Columnas del resultado (date y las métricas a sumar)
+    """
+    if country_data.empty:
+        return pd.DataFrame(columns=columns)
+    return country_data.groupby('date', as_index=False)[columns[1:]].sum()[columns]
+
+def daily_bitmaps_from_countries(country_rows):
+    """
+    Bitmaps diarios de todos los usuarios: unión de los bitmaps de los países de cada día.
+
+    Returns:
+        list: diccionarios con 'date' y los campos de BITMAP_FIELDS
+    """
+    days = {}
+    for row in country_rows:
+        days.setdefault(row["date"], []).append(row)
+    return [{"date": day, **{field: _union_bitmaps(rows, field).to_bytes() for field in BITMAP_FIELDS}}
+            for day, rows in sorted(days.items())]
+
+COUNTRY_MONTHLY_USERS_COLUMNS = ["date", "country", "total_users", "successful_users", "failed_users"]
+
+def monthly_active_users_by_country(bitmap_rows):
+    """
+    Usuarios activos exactos por mes y país (unión de los bitmaps diarios de cada país).
+
+    Returns:
+        pd.DataFrame: columnas COUNTRY_MONTHLY_USERS_COLUMNS
+    """
+    by_country = {}
+    for row in bitmap_rows:
+        by_country.setdefault(row["country"], []).append(row)
+    frames = [monthly_active_users(rows).assign(country=country) for country, rows in sorted(by_country.items())]
+    if not frames:
+        return pd.DataFrame(columns=COUNTRY_MONTHLY_USERS_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[COUNTRY_MONTHLY_USERS_COLUMNS]
+
+RETURNING_USERS_COLUMNS = ["date", "active_users", "returning_users"]
+
+def monthly_returning_users(bitmap_rows, previous_rows=()):
+    """
+    Usuarios activos de cada mes que también estuvieron activos el mes anterior.
+
+    Args:
+        bitmap_rows: Filas diarias con los bitmaps de BITMAP_FIELDS
+        previous_rows: Filas del mes anterior al primero de bitmap_rows (sin ellas el primer mes
+            queda con 0 usuarios que volvieron)
+
+    Returns:
+        pd.DataFrame: columnas RETURNING_USERS_COLUMNS
+    """
+    months = {}
+    for row in bitmap_rows:
+        months.setdefault(row["date"][:7], []).append(row)
+    result = []
+    previous = _union_bitmaps(previous_rows) if previous_rows else None
+    for month, rows in sorted(months.items()):
+        active = _union_bitmaps(rows)
+        result.append({
+            "date": month,
+            "active_users": active.count(),
+            "returning_users": (active & previous).count() if previous is not None else 0,
+        })
+        previous = active
+    return pd.DataFrame(result, columns=RETURNING_USERS_COLUMNS)
+
+def group_monthly_data(df, distinct_users=None):
+    """
+    Agrupa la data diaria por mes sumando las columnas. Sumar usuarios diarios cuenta varias veces
+    a quien usa el bot más de un día; si se pasa distinct_users (ver monthly_active_users) las
+    columnas de usuarios se reemplazan por los usuarios distintos del mes.
+    """
     monthly_df = df.copy()
     monthly_df['date'] = pd.to_datetime(monthly_df['date'])
     
@@ -157,14 +321,44 @@ def group_monthly_data(df):
     # Realizar la agregación
     monthly_df = monthly_df.groupby(monthly_df['date'].dt.to_period('M')).agg(agg_dict).reset_index()
     monthly_df['date'] = monthly_df['date'].astype(str)
+
+    # Reemplazar usuarios sumados por usuarios distintos del mes
+    if distinct_users is not None:
+        columns = list(monthly_df.columns)
+        users_columns = [col for col in ["total_users", "successful_users", "failed_users"] if col in columns]
+        monthly_df = monthly_df.drop(columns=users_columns).merge(
+            distinct_users[['date'] + users_columns], on='date', how='left')
+        monthly_df[users_columns] = monthly_df[users_columns].fillna(0).astype(int)
+        monthly_df = monthly_df[columns]
     return monthly_df
 
+def group_monthly_data_by_country(df, distinct_users=None):
+    """
+    group_monthly_data para data con columna country: agrupa cada país por separado y, si se pasa
+    distinct_users (ver monthly_active_users_by_country), usa los usuarios distintos de cada país.
+    """
+    columns = list(df.columns)
+    frames = []
+    for country, group in df.groupby("country"):
+        distinct = None
+        if distinct_users is not None:
+            distinct = distinct_users[distinct_users["country"] == country]
+        frames.append(group_monthly_data(group.drop(columns="country"), distinct).assign(country=country))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)[columns]
+
+NEW_USERS_COLUMNS = ["date", "total_users", "total_lists", "failed_lists",
+                     "created_lists", "failed_users", "successful_users"]
+
 def get_new_user_lists_metrics_by_day(start_date: datetime, end_date: datetime, collection) -> pd.DataFrame:
     """
     Obtiene métricas por día de usuarios nuevos en su primer día de uso:
     - total de usuarios nuevos
     - listas totales, fallidas y exitosas
     - usuarios fallidos y exitosos (en su primer día)
+
+    Los datos salen del índice user_first_seen mediante un escaneo por rango de first_seen.
     
     Args:
         start_date (datetime): Fecha de inicio con zona horaria.
@@ -173,147 +367,53 @@ def get_new_user_lists_metrics_by_day(start_date: datetime, end_date: datetime,
     
     Returns:
         pd.DataFrame: DataFrame con columnas:
-            ['date', 'total_users', 'total_reminders', 'failed_reminders',
-             'created_reminders', 'failed_users', 'successful_users']
+            ['date', 'total_users', 'total_lists', 'failed_lists',
+             'created_lists', 'failed_users', 'successful_users']
     """
-    if start_date.tzinfo is None or end_date.tzinfo is None:
-        raise ValueError("start_date y end_date deben tener zona horaria")
-
-    end_date_inclusive = end_date + timedelta(days=1)
-    start_timestamp = start_date.timestamp()
-    end_timestamp = end_date_inclusive.timestamp()
-
-    pipeline = [
-        # Paso 1: determinar la primera aparición de cada usuario
-        {
-            "$group": {
-                "_id": "$user_id",
-                "first_seen": {"$min": "$created_at"}
-            }
-        },
-        # Paso 2: proyectar la fecha de primera vez con zona horaria
-        {
-            "$project": {
-                "user_id": "$_id",
-                "first_seen": 1,
-                "first_seen_date": {
-                    "$dateToString": {
-                        "format": "%Y-%m-%d",
-                        "date": {"$toDate": {"$multiply": ["$first_seen", 1000]}},
-                        "timezone": "America/Argentina/Buenos_Aires"
-                    }
-                },
-                "_id": 0
-            }
-        },
-        # Paso 3: filtrar solo usuarios nuevos dentro del rango de fechas
-        {
-            "$match": {
-                "first_seen": {"$gte": start_timestamp, "$lte": end_timestamp}
-            }
-        },
-        # Paso 4: guardar temporalmente los usuarios nuevos en su primer día
-        {
-            "$lookup": {
-                "from": collection.name,
-                "let": {"user_id": "$user_id", "first_seen": "$first_seen"},
-                "pipeline": [
-                    {
-                        "$match": {
-                            "$expr": {
-                                "$and": [
-                                    {"$eq": ["$user_id", "$$user_id"]},
-                                    {"$eq": [
-                                        {
-                                            "$dateToString": {
-                                                "format": "%Y-%m-%d",
-                                                "date": {"$toDate": {"$multiply": ["$created_at", 1000]}},
-                                                "timezone": "America/Argentina/Buenos_Aires"
-                                            }
-                                        },
-                                        {
-                                            "$dateToString": {
-                                                "format": "%Y-%m-%d",
-                                                "date": {"$toDate": {"$multiply": ["$$first_seen", 1000]}},
-                                                "timezone": "America/Argentina/Buenos_Aires"
-                                            }
-                                        }
-                                    ]}
-                                ]
-                            }
-                        }
-                    }
-                ],
-                "as": "first_day_lists"
-            }
-        },
-        # Paso 5: calcular métricas por usuario
-        {
-            "$project": {
-                "first_seen_date": 1,
-                "has_failed": {
-                    "$anyElementTrue": {
-                        "$map": {
-                            "input": "$first_day_lists",
-                            "as": "r",
-                            "in": {"$eq": ["$$r.status", "error"]}
-                        }
-                    }
-                },
-                "lists": "$first_day_lists"
-            }
-        },
-        # Paso 6: descomponer por fecha
-        {
-            "$group": {
-                "_id": "$first_seen_date",
-                "total_users": {"$sum": 1},
-                "total_lists": {"$sum": {"$size": "$lists"}},
-                "failed_lists": {
-                    "$sum": {
-                        "$size": {
-                            "$filter": {
-                                "input": "$lists",
-                                "cond": {"$eq": ["$$this.status", "error"]}
-                            }
-                        }
-                    }
-                },
-                "failed_users": {"$sum": {"$cond": ["$has_failed", 1, 0]}},
-                "successful_users": {"$sum": {"$cond": ["$has_failed", 0, 1]}}
-            }
-        },
-        # Paso 7: calcular exitosos y proyectar
-        {
-            "$project": {
-                "date": "$_id",
-                "total_users": 1,
-                "total_lists": 1,
-                "failed_lists": 1,
-                "created_lists": {
-                    "$subtract": ["$total_lists", "$failed_lists"]
-                },
-                "failed_users": 1,
-                "successful_users": 1,
-                "_id": 0
-            }
-        },
-        {
-            "$sort": {"date": 1}
-        }
-    ]
-
-    results = list(collection.aggregate(pipeline))
-    df = pd.DataFrame(results)
-
-    if df.empty:
-        return pd.DataFrame(columns=[
-            "date", "total_users", "total_lists", "failed_lists",
-            "created_lists", "failed_users", "successful_users"
-        ])
+    users = pd.DataFrame(read_first_seen(collection, *timestamp_window(start_date, end_date)))
+
+    if users.empty:
+        return pd.DataFrame(columns=NEW_USERS_COLUMNS)
+    return new_user_metrics(users, ["date"])
+
+def new_user_metrics(users, keys):
+    """Agrupa los usuarios de user_first_seen por su primer día (y las demás keys)"""
+    # Un usuario es fallido si tuvo al menos una lista con error en su primer día
+    users = users.rename(columns={"first_seen_date": "date"})
+    users["has_failed"] = users["failed_lists"] > 0
+    df = users.groupby(keys).agg(
+        total_users=("user_id", "count"),
+        total_lists=("total_lists", "sum"),
+        failed_lists=("failed_lists", "sum"),
+        failed_users=("has_failed", "sum"),
+    ).reset_index()
+    df["created_lists"] = df["total_lists"] - df["failed_lists"]
+    df["successful_users"] = df["total_users"] - df["failed_users"]
+    df = df.sort_values(keys).reset_index(drop=True)
+
+    return df[keys + NEW_USERS_COLUMNS[1:]]
+
+COUNTRY_NEW_USERS_COLUMNS = ["date", "country", *NEW_USERS_COLUMNS[1:]]
+
+def get_new_user_lists_metrics_by_country(start_date: datetime, end_date: datetime, collection) -> pd.DataFrame:
+    """
+    Igual que get_new_user_lists_metrics_by_day pero por día y país (ver countries.py).
 
-    return df[["date", "total_users", "total_lists", "failed_lists",
-            "created_lists", "failed_users", "successful_users"]]
+    Returns:
+        pd.DataFrame: DataFrame con columnas COUNTRY_NEW_USERS_COLUMNS
+    """
+    users = pd.DataFrame(read_first_seen(collection, *timestamp_window(start_date, end_date)))
+
+    if users.empty:
+        return pd.DataFrame(columns=COUNTRY_NEW_USERS_COLUMNS)
+    # user_first_seen ya trae el país de los usuarios mapeados; solo se resuelven los que faltan
+    if "country" not in users.columns:
+        users["country"] = None
+    missing = users["country"].isna()
+    if missing.any():
+        countries = get_user_countries(collection, users.loc[missing, "user_id"].tolist())
+        users.loc[missing, "country"] = users.loc[missing, "user_id"].map(countries)
+    return new_user_metrics(users, ["date", "country"])
 
 # Para formatear los datos históricos
 def format_number_smart(number):
@@ -328,9 +428,13 @@ def format_number_smart(number):
             return f"{number:,.0f}".replace(',', '.')
     return str(number)
 
-# MÉTRICAS TOTALES FIJAS - Se calculan una sola vez al iniciar la app
+# MÉTRICAS TOTALES - Se recalculan periódicamente en segundo plano
 def calculate_total_metrics(collection):
-    """Calcula métricas totales desde 2023-01-01 hasta hoy - SOLO SE EJECUTA UNA VEZ"""
+    """
+    Calcula métricas totales desde 2023-01-01 hasta hoy. Las listas salen de las filas diarias de
+    lists_daily y los usuarios se cuentan en Mongo sobre user_first_seen (ver count_first_seen),
+    sin traer un documento por usuario.
+    """
     start_date = "2023-01-01"
     end_date = datetime.now().strftime('%Y-%m-%d')
     start, end = parse_date_range(start_date, end_date)
@@ -339,15 +443,15 @@ def calculate_total_metrics(collection):
     
     # Obtener datos completos
     daily_data = get_daily_data(collection, start, end)
-    daily_new_users_data = get_new_user_lists_metrics_by_day(start, end, collection)
+    users = count_first_seen(collection, *timestamp_window(start, end))
 
     # Calcular métricas totales
     total_lists_attempted = int(daily_data['total_lists'].sum())
     total_lists_created = int(daily_data['created_lists'].sum())
     total_failed_lists = int(daily_data['failed_lists'].sum())
-    total_users = int(daily_new_users_data['total_users'].sum())
-    total_successful_users = int(daily_new_users_data['successful_users'].sum())
-    total_failed_users = int(daily_new_users_data['failed_users'].sum())
+    total_users = int(users['total_users'])
+    total_failed_users = int(users['failed_users'])
+    total_successful_users = total_users - total_failed_users
     
     print("Métricas totales calculadas exitosamente")
     
@@ -360,68 +464,43 @@ def calculate_total_metrics(collection):
         'total_failed_users': format_number_smart(total_failed_users)
     }
 
-def get_notified_users (collection, view: str = 'Daily'):
+def get_notified_users (collection, view: str = 'Daily', start_date=None, end_date=None):
     """
-    Busca en Mongo DB (TranscribeMe.notifications) todos los documentos con el campo 
-    lists_notif y toma el primer elemento del array, que representa la primera fecha de
-    notificación.
+    Cuenta los usuarios notificados por día según la primera fecha de notificación de
+    TranscribeMe.notifications (primer elemento de lists_notif). Los conteos salen del rollup
+    notified_daily y solo se agregan en Mongo los días posteriores a su watermark.
 
     Args:
     collection: colección TranscribeMe.notifications ya conectada 
+    view: 'Daily' o 'Monthly'
+    start_date, end_date: rango con zona horaria (por defecto, desde 2023-01-01 hasta hoy)
 
     Returns:
     data: pandas Data Frame con la cantidad de usuarios notificados por fecha en la forma yyyy-mm-dd
+    (o yyyy-mm en la vista mensual)
     """
-    # Definir zona horaria
-    tz = pytz.timezone('America/Argentina/Buenos_Aires')
+    if start_date is None or end_date is None:
+        start_date, end_date = parse_date_range("2023-01-01", datetime.now(pytz.timezone(TIMEZONE)).strftime('%Y-%m-%d'))
 
-    # Pipeline de agregación
-    pipeline = [
-        # 1. Busca los documentos que tienen el campo lists_notif
-        {
-            "$match": {"lists_notif": {"$exists": True}}
-        },
-        # 2. Projectar solo el campo lists_notif
-        {
-            "$project":{"first_notification": {"$arrayElemAt": ["$lists_notif", 0]}, "_id": 0}
-        }
-    ]
-    
-    # Ejecutar el pipeline y obtener los resultados
-    results = list (collection.aggregate(pipeline))
+    results = _rollup_rows(
+        collection, MONGO_COLLECTION_NOTIFIED_DAILY, start_date, end_date,
+        lambda start_day, end_day: read_notified_daily(collection, start_day, end_day),
+        lambda start_timestamp, end_timestamp: aggregate_notified_daily(collection, start_timestamp, end_timestamp))
 
     # Convertir a Data Frame
-    data = pd.DataFrame(results)
+    data = pd.DataFrame(results, columns=['date', 'notified_users'])
     
     # Si no hay resultados, devolver DataFrame vacío con columnas adecuadas
     if data.empty:
         return pd.DataFrame(columns=['date', 'notified_users'])
     
-    # Convertir timestamp a datetime en UTC y luego convertir a Buenos Aires
-    data["date"] = (pd.to_datetime(data["first_notification"], unit="s", utc=True).dt.tz_convert(tz).dt.strftime("%Y-%m-%d")    )
-    
     # Agrupar según el valor de view
     if view == 'Monthly':
-        # Extraer año y mes (yyyy-mm)
+        # Extraer año y mes (yyyy-mm) y sumar usuarios notificados
         data['date'] = data['date'].str[:7]
-        # Agrupar por mes y sumar usuarios notificados
-        result = (
-            data.groupby('date')['date']
-            .count()
-            .reset_index(name='notified_users')
-            .sort_values('date')
-        )
-    else:
-        # Agrupar por fecha diaria y contar usuarios
-        result = (
-            data['date']
-            .value_counts()
-            .sort_index()
-            .reset_index(name='notified_users')
-            .rename(columns={'index': 'date'})
-        )
+        data = data.groupby('date')['notified_users'].sum().reset_index().sort_values('date')
 
-    return result
+    return data.reset_index(drop=True)
 
 def merge_notified_and_active(notified_users: pd.DataFrame, data: pd.DataFrame) -> pd.DataFrame:
     """
@@ -458,71 +537,71 @@ def get_dau_mau_ratio_data(collection, start_date, end_date, countries=None):
     Obtiene datos combinados de DAU y MAU para calcular el ratio DAU/MAU
     
     Args:
-        collection_dau: Colección de datos diarios
-        collection_mau: Colección de datos mensuales  
-        start_date: Fecha inicio (YYYY-MM-DD)
-        end_date: Fecha fin (YYYY-MM-DD)
+        collection: Colección ListMe.lists ya conectada
+        start_date: Fecha inicio (datetime con zona horaria)
+        end_date: Fecha fin (datetime con zona horaria)
         countries: Lista de países a filtrar (opcional)
     
     Returns:
         DataFrame con columnas: year_month, country, avg_dau, mau, dau_mau_ratio
     """
-    
-    # 1. Obtener datos DAU
+    # DAU diario y MAU exacto del mes (unión de los bitmaps diarios)
     dau_data = get_daily_data(collection, start_date, end_date)
-    dau_data['country'] = "Argentina"
-    
-    # 2. Obtener datos MAU  
-    mau_data = group_monthly_data(dau_data)
-    mau_data['country'] = "Argentina"
+    mau_data = monthly_active_users(get_daily_user_bitmaps(collection, start_date, end_date))
+    return compute_dau_mau_ratio(dau_data, mau_data, countries)
+
+DAU_MAU_COLUMNS = ['year_month', 'country', 'avg_dau', 'mau', 'dau_mau_ratio']
+
+# País de las filas que suman a todos los usuarios (data sin columna country)
+ALL_COUNTRIES = "Todos"
+
+def compute_dau_mau_ratio(dau_data, mau_data, countries=None):
+    """
+    Calcula el ratio DAU/MAU en pandas a partir de data ya obtenida, sin consultar Mongo.
+
+    Args:
+        dau_data: DataFrame diario con columnas date (yyyy-mm-dd), total_users y opcionalmente country
+        mau_data: DataFrame mensual con columnas date (yyyy-mm), total_users y opcionalmente country
+            (ver monthly_active_users y monthly_active_users_by_country)
+        countries: Lista de países a filtrar (opcional)
+
+    Returns:
+        DataFrame con columnas: year_month, country, avg_dau, mau, dau_mau_ratio
+    """
+    dau_data = dau_data.copy()
+    mau_data = mau_data.copy()
+    # Sin desglose por país el ratio es el de todos los usuarios
+    if 'country' not in dau_data.columns:
+        dau_data['country'] = ALL_COUNTRIES
+    if 'country' not in mau_data.columns:
+        mau_data['country'] = ALL_COUNTRIES
     
-    # 3. Filtrar por países si se especifica
+    # 1. Filtrar por países si se especifica
     if countries:
         dau_data = dau_data[dau_data['country'].isin(countries)]
         mau_data = mau_data[mau_data['country'].isin(countries)]
     
-    # 4. Crear year_month para DAU (agregar por mes)
+    # 2. Crear year_month para DAU (agregar por mes)
     dau_data['date'] = pd.to_datetime(dau_data['date'])
     dau_data['year_month'] = dau_data['date'].dt.to_period('M').astype(str)
     
-    # 5. Calcular DAU promedio por mes y país
+    # 3. Calcular DAU promedio por mes y país
     avg_dau_monthly = dau_data.groupby(['year_month', 'country'])['total_users'].mean().reset_index()
     avg_dau_monthly.rename(columns={'total_users': 'avg_dau'}, inplace=True)
     
-    # 6. Preparar MAU data
+    # 4. Preparar MAU data
     mau_data['date'] = pd.to_datetime(mau_data['date'])
     mau_data['year_month'] = mau_data['date'].dt.to_period('M').astype(str)
     mau_monthly = mau_data.groupby(['year_month', 'country'])['total_users'].sum().reset_index()
     mau_monthly.rename(columns={'total_users': 'mau'}, inplace=True)
     
-    # 7. Combinar DAU y MAU
+    # 5. Combinar DAU y MAU
     ratio_data = pd.merge(avg_dau_monthly, mau_monthly, on=['year_month', 'country'], how='inner')
     
-    # 8. Calcular ratio DAU/MAU
+    # 6. Calcular ratio DAU/MAU
     ratio_data['dau_mau_ratio'] = ratio_data['avg_dau'] / ratio_data['mau']
     
-    # 9. Ordenar por fecha
+    # 7. Ordenar por fecha
     ratio_data = ratio_data.sort_values('year_month')
     
-    return ratio_data
-
-def get_lists_content (collection):
-    """
-    Busca todos los documentos en MongoDB (ListMe.lists) y extrae los elementos de todas las listas,
-    y devuelve un dataframe
-
-    Args:
-        collection: Colección ListMe.lists ya conectada
-
-    Returns:
-        cursor: lista de diccionarios con la data
-    """
-    # Buscar documentos con status 'active' y campo 'items' existente
-    cursor = list (collection.find(
-        {"status": "active", "items": {"$exists": True}},
-        {"items": 1, "_id": 0}     # Proyectar solo el campo items, excluir _id
-    ))
-
-    listas = pd.DataFrame(cursor)
-    listas['items']= listas['items'].apply(lambda x: ', '.join(x))
-    return listas
+    return ratio_data[DAU_MAU_COLUMNS]
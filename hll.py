@@ -0,0 +1,90 @@
+"""
+HyperLogLog para estimar usuarios distintos en cualquier rango de días.
+
+Cada día guarda un sketch de 2^p registros (p=12 -> 4096 registros, ~4 KB sin comprimir).
+Los sketches se combinan tomando el máximo registro a registro, así que la unión de un mes o de
+una ventana móvil se obtiene sin volver a leer los documentos originales y sin el índice denso
+de usuarios que necesitan los bitmaps exactos (ver bitmaps.py).
+
+Error estándar relativo: 1.04 / sqrt(2^p). Con p=12 es ~1.6%, es decir que ~95% de las
+estimaciones quedan dentro de ±3.3% del valor exacto. Por debajo de ~2.5 * 2^p elementos se usa
+linear counting, que en esos tamaños es prácticamente exacto.
+"""
+import hashlib
+import math
+import zlib
+
+import numpy as np
+
+DEFAULT_PRECISION = 12
+
+
+def _hash64(value):
+    """Hash estable de 64 bits (no depende de PYTHONHASHSEED, así es igual entre procesos)"""
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+
+def standard_error(p=DEFAULT_PRECISION):
+    """Error estándar relativo de la estimación con precisión p"""
+    return 1.04 / math.sqrt(1 << p)
+
+
+class HyperLogLog:
+    def __init__(self, p=DEFAULT_PRECISION, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = registers if registers is not None else np.zeros(self.m, dtype=np.uint8)
+
+    def add(self, value):
+        return self.update([value])
+
+    def update(self, values):
+        """Agrega varios valores de una vez: los registros se actualizan vectorizados con numpy"""
+        hashes = np.fromiter((_hash64(value) for value in values), dtype=np.uint64)
+        if not len(hashes):
+            return self
+        shift = np.uint64(64 - self.p)
+        index = (hashes >> shift).astype(np.intp)
+        w = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # Posición del primer bit en 1 dentro de los 64 - p bits restantes. w tiene a lo sumo
+        # 64 - p <= 53 bits, así que pasa a float sin perder precisión y frexp da su bit_length
+        bit_length = np.frexp(w.astype(np.float64))[1]
+        rank = ((64 - self.p) - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        """Une otro sketch a este (in place)"""
+        if other.p != self.p:
+            raise ValueError("No se pueden unir sketches con distinta precisión")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """Estimación de la cantidad de elementos distintos"""
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Corrección para cardinalidades bajas (linear counting)
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return zlib.compress(self.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Reconstruye un sketch serializado; data=None devuelve un sketch vacío"""
+        if data is None:
+            return cls()
+        registers = np.frombuffer(zlib.decompress(data), dtype=np.uint8).copy()
+        return cls(int(math.log2(len(registers))), registers)
+
+    @classmethod
+    def union(cls, sketches):
+        """Une una lista de sketches en uno nuevo"""
+        result = cls()
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
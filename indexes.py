@@ -0,0 +1,148 @@
+"""
+Índices que necesitan las consultas del dashboard y verificación de sus planes de ejecución.
+
+ensure_indexes() crea (si faltan) los índices declarados en REQUIRED_INDEXES. check_query_plans()
+corre explain sobre los pipelines de producción y reporta los que hacen COLLSCAN o examinan
+demasiados documentos por cada documento que pasa el filtro.
+
+Uso por línea de comandos:
+    python indexes.py                   # crea los índices que falten y verifica los planes
+    python indexes.py --no-ensure       # solo verifica
+    python indexes.py --max-ratio 1.5   # presupuesto de documentos examinados por documento filtrado
+"""
+import argparse
+import sys
+import time
+
+import pymongo
+
+from config import (MONGO_DB_LIST_ME, MONGO_COLLECTION_LISTS, MONGO_DB_TRANSCRIBE_ME,
+                    MONGO_COLLECTION_NOTIFICATIONS, MONGO_DB_ROLLUPS, MONGO_COLLECTION_LISTS_DAILY,
+                    MONGO_COLLECTION_USER_FIRST_SEEN, MONGO_COLLECTION_NOTIFIED_DAILY, MONGO_COLLECTION_USER_COUNTRIES,
+                    MONGO_COLLECTION_LISTS_DAILY_COUNTRY, INDEX_MAX_EXAMINED_RATIO)
+from db import explain_aggregate, summarize_explain, get_client
+from countries import user_daily_pipeline
+from export import lists_content_query
+from live import new_lists_pipeline
+from rollups import (daily_metrics_pipeline, first_seen_pipeline, notified_daily_pipeline, timestamp_to_day,
+                     DAY_EXPRESSION)
+
+# (base, colección) -> índices como listas de (campo, dirección)
+REQUIRED_INDEXES = {
+    (MONGO_DB_LIST_ME, MONGO_COLLECTION_LISTS): [
+        # Cubre las métricas diarias y el índice de primera aparición (solo leen estos tres campos)
+        [("created_at", pymongo.ASCENDING), ("status", pymongo.ASCENDING), ("user_id", pymongo.ASCENDING)],
+        # Historial de un usuario
+        [("user_id", pymongo.ASCENDING), ("created_at", pymongo.ASCENDING)],
+        # Exportación de listas activas por rango
+        [("status", pymongo.ASCENDING), ("created_at", pymongo.ASCENDING)],
+    ],
+    (MONGO_DB_TRANSCRIBE_ME, MONGO_COLLECTION_NOTIFICATIONS): [
+        # Primera notificación de listas
+        [("lists_notif.0", pymongo.ASCENDING)],
+    ],
+    (MONGO_DB_ROLLUPS, MONGO_COLLECTION_LISTS_DAILY): [[("date", pymongo.ASCENDING)]],
+    (MONGO_DB_ROLLUPS, MONGO_COLLECTION_USER_FIRST_SEEN): [[("first_seen", pymongo.ASCENDING)]],
+    (MONGO_DB_ROLLUPS, MONGO_COLLECTION_NOTIFIED_DAILY): [[("date", pymongo.ASCENDING)]],
+    (MONGO_DB_ROLLUPS, MONGO_COLLECTION_USER_COUNTRIES): [[("country", pymongo.ASCENDING)]],
+    (MONGO_DB_ROLLUPS, MONGO_COLLECTION_LISTS_DAILY_COUNTRY): [[("date", pymongo.ASCENDING)]],
+}
+
+
+def ensure_indexes(client):
+    """
+    Crea los índices de REQUIRED_INDEXES que todavía no existen (create_index no hace nada si
+    el índice ya está).
+
+    Returns:
+        list: nombres de los índices asegurados
+    """
+    names = []
+    for (db_name, collection_name), indexes in REQUIRED_INDEXES.items():
+        collection = client[db_name][collection_name]
+        for keys in indexes:
+            start = time.perf_counter()
+            name = collection.create_index(keys)
+            print(f"Índice {db_name}.{collection_name}.{name} listo en {time.perf_counter() - start:.2f}s")
+            names.append(name)
+    return names
+
+
+def production_pipelines(client, days=30):
+    """
+    Pipelines de producción sobre un rango reciente de days días.
+
+    Returns:
+        dict: nombre -> (colección, pipeline)
+    """
+    lists = client[MONGO_DB_LIST_ME][MONGO_COLLECTION_LISTS]
+    notifications = client[MONGO_DB_TRANSCRIBE_ME][MONGO_COLLECTION_NOTIFICATIONS]
+    end_timestamp = time.time()
+    start_timestamp = end_timestamp - days * 86400
+    return {
+        "daily_metrics": (lists, daily_metrics_pipeline(start_timestamp, end_timestamp, include_users=True)),
+        "lists_daily_touched_days": (lists, [
+            {"$match": {"created_at": {"$gt": start_timestamp}}},
+            {"$group": {"_id": DAY_EXPRESSION, "max_created_at": {"$max": "$created_at"}}}
+        ]),
+        "user_first_seen": (lists, first_seen_pipeline(start_timestamp)),
+        "daily_country_metrics": (lists, user_daily_pipeline(start_timestamp, end_timestamp)),
+        # Modo en vivo: listas del último minuto
+        "live_new_lists": (lists, new_lists_pipeline(end_timestamp - 60, None)),
+        "notified_daily": (notifications, notified_daily_pipeline(start_timestamp, end_timestamp)),
+        # La exportación usa find con este mismo filtro y proyección
+        "export_lists_content": (lists, [
+            {"$match": lists_content_query(timestamp_to_day(start_timestamp), timestamp_to_day(end_timestamp))},
+            {"$project": {"items": 1, "_id": 0}}
+        ]),
+    }
+
+
+def check_query_plans(client, max_ratio=INDEX_MAX_EXAMINED_RATIO, days=30):
+    """
+    Corre explain sobre cada pipeline de producción y compara los documentos examinados con los
+    que pasan el $match inicial.
+
+    Returns:
+        list: (nombre, resumen del explain, lista de problemas) por pipeline
+    """
+    report = []
+    for name, (collection, pipeline) in production_pipelines(client, days).items():
+        summary = summarize_explain(explain_aggregate(collection, pipeline))
+        matched = collection.count_documents(pipeline[0]["$match"])
+        problems = []
+        if "COLLSCAN" in summary["stages"]:
+            problems.append("COLLSCAN")
+        examined = summary["docs_examined"] or 0
+        ratio = examined / max(matched, 1)
+        if ratio > max_ratio:
+            problems.append(f"examina {examined} documentos para {matched} filtrados ({ratio:.1f}x > {max_ratio}x)")
+        summary["matched"] = matched
+        report.append((name, summary, problems))
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Asegura los índices del dashboard y verifica los planes de las consultas")
+    parser.add_argument("--no-ensure", action="store_true", help="No crea índices, solo verifica los planes")
+    parser.add_argument("--no-check", action="store_true", help="No verifica los planes")
+    parser.add_argument("--max-ratio", type=float, default=INDEX_MAX_EXAMINED_RATIO,
+                        help="Documentos examinados tolerados por documento filtrado")
+    parser.add_argument("--days", type=int, default=30, help="Días del rango usado para los explain")
+    args = parser.parse_args()
+
+    client = get_client()
+    if not args.no_ensure:
+        ensure_indexes(client)
+    if args.no_check:
+        sys.exit(0)
+
+    failed = False
+    for name, summary, problems in check_query_plans(client, args.max_ratio, args.days):
+        print(f"{'FALLA' if problems else 'OK':<6}{name}: {' > '.join(summary['stages'])}, "
+              f"{summary['docs_examined']} docs y {summary['keys_examined']} claves examinados, "
+              f"{summary['matched']} filtrados")
+        for problem in problems:
+            print(f"      {problem}")
+        failed = failed or bool(problems)
+    sys.exit(1 if failed else 0)
@@ -2,6 +2,7 @@ from dash import dcc, html
 from datetime import datetime
 import pytz
 from get_data import get_daily_data
+from config import DASHBOARD_START_DATE, LIVE_REFRESH_SECONDS
 
 timezone = pytz.timezone('America/Argentina/Buenos_Aires')
 
@@ -26,9 +27,9 @@ def serve_layout():
                 html.Label("Fecha de inicio:"),
                 dcc.DatePickerSingle(
                     id='start_date_picker',
-                    date=datetime(2025, 6, 1),
+                    date=datetime.fromisoformat(DASHBOARD_START_DATE),
                     display_format='YYYY-MM-DD',
-                    min_date_allowed=datetime(2025, 6, 1).date(),
+                    min_date_allowed=datetime.fromisoformat(DASHBOARD_START_DATE).date(),
                     max_date_allowed=datetime.now(timezone).date(),
                     style={'marginBottom': '10px'}
                 ),
@@ -40,7 +41,7 @@ def serve_layout():
                     id='end_date_picker',
                     date=datetime.now(timezone),
                     display_format='YYYY-MM-DD',
-                    min_date_allowed=datetime(2025, 6, 1).date(),
+                    min_date_allowed=datetime.fromisoformat(DASHBOARD_START_DATE).date(),
                     max_date_allowed=datetime.now(timezone).date(),
                     style={'marginBottom': '10px'}
                 ),
@@ -57,6 +58,14 @@ def serve_layout():
                     value='Daily',
                     style={'display': 'flex', 'gap': '10px'}
                 ),
+                # Modo en vivo: refresca las cifras de hoy cada LIVE_REFRESH_SECONDS
+                dcc.Checklist(
+                    id='live_mode',
+                    options=[{'label': ' En vivo', 'value': 'live'}],
+                    value=[],
+                    style={'marginTop': '10px'}
+                ),
+                dcc.Interval(id='live_interval', interval=LIVE_REFRESH_SECONDS * 1000, disabled=True),
             ], style={'margin': '10px', 'flex': '1'})
         ], style={'display': 'flex', 'justifyContent': 'space-between', 'margin': '20px'}),
 
@@ -69,6 +78,9 @@ def serve_layout():
             html.Div([html.H3("Usuarios Exitosos"), html.H2(id='total_successful_users', children='0')], className='metric-card'),
             html.Div([html.H3("Usuarios Fallidos"), html.H2(id='total_failed_users', children='0')], className='metric-card'),
         ], style={'display': 'flex', 'flexWrap': 'wrap', 'justifyContent': 'space-around', 'gap': '15px', 'margin': '20px'}),
+        html.P(id='total_metrics_as_of', style={'textAlign': 'center', 'color': '#888', 'fontSize': '12px'}),
+        # Refresco periódico de las tarjetas (los valores se recalculan en segundo plano)
+        dcc.Interval(id='total_metrics_interval', interval=60 * 1000),
 
         # Pestañas para las vistas
         html.Div([
@@ -77,14 +89,55 @@ def serve_layout():
                 dcc.Tab(label="Análisis por países", value="países"),
             ], style={'marginBottom': '20px'}),
 
+            # Aviso cuando alguna consulta del rango falló o superó su timeout
+            html.P(id="data_warning", style={'textAlign': 'center', 'color': '#c0392b'}),
+
             # Contenido de las pestañas
-            html.Div(id="tab-content")
+            html.Div(id="tab-content"),
+
+            # Data diaria del rango seleccionado: la llena un único callback que consulta Mongo y de
+            # ella salen la vista mensual, el filtro por país y los gráficos
+            dcc.Store(id="range_data"),
+            # Columnas de los gráficos en la vista elegida (solo se usa con CLIENTSIDE_CHARTS)
+            dcc.Store(id="chart_columns")
         ], style={'margin': '20px'}),
 
         # Sección de descarga de listas
         html.Div([
             html.H3("Descarga del contenido de listas"), 
-            html.Button("Download CSV", id="btn_csv"),
-            dcc.Download(id="download-dataframe-csv"),]
+            html.P("Se exportan las listas creadas en el rango de fechas seleccionado."),
+            html.Div([
+                html.Div([
+                    html.Label("Formato:"),
+                    dcc.RadioItems(
+                        id='export_format',
+                        options=[
+                            {'label': 'CSV', 'value': 'csv'},
+                            {'label': 'Parquet', 'value': 'parquet'}
+                        ],
+                        value='csv',
+                        style={'display': 'flex', 'gap': '10px'}
+                    ),
+                ], style={'margin': '10px'}),
+                html.Div([
+                    html.Label("Columnas adicionales:"),
+                    dcc.Checklist(
+                        id='export_columns',
+                        options=[
+                            {'label': 'Fecha de creación', 'value': 'created_at'},
+                            {'label': 'Usuario', 'value': 'user_id'},
+                            {'label': 'Estado', 'value': 'status'}
+                        ],
+                        value=[],
+                        style={'display': 'flex', 'gap': '10px'}
+                    ),
+                ], style={'margin': '10px'}),
+                html.Div([
+                    dcc.Checklist(id="export_gzip", options=[{'label': 'Comprimir CSV (gzip)', 'value': 'gzip'}],
+                                  value=[]),
+                ], style={'margin': '10px'}),
+            ], style={'display': 'flex', 'flexWrap': 'wrap'}),
+            html.A(html.Button("Download", id="btn_csv"), id="export_link",
+                   href="/export/contenido_listas?format=csv"),]
             )
 ], style={'fontFamily': 'Arial, sans-serif', 'margin': '0 auto', 'maxWidth': '1400px', 'padding': '20px'})
@@ -0,0 +1,140 @@
+"""
+Modo en vivo: refresco de las cifras de hoy sin volver a consultar el día completo.
+
+El estado de hoy guarda, por usuario, sus listas y listas fallidas del día, su país, su índice de
+bitmap y si es un usuario nuevo, junto con el watermark (mayor created_at visto). En cada refresco
+solo se consultan las listas con created_at posterior al watermark (índice por created_at), se
+suman al estado y se resuelven país, índice y primer día solo de los usuarios que aparecen por
+primera vez en el día (el índice solo se lee: los usuarios que todavía no tienen uno quedan
+pendientes en los bitmaps hasta el próximo refresco de los rollups, ver bitmaps.py). Con ese estado se arman las filas de hoy de cada cache por día (ver
+callbacks.refresh_today), así que el rango se rearma sin consultar Mongo por los días anteriores.
+
+El estado vive en una cache compartida: con varios workers o varias pantallas cada refresco parte
+del último watermark publicado por cualquiera de ellos.
+"""
+import threading
+from datetime import datetime
+
+import pandas as pd
+import pytz
+
+from bitmaps import get_user_indexes
+from config import TIMEZONE, MONGO_COLLECTION_USER_FIRST_SEEN
+from countries import get_user_countries, group_user_days
+from db import aggregate
+from get_data import new_user_metrics
+from rollups import day_start, get_rollup_db, timestamp_to_day
+
+tz = pytz.timezone(TIMEZONE)
+
+# Tipos de dato de la cache por día que se arman con el estado de hoy
+LIVE_PREFIXES = ('country_daily', 'country_new_users')
+
+# Evita que dos refrescos del mismo proceso sumen las mismas listas
+_lock = threading.Lock()
+
+
+def new_lists_pipeline(watermark, since):
+    """Listas con created_at posterior al watermark (o desde since si todavía no hay watermark)"""
+    created_at = {"$gt": watermark} if watermark is not None else {"$gte": since}
+    return [
+        {"$match": {"created_at": created_at}},
+        {"$project": {"user_id": 1, "status": 1, "created_at": 1, "_id": 0}}
+    ]
+
+
+def returning_users(collection, user_ids, day):
+    """
+    user_ids que ya tenían listas antes de day (yyyy-mm-dd). Se leen de user_first_seen y los que
+    todavía no llegaron al índice se verifican sobre las listas (índice por user_id y created_at).
+    """
+    index = get_rollup_db(collection)[MONGO_COLLECTION_USER_FIRST_SEEN]
+    returning, indexed = set(), set()
+    for i in range(0, len(user_ids), 1000):
+        for doc in index.find({"_id": {"$in": user_ids[i:i + 1000]}}, {"first_seen_date": 1}):
+            indexed.add(doc["_id"])
+            if doc["first_seen_date"] < day:
+                returning.add(doc["_id"])
+
+    missing = [user_id for user_id in user_ids if user_id not in indexed]
+    for i in range(0, len(missing), 1000):
+        rows = aggregate(collection, [
+            {"$match": {"user_id": {"$in": missing[i:i + 1000]}, "created_at": {"$lt": day_start(day).timestamp()}}},
+            {"$group": {"_id": "$user_id"}}
+        ], "live_returning_users")
+        returning.update(row["_id"] for row in rows)
+    return returning
+
+
+def fold_new_lists(collection, cache):
+    """
+    Suma al estado de hoy las listas posteriores al watermark y lo publica en cache.
+
+    Args:
+        collection: Colección ListMe.lists ya conectada
+        cache: Cache (compartida) donde vive el estado
+
+    Returns:
+        dict: 'date', 'watermark' y 'users' (user_id -> total_lists, failed_lists, country, idx, new)
+    """
+    today = datetime.now(tz).strftime('%Y-%m-%d')
+    key = f"live_{today}"
+    with _lock:
+        state = cache.get(key) or {"date": today, "watermark": None, "users": {}}
+        rows = aggregate(collection, new_lists_pipeline(state["watermark"], day_start(today).timestamp()),
+                         "live_new_lists")
+        # Las listas de pasada la medianoche quedan para el estado del día siguiente
+        rows = [row for row in rows if timestamp_to_day(row["created_at"]) == today]
+        if not rows:
+            return state
+
+        users = {user_id: dict(user) for user_id, user in state["users"].items()}
+        new_ids = []
+        for row in rows:
+            user = users.get(row["user_id"])
+            if user is None:
+                user = users[row["user_id"]] = {"total_lists": 0, "failed_lists": 0}
+                new_ids.append(row["user_id"])
+            user["total_lists"] += 1
+            if row.get("status") == "error":
+                user["failed_lists"] += 1
+
+        # País, índice de bitmap y primer día solo de los usuarios que no estaban en el estado
+        if new_ids:
+            countries = get_user_countries(collection, new_ids)
+            indexes = get_user_indexes(get_rollup_db(collection), new_ids)
+            returning = returning_users(collection, new_ids, today)
+            for user_id in new_ids:
+                users[user_id].update(country=countries[user_id], idx=indexes.get(user_id),
+                                      new=user_id not in returning)
+
+        state = {"date": today, "watermark": max(row["created_at"] for row in rows), "users": users}
+        cache.set(key, state)
+        print(f"Modo en vivo: {len(rows)} listas nuevas ({len(new_ids)} usuarios nuevos en el día)")
+        return state
+
+
+def today_entries(state):
+    """
+    Filas de hoy de cada cache por día, con el mismo formato que arma callbacks.get_data_bundle.
+
+    Returns:
+        dict: prefijo de LIVE_PREFIXES -> fila de hoy ({} si hoy no hay listas)
+    """
+    today, users = state["date"], state["users"]
+    if not users:
+        return {prefix: {} for prefix in LIVE_PREFIXES}
+
+    user_days = [{"date": today, "user_id": user_id, "total_lists": user["total_lists"],
+                  "failed_lists": user["failed_lists"]} for user_id, user in users.items()]
+    country_rows = group_user_days(user_days, {user_id: user["country"] for user_id, user in users.items()},
+                                   {user_id: user["idx"] for user_id, user in users.items() if user["idx"] is not None})
+    entries = {'country_daily': {"date": today, "rows": country_rows}, 'country_new_users': {}}
+
+    new_users = pd.DataFrame([{"date": today, "user_id": user_id, "country": user["country"],
+                               "total_lists": user["total_lists"], "failed_lists": user["failed_lists"]}
+                              for user_id, user in users.items() if user["new"]])
+    if not new_users.empty:
+        entries['country_new_users'] = {"date": today,
+                                        "rows": new_user_metrics(new_users, ["date", "country"]).to_dict('records')}
+    return entries
@@ -0,0 +1,144 @@
+"""
+Métricas de la app en el formato de texto de Prometheus, servidas en /metrics.
+
+- Histogramas de duración de cada callback de Dash, de cada aggregate de Mongo (ver db.py) y
+  del armado de cada figura.
+- Contadores de documentos devueltos por consulta, consultas lentas y errores de callbacks.
+- Colectores que se leen al momento del scrape (por ejemplo los hit ratios de las caches).
+
+Los valores son por proceso: con varios workers de gunicorn cada uno expone los suyos.
+"""
+import threading
+import time
+from functools import wraps
+
+from dash.exceptions import PreventUpdate
+from flask import Response
+
+# Límites de los buckets de los histogramas de duración (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_metrics = []
+_collectors = []
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple((name, str(labels.get(name, ""))) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple((name, str(labels.get(name, ""))) for name in self.labelnames)
+        with self.lock:
+            counts, total, count = self.values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            counts = [c + 1 if value <= bound else c for c, bound in zip(counts, self.buckets)]
+            self.values[key] = (counts, total + value, count + 1)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(key + (('le', str(bound)),))} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+CALLBACK_SECONDS = Histogram("dash_callback_duration_seconds", "Duración de los callbacks de Dash", ["callback"])
+CALLBACK_ERRORS = Counter("dash_callback_errors_total", "Callbacks que terminaron con una excepción", ["callback"])
+QUERY_SECONDS = Histogram("mongo_query_duration_seconds", "Duración de los aggregate de Mongo", ["query"])
+QUERY_DOCUMENTS = Counter("mongo_query_documents_returned_total", "Documentos devueltos por los aggregate",
+                          ["query"])
+QUERY_TIMEOUTS = Counter("mongo_query_timeouts_total", "Aggregate cancelados por maxTimeMS", ["query"])
+SLOW_QUERIES = Counter("mongo_slow_queries_total", "Aggregate que superaron SLOW_QUERY_SECONDS", ["query"])
+FIGURE_SECONDS = Histogram("dash_figure_build_seconds", "Armado y serialización de cada figura", ["chart"])
+
+
+def timed_callback(func):
+    """Mide la duración de un callback de Dash y cuenta sus errores (PreventUpdate no es error)"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except PreventUpdate:
+            raise
+        except Exception:
+            CALLBACK_ERRORS.inc(callback=func.__name__)
+            raise
+        finally:
+            CALLBACK_SECONDS.observe(time.perf_counter() - start, callback=func.__name__)
+    return wrapper
+
+
+def register_collector(collect):
+    """
+    Registra una función que se ejecuta en cada scrape y devuelve muestras como tuplas
+    (nombre, tipo, ayuda, labels dict, valor).
+    """
+    _collectors.append(collect)
+
+
+def render():
+    """Todas las métricas en formato de texto de Prometheus"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        try:
+            samples = collect()
+        except Exception as e:
+            print(f"Error leyendo métricas de {collect.__name__}: {e}")
+            continue
+        declared = set()
+        for name, metric_type, help_text, labels, value in samples:
+            if name not in declared:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+                declared.add(name)
+            lines.append(f"{name}{_format_labels(sorted(labels.items()))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def register_metrics_route(server):
+    """
+    Registra /metrics en el servidor Flask. Debe llamarse antes de instanciar la autenticación
+    para que la ruta quede protegida (Prometheus puede usar basic_auth).
+    """
+    @server.route("/metrics")
+    def metrics():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
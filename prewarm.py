@@ -0,0 +1,119 @@
+"""
+Precalentamiento de las caches para los rangos más usados del dashboard.
+
+Arma el bundle de cada rango (ver callbacks.get_data_bundle) y, si los gráficos se arman en el
+servidor, las figuras de las dos vistas con los mismos datos que reciben los callbacks (pasando
+por el dcc.Store), así el primer visitante después de un deploy o de que venza la cache encuentra
+todo caliente. Los rangos son el de por defecto del layout (DASHBOARD_START_DATE a hoy), los
+últimos 7, 30 y 90 días, el mes en curso y el mes anterior.
+
+Las consultas de cada bundle corren en un executor propio de PREWARM_WORKERS hilos: una pasada no
+ocupa los hilos del executor acotado que comparten los callbacks (ver concurrency.py). Las figuras
+se cachean por la huella de su data, así que solo se vuelven a armar las que cambiaron.
+
+Con un backend de cache compartido (CACHE_BACKEND disk o redis) un solo worker precalienta en
+cada intervalo (lease en rollup_state) y el resto lee del backend; con cache en memoria cada
+worker precalienta la suya.
+
+Uso por línea de comandos (por ejemplo después de un deploy, con el backend compartido):
+    python prewarm.py
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytz
+
+from config import (DASHBOARD_START_DATE, PREWARM_REFRESH_SECONDS, PREWARM_WORKERS, CLIENTSIDE_CHARTS, CACHE_BACKEND,
+                    TIMEZONE)
+from callbacks import (collection, get_data_bundle, bundle_to_store, bundle_from_store, general_figures,
+                       country_figures, country_options, default_countries)
+from rollups import get_rollup_db, acquire_lease
+from scheduler import start_periodic_task, start_background_task
+
+tz = pytz.timezone(TIMEZONE)
+
+VIEWS = ('Daily', 'Monthly')
+
+# Hilos propios del precalentamiento, separados del executor de los callbacks
+_executor = ThreadPoolExecutor(max_workers=PREWARM_WORKERS, thread_name_prefix='prewarm')
+
+
+def preset_ranges(today=None):
+    """
+    Rangos a precalentar.
+
+    Returns:
+        dict: nombre -> (start_date, end_date) en formato yyyy-mm-dd
+    """
+    today = today or datetime.now(tz).date()
+    first_of_month = today.replace(day=1)
+    previous_month_end = first_of_month - timedelta(days=1)
+    ranges = {
+        'default': (datetime.fromisoformat(DASHBOARD_START_DATE).date(), today),
+        'last_7_days': (today - timedelta(days=6), today),
+        'last_30_days': (today - timedelta(days=29), today),
+        'last_90_days': (today - timedelta(days=89), today),
+        'month_to_date': (first_of_month, today),
+        'previous_month': (previous_month_end.replace(day=1), previous_month_end),
+    }
+    return {name: (start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')) for name, (start, end) in ranges.items()}
+
+
+def prewarm_range(start_date, end_date, views=VIEWS):
+    """
+    Rearma el bundle del rango aunque ya esté en cache (así cada pasada renueva su TTL y los rangos
+    que incluyen hoy no vencen entre pasadas) y, con gráficos en el servidor, deja en cache sus
+    figuras en cada vista.
+    """
+    bundle = get_data_bundle(start_date, end_date, refresh=True, executor=_executor)
+    if CLIENTSIDE_CHARTS:
+        return bundle
+    # Las figuras se cachean por la huella de la data: se arman desde el store como en los callbacks
+    stored = bundle_from_store(bundle_to_store(bundle))
+    countries = default_countries(country_options(stored))
+    for view in views:
+        general_figures(stored, view)
+        country_figures(stored, view, countries)
+    return bundle
+
+
+def prewarm(ranges=None):
+    """
+    Precalienta todos los rangos de preset_ranges() (o los pasados).
+
+    Returns:
+        dict: nombre -> segundos que tardó cada rango
+    """
+    elapsed = {}
+    for name, (start_date, end_date) in (ranges or preset_ranges()).items():
+        start = time.perf_counter()
+        bundle = prewarm_range(start_date, end_date)
+        elapsed[name] = time.perf_counter() - start
+        degraded = f" (incompleto: {', '.join(bundle['degraded'])})" if bundle['degraded'] else ""
+        print(f"Precalentado {name} ({start_date} a {end_date}) en {elapsed[name]:.2f}s{degraded}")
+    return elapsed
+
+
+def prewarm_once():
+    """Precalienta si ningún otro worker lo hizo en este intervalo (solo importa con backend compartido)"""
+    if CACHE_BACKEND == 'memory':
+        return prewarm()
+    # El lease no se libera: vence poco antes del próximo ciclo, así que entre todos los workers
+    # se precalienta una sola vez por intervalo
+    lease_seconds = PREWARM_REFRESH_SECONDS * 0.9 if PREWARM_REFRESH_SECONDS > 0 else 60
+    if not acquire_lease(get_rollup_db(collection), 'prewarm', lease_seconds):
+        return {}
+    return prewarm()
+
+
+def start_prewarm():
+    """Precalienta al arrancar y después cada PREWARM_REFRESH_SECONDS (no bloquea el arranque)"""
+    if PREWARM_REFRESH_SECONDS > 0:
+        start_periodic_task('prewarm', prewarm_once, PREWARM_REFRESH_SECONDS)
+    elif PREWARM_REFRESH_SECONDS == 0:
+        start_background_task('prewarm', prewarm_once)
+
+
+if __name__ == '__main__':
+    prewarm()
@@ -0,0 +1,676 @@
+"""
+Rollups pre-agregados sobre ListMe.lists.
+
+lists_daily guarda una fila por día (zona horaria de Buenos Aires) con las mismas métricas que
+devolvía get_daily_data, más sketches HyperLogLog (estimación, ver hll.py) y bitmaps exactos (ver
+bitmaps.py) de los usuarios del día, totales, exitosos y fallidos. El refresco es incremental: solo se recalculan los días que recibieron
+documentos con created_at posterior al último watermark guardado en rollup_state.
+
+user_first_seen guarda un documento por usuario con su primera aparición (first_seen y
+first_seen_date) y las listas totales/fallidas de ese primer día. Se actualiza con los documentos
+posteriores al watermark y reemplaza el $lookup correlacionado de las métricas de usuarios nuevos.
+Cada refresco guarda valores absolutos recalculados sobre las listas (repetirlo no cambia nada) y la
+reconstrucción completa se arma en una colección aparte que reemplaza al índice con un rename.
+
+notified_daily guarda, sobre TranscribeMe.notifications, cuántos usuarios recibieron su primera
+notificación de listas (primer elemento de lists_notif) cada día.
+
+Uso por línea de comandos:
+    python rollups.py            # refresco incremental
+    python rollups.py --full     # reconstruye todos los rollups
+"""
+import argparse
+from datetime import datetime, timedelta, time
+
+import pymongo
+import pytz
+
+from bitmaps import UserBitmap, get_user_indexes, assign_user_indexes
+from db import aggregate, get_client
+from hll import HyperLogLog
+from config import (MONGO_DB_LIST_ME, MONGO_COLLECTION_LISTS, MONGO_DB_ROLLUPS,
+                    MONGO_COLLECTION_LISTS_DAILY, MONGO_COLLECTION_ROLLUP_STATE, MONGO_COLLECTION_USER_FIRST_SEEN,
+                    MONGO_COLLECTION_NOTIFIED_DAILY, MONGO_DB_TRANSCRIBE_ME, MONGO_COLLECTION_NOTIFICATIONS, TIMEZONE,
+                    MONGO_COLLECTION_USER_COUNTRIES, ROLLUP_LEASE_SECONDS)
+
+tz = pytz.timezone(TIMEZONE)
+
+DAILY_COLUMNS = ["date", "total_lists", "failed_lists", "created_lists",
+                 "total_users", "failed_users", "successful_users"]
+
+# Sketches de usuarios guardados en lists_daily y el conjunto de user_ids del que salen
+SKETCH_FIELDS = {
+    "users_hll": "user_ids",
+    "successful_users_hll": "successful_user_ids",
+    "failed_users_hll": "failed_user_ids",
+}
+
+# Bitmaps exactos de usuarios guardados en lists_daily y el conjunto de user_ids del que salen
+BITMAP_FIELDS = {
+    "users_bitmap": "user_ids",
+    "successful_users_bitmap": "successful_user_ids",
+    "failed_users_bitmap": "failed_user_ids",
+}
+
+# Expresión que convierte created_at (Unix timestamp en segundos) al día local yyyy-mm-dd
+DAY_EXPRESSION = {
+    "$dateToString": {
+        "format": "%Y-%m-%d",
+        "date": {"$toDate": {"$multiply": ["$created_at", 1000]}},  # Convertir segundos a milisegundos
+        "timezone": TIMEZONE
+    }
+}
+
+
+def get_rollup_db(collection):
+    """Devuelve la base donde viven los rollups, reutilizando el cliente de la colección."""
+    return collection.database.client[MONGO_DB_ROLLUPS]
+
+
+def get_watermark(db, name):
+    """Devuelve el último created_at procesado por el rollup name, o None si nunca corrió."""
+    state = db[MONGO_COLLECTION_ROLLUP_STATE].find_one({"_id": name})
+    return state.get("watermark") if state else None
+
+
+def set_watermark(db, name, watermark):
+    db[MONGO_COLLECTION_ROLLUP_STATE].update_one(
+        {"_id": name},
+        {"$set": {"watermark": watermark, "updated_at": datetime.now(pytz.utc)}},
+        upsert=True
+    )
+
+
+def acquire_lease(db, name, seconds):
+    """
+    Toma un lease sobre el rollup name para que un solo proceso (por ejemplo, un solo worker de
+    gunicorn) lo refresque a la vez. Devuelve False si otro proceso tiene el lease vigente.
+    """
+    now = datetime.now(pytz.utc)
+    try:
+        db[MONGO_COLLECTION_ROLLUP_STATE].find_one_and_update(
+            {"_id": name, "$or": [{"lease_until": {"$exists": False}}, {"lease_until": {"$lt": now}}]},
+            {"$set": {"lease_until": now + timedelta(seconds=seconds)}},
+            upsert=True
+        )
+    except pymongo.errors.DuplicateKeyError:
+        return False
+    return True
+
+
+def release_lease(db, name):
+    db[MONGO_COLLECTION_ROLLUP_STATE].update_one({"_id": name}, {"$unset": {"lease_until": ""}})
+
+
+def run_with_lease(db, name, refresh):
+    """
+    Ejecuta refresh() solo si este proceso obtiene el lease de name. Con varios workers cada
+    refresco (incluido el backfill completo del primer deploy) corre en uno solo; el resto
+    devuelve 0 y lee lo que ese escribió.
+    """
+    if not acquire_lease(db, name, ROLLUP_LEASE_SECONDS):
+        return 0
+    try:
+        return refresh()
+    finally:
+        release_lease(db, name)
+
+
+def day_start(day):
+    """Devuelve el inicio del día local (str yyyy-mm-dd o date) como datetime con zona horaria."""
+    if isinstance(day, str):
+        day = datetime.fromisoformat(day).date()
+    return tz.localize(datetime.combine(day, time.min))
+
+
+def timestamp_to_day(timestamp):
+    """Convierte un Unix timestamp al día local en formato yyyy-mm-dd."""
+    return datetime.fromtimestamp(timestamp, tz).strftime('%Y-%m-%d')
+
+
+def daily_metrics_pipeline(start_timestamp, end_timestamp, include_users=False):
+    """
+    Pipeline que agrupa por día las listas con created_at en [start_timestamp, end_timestamp).
+    Con include_users=True también devuelve los user_ids del día (total, exitosos y fallidos).
+    """
+    failed_user_ids = {
+        "$filter": {
+            "input": "$failed_users_set",
+            "cond": {"$ne": ["$$this", None]}
+        }
+    }
+    successful_user_ids = {
+        "$filter": {
+            "input": "$successful_users_set",
+            "cond": {"$ne": ["$$this", None]}
+        }
+    }
+    user_ids = {
+        "user_ids": "$all_users",
+        "failed_user_ids": failed_user_ids,
+        "successful_user_ids": successful_user_ids,
+    } if include_users else {}
+    return [
+        # 1. Filtrar por rango de fechas en created_at (Unix timestamp)
+        {
+            "$match": {
+                "created_at": {
+                    "$gte": start_timestamp,
+                    "$lt": end_timestamp
+                }
+            }
+        },
+        # 2. Agrupar por día (convirtiendo created_at a fecha)
+        {
+            "$group": {
+                "_id": DAY_EXPRESSION,
+                # Conteos de listas
+                "total_lists": {"$sum": 1},
+                "failed_lists": {
+                    "$sum": {
+                        "$cond": [{"$eq": ["$status", "error"]}, 1, 0]
+                    }
+                },
+                # Conteos de usuarios únicos
+                "all_users": {"$addToSet": "$user_id"},
+                "failed_users_set": {
+                    "$addToSet": {
+                        "$cond": [{"$eq": ["$status", "error"]}, "$user_id", None]
+                    }
+                },
+                "successful_users_set": {
+                    "$addToSet": {
+                        "$cond": [{"$ne": ["$status", "error"]}, "$user_id", None]
+                    }
+                }
+            }
+        },
+        # 3. Calcular created_lists y conteos finales de usuarios
+        {
+            "$project": {
+                "date": "$_id",
+                "total_lists": 1,
+                "failed_lists": 1,
+                "created_lists": {
+                    "$subtract": ["$total_lists", "$failed_lists"]
+                },
+                "total_users": {"$size": "$all_users"},
+                "failed_users": {"$size": failed_user_ids},
+                "successful_users": {"$size": successful_user_ids},
+                **user_ids,
+                "_id": 0
+            }
+        },
+        # 4. Ordenar por fecha
+        {
+            "$sort": {"date": 1}
+        }
+    ]
+
+
+def aggregate_daily_metrics(collection, start_timestamp, end_timestamp, include_users=False, name="daily_metrics"):
+    """Agrega directamente sobre ListMe.lists y devuelve una lista de filas diarias (name identifica la consulta)."""
+    return aggregate(collection, daily_metrics_pipeline(start_timestamp, end_timestamp, include_users), name)
+
+
+def add_user_summaries(db, row, user_fields=None, assign=False):
+    """
+    Reemplaza los user_ids de una fila diaria por sus sketches HyperLogLog y sus bitmaps exactos
+    serializados (solo los campos de user_fields si se pasan). Los sketches no necesitan el índice
+    denso de usuarios: si no se piden bitmaps no se consulta user_index. Con assign=True (solo en
+    los refrescos) se asignan índices a los usuarios nuevos; si no, quedan pendientes en el bitmap.
+    """
+    user_fields = user_fields or {**SKETCH_FIELDS, **BITMAP_FIELDS}
+    bitmap_fields = [field for field in user_fields if field in BITMAP_FIELDS]
+    indexes = {}
+    if bitmap_fields:
+        indexes = (assign_user_indexes if assign else get_user_indexes)(db, row["user_ids"])
+    for sketch_field in user_fields:
+        if sketch_field in SKETCH_FIELDS:
+            row[sketch_field] = HyperLogLog().update(row[SKETCH_FIELDS[sketch_field]]).to_bytes()
+    for bitmap_field in bitmap_fields:
+        ids_field = BITMAP_FIELDS[bitmap_field]
+        row[bitmap_field] = UserBitmap.from_user_ids(row[ids_field], indexes).to_bytes()
+    for ids_field in set(BITMAP_FIELDS.values()):
+        del row[ids_field]
+    return row
+
+
+def read_daily_rollup(collection, start_day, end_day):
+    """Lee las filas de lists_daily entre start_day y end_day (inclusive, yyyy-mm-dd)."""
+    rollup = get_rollup_db(collection)[MONGO_COLLECTION_LISTS_DAILY]
+    projection = {column: 1 for column in DAILY_COLUMNS}
+    projection["_id"] = 0
+    cursor = rollup.find({"date": {"$gte": start_day, "$lte": end_day}}, projection).sort("date", 1)
+    return list(cursor)
+
+
+def read_daily_user_sets(collection, start_day, end_day, fields):
+    """
+    Lee los sketches o bitmaps de usuarios (fields) de lists_daily entre start_day y end_day
+    (inclusive, yyyy-mm-dd).
+    """
+    rollup = get_rollup_db(collection)[MONGO_COLLECTION_LISTS_DAILY]
+    projection = {"date": 1, "_id": 0, **{field: 1 for field in fields}}
+    cursor = rollup.find({"date": {"$gte": start_day, "$lte": end_day}}, projection).sort("date", 1)
+    return list(cursor)
+
+
+def touched_days(collection, watermark, name):
+    """
+    Días (yyyy-mm-dd) que recibieron listas con created_at posterior a watermark (None = todos).
+
+    Returns:
+        tuple: (días ordenados, máximo created_at procesado), o ([], None) si no hay listas nuevas
+    """
+    match = {"created_at": {"$gt": watermark}} if watermark is not None else {"created_at": {"$exists": True}}
+    touched = aggregate(collection, [
+        {"$match": match},
+        {"$group": {"_id": DAY_EXPRESSION, "max_created_at": {"$max": "$created_at"}}}
+    ], name)
+    if not touched:
+        return [], None
+    return sorted(row["_id"] for row in touched), max(row["max_created_at"] for row in touched)
+
+
+def _contiguous_runs(days):
+    """Agrupa una lista ordenada de días yyyy-mm-dd en tramos consecutivos (inicio, fin)."""
+    runs = []
+    for day in days:
+        current = datetime.fromisoformat(day).date()
+        if runs and runs[-1][1] + timedelta(days=1) == current:
+            runs[-1][1] = current
+        else:
+            runs.append([current, current])
+    return [(start, end) for start, end in runs]
+
+
+def refresh_daily_rollup(collection, full=False):
+    """
+    Actualiza lists_daily recalculando solo los días tocados desde el último watermark.
+
+    Args:
+        collection: Colección ListMe.lists ya conectada
+        full: Si es True ignora el watermark y reconstruye todos los días
+
+    Returns:
+        int: cantidad de días recalculados
+    """
+    return run_with_lease(get_rollup_db(collection), MONGO_COLLECTION_LISTS_DAILY,
+                          lambda: _refresh_daily_rollup(collection, full))
+
+
+def _refresh_daily_rollup(collection, full):
+    """refresh_daily_rollup sin el lease"""
+    db = get_rollup_db(collection)
+    rollup = db[MONGO_COLLECTION_LISTS_DAILY]
+    watermark = None if full else get_watermark(db, MONGO_COLLECTION_LISTS_DAILY)
+
+    # 1. Días que recibieron documentos nuevos desde el watermark
+    days, new_watermark = touched_days(collection, watermark, "lists_daily_touched_days")
+    if not days:
+        return 0
+
+    # 2. Recalcular los días completos, un aggregate por tramo de días consecutivos
+    now = datetime.now(pytz.utc)
+    for run_start, run_end in _contiguous_runs(days):
+        start_timestamp = day_start(run_start).timestamp()
+        end_timestamp = day_start(run_end + timedelta(days=1)).timestamp()
+        rows = aggregate_daily_metrics(collection, start_timestamp, end_timestamp, include_users=True,
+                                       name="lists_daily_refresh")
+        operations = [
+            pymongo.UpdateOne({"_id": row["date"]}, {"$set": {**add_user_summaries(db, row, assign=True), "updated_at": now}},
+                              upsert=True)
+            for row in rows
+        ]
+        if operations:
+            rollup.bulk_write(operations, ordered=False)
+
+    rollup.create_index("date")
+    set_watermark(db, MONGO_COLLECTION_LISTS_DAILY, new_watermark)
+    print(f"Rollup {MONGO_COLLECTION_LISTS_DAILY} actualizado: {len(days)} días recalculados")
+    return len(days)
+
+
+def first_seen_pipeline(since, inclusive=False, user_ids=None, until=None):
+    """
+    Pipeline que devuelve, para cada usuario con listas posteriores a since (o desde since si
+    inclusive=True), su primer día dentro de ese tramo y las listas totales/fallidas de ese día.
+    user_ids limita la consulta a esos usuarios y until excluye las listas desde ese timestamp.
+    """
+    created_at = {"$exists": True} if since is None else {"$gte" if inclusive else "$gt": since}
+    if until is not None:
+        created_at = {"$lt": until} if since is None else {**created_at, "$lt": until}
+    match = {"created_at": created_at}
+    if user_ids is not None:
+        match["user_id"] = {"$in": user_ids}
+    return [
+        {"$match": match},
+        # 1. Listas por usuario y día
+        {
+            "$group": {
+                "_id": {"user_id": "$user_id", "date": DAY_EXPRESSION},
+                "first_seen": {"$min": "$created_at"},
+                "max_created_at": {"$max": "$created_at"},
+                "total_lists": {"$sum": 1},
+                "failed_lists": {
+                    "$sum": {
+                        "$cond": [{"$eq": ["$status", "error"]}, 1, 0]
+                    }
+                }
+            }
+        },
+        # 2. Quedarse con el primer día de cada usuario
+        {"$sort": {"first_seen": 1}},
+        {
+            "$group": {
+                "_id": "$_id.user_id",
+                "first_seen": {"$first": "$first_seen"},
+                "first_seen_date": {"$first": "$_id.date"},
+                "total_lists": {"$first": "$total_lists"},
+                "failed_lists": {"$first": "$failed_lists"},
+                "max_created_at": {"$max": "$max_created_at"}
+            }
+        }
+    ]
+
+
+def _first_seen_doc(row):
+    return {
+        "first_seen": row["first_seen"],
+        "first_seen_date": row["first_seen_date"],
+        "total_lists": row["total_lists"],
+        "failed_lists": row["failed_lists"]
+    }
+
+
+def collect_first_seen_updates(collection, index, since, name="user_first_seen"):
+    """
+    Calcula los documentos de user_first_seen que cambian con las listas posteriores a since.
+
+    Los usuarios cuyo primer día puede ser uno de los días tocados se recalculan sobre todas sus
+    listas hasta el fin de ese día (índice por user_id y created_at), así que cada documento tiene
+    valores absolutos: procesar dos veces las mismas listas no las cuenta dos veces.
+
+    Args:
+        collection: Colección ListMe.lists ya conectada
+        index: Colección user_first_seen
+        since: Watermark (Unix timestamp) o None para procesar toda la colección
+        name: Nombre de la consulta para las métricas y maxTimeMS
+
+    Returns:
+        tuple: (dict user_id -> documento actualizado, máximo created_at procesado o None)
+    """
+    pending = aggregate(collection, first_seen_pipeline(since), name)
+    if not pending:
+        return {}, None
+    new_watermark = max(row["max_created_at"] for row in pending)
+    if since is None:
+        # Sin watermark el pipeline ya recorrió todas las listas de cada usuario
+        return {row["_id"]: _first_seen_doc(row) for row in pending}, new_watermark
+
+    # Primer día ya indexado de los usuarios afectados
+    user_ids = [row["_id"] for row in pending]
+    indexed = {}
+    for i in range(0, len(user_ids), 1000):
+        for doc in index.find({"_id": {"$in": user_ids[i:i + 1000]}}, {"first_seen_date": 1}):
+            indexed[doc["_id"]] = doc["first_seen_date"]
+
+    # Los usuarios con un primer día anterior a las listas nuevas no cambian
+    candidates = [row for row in pending
+                  if row["_id"] not in indexed or indexed[row["_id"]] >= row["first_seen_date"]]
+    updates = {}
+    for i in range(0, len(candidates), 1000):
+        batch = candidates[i:i + 1000]
+        last_day = datetime.fromisoformat(max(row["first_seen_date"] for row in batch)).date()
+        rows = aggregate(collection, first_seen_pipeline(None, user_ids=[row["_id"] for row in batch],
+                                                         until=day_start(last_day + timedelta(days=1)).timestamp()),
+                         f"{name}_first_day")
+        updates.update((row["_id"], _first_seen_doc(row)) for row in rows)
+    return updates, new_watermark
+
+
+def refresh_user_first_seen(collection, full=False):
+    """
+    Actualiza user_first_seen con las listas creadas desde el último watermark.
+
+    Args:
+        collection: Colección ListMe.lists ya conectada
+        full: Si es True reconstruye el índice desde cero en una colección aparte
+
+    Returns:
+        int: cantidad de usuarios insertados o actualizados
+    """
+    return run_with_lease(get_rollup_db(collection), MONGO_COLLECTION_USER_FIRST_SEEN,
+                          lambda: _refresh_user_first_seen(collection, full))
+
+
+def _refresh_user_first_seen(collection, full):
+    """refresh_user_first_seen sin el lease"""
+    if full:
+        return _rebuild_user_first_seen(collection)
+    db = get_rollup_db(collection)
+    index = db[MONGO_COLLECTION_USER_FIRST_SEEN]
+    watermark = get_watermark(db, MONGO_COLLECTION_USER_FIRST_SEEN)
+    updates, new_watermark = collect_first_seen_updates(collection, index, watermark, "user_first_seen_refresh")
+    if new_watermark is None:
+        return 0
+
+    operations = [pymongo.UpdateOne({"_id": user_id}, {"$set": doc}, upsert=True)
+                  for user_id, doc in updates.items()]
+    for i in range(0, len(operations), 1000):
+        index.bulk_write(operations[i:i + 1000], ordered=False)
+
+    index.create_index("first_seen")
+    set_watermark(db, MONGO_COLLECTION_USER_FIRST_SEEN, new_watermark)
+    print(f"Índice {MONGO_COLLECTION_USER_FIRST_SEEN} actualizado: {len(updates)} usuarios")
+    return len(updates)
+
+
+def _rebuild_user_first_seen(collection):
+    """
+    Reconstruye user_first_seen en una colección temporal y la pone en su lugar con un rename:
+    mientras tanto las lecturas siguen viendo el índice anterior completo. El país de cada usuario
+    se copia de user_countries.
+    """
+    db = get_rollup_db(collection)
+    rebuild = db[f"{MONGO_COLLECTION_USER_FIRST_SEEN}_rebuild"]
+    rebuild.drop()
+    rows = aggregate(collection, first_seen_pipeline(None), "user_first_seen_rebuild")
+    if not rows:
+        return 0
+
+    mapping = db[MONGO_COLLECTION_USER_COUNTRIES]
+    for i in range(0, len(rows), 1000):
+        batch = rows[i:i + 1000]
+        countries = {doc["_id"]: doc["country"]
+                     for doc in mapping.find({"_id": {"$in": [row["_id"] for row in batch]}}, {"country": 1})}
+        rebuild.insert_many([{"_id": row["_id"], **_first_seen_doc(row),
+                              **({"country": countries[row["_id"]]} if row["_id"] in countries else {})}
+                             for row in batch])
+    rebuild.create_index("first_seen")
+    rebuild.rename(MONGO_COLLECTION_USER_FIRST_SEEN, dropTarget=True)
+    set_watermark(db, MONGO_COLLECTION_USER_FIRST_SEEN, max(row["max_created_at"] for row in rows))
+    print(f"Índice {MONGO_COLLECTION_USER_FIRST_SEEN} reconstruido: {len(rows)} usuarios")
+    return len(rows)
+
+
+def first_seen_since(collection, index, since, name="user_first_seen"):
+    """
+    Usuarios cuya primera lista es desde since (None = toda la colección), calculados sobre las
+    listas sin sumar a los documentos del índice. Los usuarios que ya figuran en el índice con una
+    primera lista anterior a since quedan afuera.
+
+    Returns:
+        dict: user_id -> documento con first_seen, first_seen_date, total_lists y failed_lists
+    """
+    pending = aggregate(collection, first_seen_pipeline(since, inclusive=True), name)
+    returning = set()
+    if since is not None:
+        user_ids = [row["_id"] for row in pending]
+        for i in range(0, len(user_ids), 1000):
+            for doc in index.find({"_id": {"$in": user_ids[i:i + 1000]}, "first_seen": {"$lt": since}}, {"_id": 1}):
+                returning.add(doc["_id"])
+    return {row["_id"]: _first_seen_doc(row) for row in pending if row["_id"] not in returning}
+
+
+def read_first_seen(collection, start_timestamp, end_timestamp):
+    """
+    Devuelve los usuarios cuya primera lista cae en [start_timestamp, end_timestamp), incluyendo
+    los que todavía no fueron volcados al índice.
+
+    Del índice solo se leen los usuarios con primer día anterior al día del watermark: esos
+    documentos ya no cambian, así que un refresco que escribe al mismo tiempo no altera la lectura.
+    Desde el inicio de ese día los usuarios nuevos se calculan sobre las listas (first_seen_since),
+    igual que la cola de los rollups diarios, sin sumarlos a documentos que el refresco puede estar
+    actualizando.
+    """
+    db = get_rollup_db(collection)
+    index = db[MONGO_COLLECTION_USER_FIRST_SEEN]
+    watermark = get_watermark(db, MONGO_COLLECTION_USER_FIRST_SEEN)
+    cutoff = day_start(timestamp_to_day(watermark)).timestamp() if watermark is not None else None
+
+    users = {}
+    if cutoff is not None:
+        users = {doc.pop("_id"): doc for doc in index.find(
+            {"first_seen": {"$gte": start_timestamp, "$lt": min(end_timestamp, cutoff)}})}
+    if cutoff is None or cutoff < end_timestamp:
+        users.update(first_seen_since(collection, index, cutoff))
+
+    return [{"user_id": user_id, **doc} for user_id, doc in users.items()
+            if start_timestamp <= doc["first_seen"] < end_timestamp]
+
+
+def count_first_seen(collection, start_timestamp, end_timestamp):
+    """
+    Cuenta los usuarios cuya primera lista cae en [start_timestamp, end_timestamp) y cuántos
+    tuvieron alguna lista con error en su primer día. Usa el mismo corte que read_first_seen, pero
+    la parte del índice se agrupa en Mongo (índice por first_seen): solo viajan los totales y los
+    usuarios que todavía no fueron volcados.
+
+    Returns:
+        dict: total_users y failed_users
+    """
+    db = get_rollup_db(collection)
+    index = db[MONGO_COLLECTION_USER_FIRST_SEEN]
+    watermark = get_watermark(db, MONGO_COLLECTION_USER_FIRST_SEEN)
+    cutoff = day_start(timestamp_to_day(watermark)).timestamp() if watermark is not None else None
+
+    totals = {"total_users": 0, "failed_users": 0}
+    if cutoff is not None:
+        rows = aggregate(index, [
+            {"$match": {"first_seen": {"$gte": start_timestamp, "$lt": min(end_timestamp, cutoff)}}},
+            {"$group": {"_id": None, "total_users": {"$sum": 1},
+                        "failed_users": {"$sum": {"$cond": [{"$gt": ["$failed_lists", 0]}, 1, 0]}}}}
+        ], "user_first_seen_totals")
+        for row in rows:
+            totals = {key: row[key] for key in totals}
+    if cutoff is None or cutoff < end_timestamp:
+        for doc in first_seen_since(collection, index, cutoff).values():
+            if start_timestamp <= doc["first_seen"] < end_timestamp:
+                totals["total_users"] += 1
+                totals["failed_users"] += doc["failed_lists"] > 0
+    return totals
+
+
+# Primera notificación de listas (Unix timestamp en segundos) convertida al día local
+FIRST_NOTIFICATION_DAY_EXPRESSION = {
+    "$dateToString": {
+        "format": "%Y-%m-%d",
+        "date": {"$toDate": {"$multiply": [{"$arrayElemAt": ["$lists_notif", 0]}, 1000]}},
+        "timezone": TIMEZONE
+    }
+}
+
+
+def notified_daily_pipeline(start_timestamp, end_timestamp):
+    """
+    Pipeline que cuenta por día los usuarios cuya primera notificación de listas cae en
+    [start_timestamp, end_timestamp).
+    """
+    return [
+        # 1. Filtrar por la primera notificación (posición 0 de lists_notif)
+        {"$match": {"lists_notif.0": {"$gte": start_timestamp, "$lt": end_timestamp}}},
+        # 2. Contar por día
+        {"$group": {"_id": FIRST_NOTIFICATION_DAY_EXPRESSION, "notified_users": {"$sum": 1}}},
+        {"$project": {"date": "$_id", "notified_users": 1, "_id": 0}},
+        {"$sort": {"date": 1}}
+    ]
+
+
+def aggregate_notified_daily(notifications, start_timestamp, end_timestamp, name="notified_daily"):
+    """Agrega directamente sobre TranscribeMe.notifications y devuelve filas diarias (name identifica la consulta)."""
+    return aggregate(notifications, notified_daily_pipeline(start_timestamp, end_timestamp), name)
+
+
+def read_notified_daily(notifications, start_day, end_day):
+    """Lee las filas de notified_daily entre start_day y end_day (inclusive, yyyy-mm-dd)."""
+    rollup = get_rollup_db(notifications)[MONGO_COLLECTION_NOTIFIED_DAILY]
+    cursor = rollup.find({"date": {"$gte": start_day, "$lte": end_day}},
+                         {"date": 1, "notified_users": 1, "_id": 0}).sort("date", 1)
+    return list(cursor)
+
+
+def refresh_notified_daily(notifications, full=False):
+    """
+    Actualiza notified_daily recalculando solo los días con primeras notificaciones posteriores
+    al último watermark.
+
+    Args:
+        notifications: Colección TranscribeMe.notifications ya conectada
+        full: Si es True ignora el watermark y reconstruye todos los días
+
+    Returns:
+        int: cantidad de días recalculados
+    """
+    return run_with_lease(get_rollup_db(notifications), MONGO_COLLECTION_NOTIFIED_DAILY,
+                          lambda: _refresh_notified_daily(notifications, full))
+
+
+def _refresh_notified_daily(notifications, full):
+    """refresh_notified_daily sin el lease"""
+    db = get_rollup_db(notifications)
+    rollup = db[MONGO_COLLECTION_NOTIFIED_DAILY]
+    watermark = None if full else get_watermark(db, MONGO_COLLECTION_NOTIFIED_DAILY)
+
+    # 1. Días con primeras notificaciones nuevas desde el watermark
+    match = {"lists_notif.0": {"$gt": watermark}} if watermark is not None else {"lists_notif.0": {"$exists": True}}
+    touched = aggregate(notifications, [
+        {"$match": match},
+        {"$group": {"_id": FIRST_NOTIFICATION_DAY_EXPRESSION,
+                    "max_notification": {"$max": {"$arrayElemAt": ["$lists_notif", 0]}}}}
+    ], "notified_daily_touched_days")
+    if not touched:
+        return 0
+
+    days = sorted(row["_id"] for row in touched)
+    new_watermark = max(row["max_notification"] for row in touched)
+
+    # 2. Recalcular los días completos, un aggregate por tramo de días consecutivos
+    now = datetime.now(pytz.utc)
+    for run_start, run_end in _contiguous_runs(days):
+        rows = aggregate_notified_daily(notifications, day_start(run_start).timestamp(),
+                                        day_start(run_end + timedelta(days=1)).timestamp(), "notified_daily_refresh")
+        operations = [
+            pymongo.UpdateOne({"_id": row["date"]}, {"$set": {**row, "updated_at": now}}, upsert=True)
+            for row in rows
+        ]
+        if operations:
+            rollup.bulk_write(operations, ordered=False)
+
+    rollup.create_index("date")
+    set_watermark(db, MONGO_COLLECTION_NOTIFIED_DAILY, new_watermark)
+    print(f"Rollup {MONGO_COLLECTION_NOTIFIED_DAILY} actualizado: {len(days)} días recalculados")
+    return len(days)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Refresca los rollups pre-agregados de ListMe")
+    parser.add_argument("--full", action="store_true", help="Reconstruye los rollups completos ignorando el watermark")
+    args = parser.parse_args()
+
+    client = get_client()
+    lists_collection = client[MONGO_DB_LIST_ME][MONGO_COLLECTION_LISTS]
+    refresh_daily_rollup(lists_collection, full=args.full)
+    refresh_user_first_seen(lists_collection, full=args.full)
+    refresh_notified_daily(client[MONGO_DB_TRANSCRIBE_ME][MONGO_COLLECTION_NOTIFICATIONS], full=args.full)
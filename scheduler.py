@@ -0,0 +1,48 @@
+import threading
+import traceback
+
+
+def start_periodic_task(name, func, interval_seconds, run_immediately=True):
+    """
+    Ejecuta func cada interval_seconds en un hilo daemon, sin bloquear el arranque de la app.
+    Los errores se imprimen y no detienen la tarea.
+
+    Args:
+        name: Nombre de la tarea (para los logs y el nombre del hilo)
+        func: Función sin argumentos a ejecutar
+        interval_seconds: Segundos entre ejecuciones
+        run_immediately: Si es True la primera ejecución ocurre al iniciar el hilo
+
+    Returns:
+        threading.Event: evento que detiene la tarea al hacer set()
+    """
+    stop_event = threading.Event()
+
+    def run():
+        if not run_immediately:
+            stop_event.wait(interval_seconds)
+        while not stop_event.is_set():
+            try:
+                func()
+            except Exception:
+                print(f"Error en la tarea periódica '{name}':")
+                traceback.print_exc()
+            stop_event.wait(interval_seconds)
+
+    thread = threading.Thread(target=run, name=f"periodic-{name}", daemon=True)
+    thread.start()
+    return stop_event
+
+
+def start_background_task(name, func):
+    """Ejecuta func una sola vez en un hilo daemon; los errores se imprimen"""
+    def run():
+        try:
+            func()
+        except Exception:
+            print(f"Error en la tarea '{name}':")
+            traceback.print_exc()
+
+    thread = threading.Thread(target=run, name=f"task-{name}", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,55 @@
+import bitmaps
+from bitmaps import UserBitmap, resolve_pending
+from get_data import monthly_returning_users
+
+
+def test_bitmap_roundtrip_and_set_operations():
+    first = UserBitmap.from_indexes([0, 3, 64, 1000])
+    second = UserBitmap.from_indexes([3, 5, 1000])
+
+    assert UserBitmap.from_bytes(first.to_bytes()).bits == first.bits
+    assert (first | second).count() == 5
+    assert (first & second).count() == 2
+    assert (first - second).count() == 2
+    assert UserBitmap.union([first, second, UserBitmap()]).bits == (first | second).bits
+    assert UserBitmap.from_bytes(None).count() == 0
+
+
+def test_users_without_index_stay_pending_and_exact():
+    indexes = {"a": 0, "b": 1}
+    first = UserBitmap.from_user_ids(["a", "x"], indexes)
+    second = UserBitmap.from_user_ids(["b", "x", "y"], indexes)
+
+    union = UserBitmap.from_bytes(UserBitmap.union([first, second]).to_bytes())
+
+    assert union.pending == {"x", "y"}
+    assert union.count() == 4
+    assert (first & second).count() == 1
+
+
+def test_resolve_pending_moves_indexed_users_to_bits(monkeypatch):
+    row = {"date": "2025-07-01", "users_bitmap": UserBitmap.from_user_ids(["a", "x"], {"a": 0}).to_bytes()}
+    monkeypatch.setattr(bitmaps, "get_user_indexes", lambda db, user_ids: {"x": 7})
+
+    resolved = resolve_pending(None, [row], ["users_bitmap"])
+
+    bitmap = UserBitmap.from_bytes(resolved[0]["users_bitmap"])
+    assert bitmap.bits == UserBitmap.from_indexes([0, 7]).bits and not bitmap.pending
+    # La fila original (por ejemplo de la cache en memoria) no se modifica
+    assert UserBitmap.from_bytes(row["users_bitmap"]).pending == {"x"}
+
+
+def test_returning_users_counts_users_active_in_the_previous_month():
+    def day(date, indexes):
+        return {"date": date, "users_bitmap": UserBitmap.from_indexes(indexes).to_bytes()}
+
+    previous = [day("2025-05-31", [9, 2])]
+    rows = [day("2025-06-10", [1, 2, 3]), day("2025-06-20", [4]), day("2025-07-05", [2, 4, 5]), day("2025-08-01", [6])]
+
+    result = monthly_returning_users(rows, previous)
+
+    assert result.to_dict("records") == [
+        {"date": "2025-06", "active_users": 4, "returning_users": 1},
+        {"date": "2025-07", "active_users": 3, "returning_users": 2},
+        {"date": "2025-08", "active_users": 1, "returning_users": 0},
+    ]
@@ -0,0 +1,59 @@
+from cache import TTLCache, get_days_cached
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entries_count_as_misses():
+    cache = TTLCache(maxsize=10)
+    cache.set("a", 1, ttl=0)
+
+    assert cache.get("a", "default") == "default"
+    assert cache.get_many(["a"]) == {}
+    stats = cache.stats()
+    assert stats["expirations"] == 1 and stats["misses"] == 2 and stats["size"] == 0
+
+
+def test_get_many_returns_only_present_keys():
+    cache = TTLCache(maxsize=10)
+    cache.set_many({"a": (1, None), "b": (2, 60)})
+
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "b": 2}
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_days_cached_fetches_only_the_missing_runs():
+    calls = []
+
+    def fetch_range(start, end):
+        calls.append((start, end))
+        # El 2025-07-03 no tiene datos
+        return [{"date": day, "value": int(day[-2:])} for day in (start, end) if day != "2025-07-03"]
+
+    cache = TTLCache(maxsize=100)
+    first = get_days_cached(cache, "test", "2025-07-02", "2025-07-03", fetch_range)
+    assert first == [{"date": "2025-07-02", "value": 2}]
+
+    rows = get_days_cached(cache, "test", "2025-07-01", "2025-07-05", fetch_range)
+
+    # Solo se consultan los tramos que faltan; el día vacío quedó en la cache y no se repite
+    assert calls == [("2025-07-02", "2025-07-03"), ("2025-07-01", "2025-07-01"), ("2025-07-04", "2025-07-05")]
+    assert [row["date"] for row in rows] == ["2025-07-01", "2025-07-02", "2025-07-04", "2025-07-05"]
+
+
+def test_days_cached_keeps_prefixes_apart():
+    cache = TTLCache(maxsize=100)
+    get_days_cached(cache, "first", "2025-07-01", "2025-07-01", lambda start, end: [{"date": start, "value": 1}])
+
+    rows = get_days_cached(cache, "second", "2025-07-01", "2025-07-01", lambda start, end: [{"date": start, "value": 2}])
+
+    assert rows == [{"date": "2025-07-01", "value": 2}]
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from charts import downsample_dates, lttb_indices, users_by_country
+
+
+def test_lttb_keeps_the_ends_and_the_peaks():
+    x = np.arange(10_000)
+    y = np.zeros(10_000)
+    y[4321] = 100
+
+    kept = lttb_indices(x, y, 200)
+
+    assert len(kept) == 200
+    assert kept[0] == 0 and kept[-1] == 9999
+    assert 4321 in kept
+    assert (np.diff(kept) > 0).all()
+
+
+def test_lttb_returns_everything_below_the_threshold():
+    assert list(lttb_indices(np.arange(50), np.arange(50), 200)) == list(range(50))
+
+
+def _country_rows(days, countries):
+    dates = pd.date_range("2020-01-01", periods=days).strftime("%Y-%m-%d")
+    return pd.DataFrame([{"date": date, "country": country, "total_users": 10 + i % 7 + j, "created_lists": 1}
+                         for j, country in enumerate(countries) for i, date in enumerate(dates)])
+
+
+def test_downsample_dates_keeps_the_same_dates_for_every_country():
+    rows = _country_rows(3000, ["Argentina", "Spain"])
+
+    reduced, dropped = downsample_dates(rows, ["total_users"], max_points=500)
+
+    by_country = reduced.groupby("country")["date"].apply(list)
+    assert by_country["Argentina"] == by_country["Spain"]
+    assert len(by_country["Spain"]) == 500 and dropped == 2500
+
+
+def test_country_chart_stays_stacked_when_downsampled(monkeypatch):
+    monkeypatch.setattr("charts.CHART_MAX_POINTS", 500)
+    rows = _country_rows(3000, ["Argentina", "Spain"])
+
+    fig = users_by_country(rows, ["Argentina", "Spain"], "Daily")
+
+    first, second = fig.data
+    assert len(first.x) == len(second.x) == 500
+    # Cada traza es la suma acumulada y el hover muestra el valor propio del país
+    assert (np.asarray(second.y) == np.asarray(first.y) + np.asarray(second.customdata)).all()
+    assert first.fill == "tozeroy" and second.fill == "tonexty"
+    assert fig.layout.meta["downsampled"]
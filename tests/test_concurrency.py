@@ -0,0 +1,31 @@
+import threading
+
+from concurrency import run_concurrently
+
+
+def test_failures_and_timeouts_use_their_fallbacks():
+    release = threading.Event()
+
+    def fail():
+        raise RuntimeError("consulta caída")
+
+    def slow():
+        release.wait(5)
+        return "tarde"
+
+    failed = []
+    results = run_concurrently({"ok": lambda: 1, "fail": fail, "slow": slow},
+                               fallbacks={"fail": [], "slow": "default"}, timeouts={"slow": 0.1}, failed=failed)
+    release.set()
+
+    assert results == {"ok": 1, "fail": [], "slow": "default"}
+    assert sorted(failed) == ["fail", "slow"]
+
+
+def test_tasks_run_in_parallel():
+    barrier = threading.Barrier(3, timeout=2)
+
+    # Si las tareas corrieran una tras otra la barrera no se abriría y todas fallarían
+    results = run_concurrently({name: barrier.wait for name in ("a", "b", "c")}, fallbacks={"a": -1, "b": -1, "c": -1})
+
+    assert sorted(results.values()) == [0, 1, 2]
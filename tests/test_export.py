@@ -0,0 +1,29 @@
+from flask import Flask
+
+from export import lists_content_query, register_export_routes
+from rollups import day_start
+
+
+def _matches(query, timestamp):
+    created_at = query["created_at"]
+    return created_at["$gte"] <= timestamp < created_at["$lt"]
+
+
+def test_lists_content_query_covers_whole_days_of_the_range():
+    query = lists_content_query("2025-07-01", "2025-07-03")
+
+    # Inicio del primer día incluido, último instante del día anterior excluido
+    assert _matches(query, day_start("2025-07-01").timestamp())
+    assert not _matches(query, day_start("2025-07-01").timestamp() - 0.001)
+    # Último instante del día final incluido, inicio del día siguiente excluido
+    assert _matches(query, day_start("2025-07-04").timestamp() - 0.001)
+    assert not _matches(query, day_start("2025-07-04").timestamp())
+
+
+def test_export_rejects_malformed_dates():
+    server = Flask(__name__)
+    register_export_routes(server, collection=None)
+
+    response = server.test_client().get("/export/contenido_listas?start=2025-13-01&end=2025-07-03")
+
+    assert response.status_code == 400
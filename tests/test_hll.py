@@ -0,0 +1,70 @@
+import random
+
+from hll import HyperLogLog, standard_error
+from rollups import SKETCH_FIELDS
+from get_data import distinct_users_in_range, monthly_distinct_users, rolling_distinct_users
+
+# Tolerancia de los tests: 4 errores estándar (la estimación cae fuera con probabilidad ~0.006%)
+TOLERANCE = 4 * standard_error()
+
+
+def _user_ids(count, offset=0):
+    return [str(5491100000000 + offset + i) for i in range(count)]
+
+
+def _assert_close(estimate, exact):
+    assert abs(estimate - exact) <= TOLERANCE * exact
+
+
+def test_estimate_is_within_the_error_bound():
+    for count in (50_000, 200_000):
+        _assert_close(HyperLogLog().update(_user_ids(count)).count(), count)
+
+
+def test_small_cardinalities_are_nearly_exact():
+    for count in (0, 1, 10, 1000):
+        assert abs(HyperLogLog().update(_user_ids(count)).count() - count) <= max(1, 0.01 * count)
+
+
+def test_repeated_values_do_not_change_the_estimate():
+    user_ids = _user_ids(5000)
+    assert HyperLogLog().update(user_ids * 3).count() == HyperLogLog().update(user_ids).count()
+
+
+def test_union_equals_sketch_of_the_union():
+    first, second = _user_ids(30_000), _user_ids(30_000, offset=20_000)
+    union = HyperLogLog.union([HyperLogLog().update(first), HyperLogLog().update(second)])
+
+    assert (union.registers == HyperLogLog().update(first + second).registers).all()
+    _assert_close(union.count(), 50_000)
+
+
+def test_serialization_roundtrip():
+    sketch = HyperLogLog().update(_user_ids(1000))
+    assert (HyperLogLog.from_bytes(sketch.to_bytes()).registers == sketch.registers).all()
+    assert HyperLogLog.from_bytes(None).count() == 0
+
+
+def _sketch_rows(users_by_day):
+    return [{"date": day, **{field: HyperLogLog().update(user_ids).to_bytes() for field in SKETCH_FIELDS}}
+            for day, user_ids in users_by_day.items()]
+
+
+def test_range_month_and_rolling_estimates_match_exact_counts():
+    rng = random.Random(7)
+    population = _user_ids(40_000)
+    days = [f"2025-07-{day:02d}" for day in range(1, 32)] + [f"2025-08-{day:02d}" for day in range(1, 32)]
+    users_by_day = {day: rng.sample(population, 3000) for day in days}
+    rows = _sketch_rows(users_by_day)
+
+    _assert_close(distinct_users_in_range(rows)["total_users"], len(set().union(*users_by_day.values())))
+
+    monthly = monthly_distinct_users(rows).set_index("date")
+    for month in ("2025-07", "2025-08"):
+        exact = len(set().union(*(ids for day, ids in users_by_day.items() if day.startswith(month))))
+        _assert_close(monthly.loc[month, "total_users"], exact)
+
+    rolling = rolling_distinct_users(rows, window_days=7).set_index("date")
+    for i in (0, 6, 40):
+        exact = len(set().union(*(users_by_day[day] for day in days[max(0, i - 6):i + 1])))
+        _assert_close(rolling.loc[days[i], "total_users"], exact)
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import live
+from cache import TTLCache
+from live import fold_new_lists, today_entries
+from rollups import day_start
+
+
+def _setup(monkeypatch, batches):
+    today = datetime.now(live.tz).strftime('%Y-%m-%d')
+    start = day_start(today).timestamp()
+    batches = [[{"user_id": user_id, "status": status, "created_at": start + offset} for user_id, status, offset in batch]
+               for batch in batches]
+    watermarks = []
+
+    def aggregate(collection, pipeline, name):
+        watermarks.append(pipeline[0]["$match"]["created_at"])
+        return batches.pop(0) if batches else []
+
+    monkeypatch.setattr(live, "aggregate", aggregate)
+    monkeypatch.setattr(live, "get_rollup_db", lambda collection: None)
+    monkeypatch.setattr(live, "get_user_countries", lambda collection, user_ids: {user_id: "Argentina" for user_id in user_ids})
+    monkeypatch.setattr(live, "get_user_indexes", lambda db, user_ids: {user_id: i for i, user_id in enumerate(user_ids)})
+    monkeypatch.setattr(live, "returning_users", lambda collection, user_ids, day: {"old"})
+    return today, start, watermarks
+
+
+def test_fold_new_lists_adds_only_lists_after_the_watermark(monkeypatch):
+    today, start, watermarks = _setup(monkeypatch, [
+        [("a", "ok", 10), ("old", "error", 20)],
+        [("a", "error", 30), ("b", "ok", 40)],
+    ])
+    cache = TTLCache(maxsize=10)
+
+    fold_new_lists(None, cache)
+    state = fold_new_lists(None, cache)
+
+    assert watermarks == [{"$gte": start}, {"$gt": start + 20}]
+    assert state["watermark"] == start + 40
+    assert state["users"]["a"]["total_lists"] == 2 and state["users"]["a"]["failed_lists"] == 1
+    assert state["users"]["old"]["new"] is False and state["users"]["b"]["new"] is True
+    assert cache.get(f"live_{today}") == state
+
+    # Sin listas nuevas el estado no cambia
+    assert fold_new_lists(None, cache) == state
+
+
+def test_today_entries_group_by_country(monkeypatch):
+    _setup(monkeypatch, [[("a", "ok", 10), ("a", "error", 20), ("old", "ok", 30)]])
+
+    entries = today_entries(fold_new_lists(None, TTLCache(maxsize=10)))
+
+    (row,) = entries["country_daily"]["rows"]
+    assert row["country"] == "Argentina" and row["total_lists"] == 3 and row["failed_lists"] == 1
+    assert row["total_users"] == 2
+    (new_users,) = entries["country_new_users"]["rows"]
+    assert new_users["total_users"] == 1
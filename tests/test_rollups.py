@@ -0,0 +1,48 @@
+import rollups
+from rollups import collect_first_seen_updates
+
+
+class FakeIndex:
+    """user_first_seen en memoria: solo el find por _id que usa collect_first_seen_updates"""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return [{"_id": user_id, **self.docs[user_id]} for user_id in query["_id"]["$in"] if user_id in self.docs]
+
+
+def _row(user_id, day, total_lists, failed_lists=0, max_created_at=0):
+    return {"_id": user_id, "first_seen": rollups.day_start(day).timestamp(), "first_seen_date": day,
+            "total_lists": total_lists, "failed_lists": failed_lists, "max_created_at": max_created_at}
+
+
+def test_first_seen_updates_recompute_only_candidate_users(monkeypatch):
+    index = FakeIndex({"old": {"first_seen_date": "2025-06-01"}, "same_day": {"first_seen_date": "2025-07-02"}})
+    # Listas posteriores al watermark: "old" ya tenía un primer día anterior y no cambia
+    pending = [_row("old", "2025-07-02", 1, max_created_at=300), _row("same_day", "2025-07-02", 1, max_created_at=200),
+               _row("new", "2025-07-03", 2, 1, max_created_at=100)]
+    # Recalculo sobre todas las listas de los candidatos: valores absolutos, no sumados a los anteriores
+    recomputed = [_row("same_day", "2025-07-02", 4), _row("new", "2025-07-03", 2, 1)]
+    calls = []
+
+    def aggregate(collection, pipeline, name):
+        calls.append((name, pipeline))
+        return pending if len(calls) == 1 else recomputed
+
+    monkeypatch.setattr(rollups, "aggregate", aggregate)
+
+    updates, watermark = collect_first_seen_updates(None, index, since=50)
+
+    assert watermark == 300
+    assert set(updates) == {"same_day", "new"}
+    assert updates["same_day"]["total_lists"] == 4
+    assert updates["new"] == {"first_seen": rollups.day_start("2025-07-03").timestamp(), "first_seen_date": "2025-07-03",
+                              "total_lists": 2, "failed_lists": 1}
+    assert [name for name, _ in calls] == ["user_first_seen", "user_first_seen_first_day"]
+
+
+def test_first_seen_updates_without_new_lists(monkeypatch):
+    monkeypatch.setattr(rollups, "aggregate", lambda collection, pipeline, name: [])
+
+    assert collect_first_seen_updates(None, FakeIndex({}), since=50) == ({}, None)